@@ -2,10 +2,14 @@ from .books import router as books_router
 from .readers import router as readers_router
 from .copies import router as copies_router
 from .loans import router as loans_router
+from .suggest import router as suggest_router
+from .stats import router as stats_router
 
 __all__ = [
     "books_router", 
     "readers_router", 
     "copies_router", 
-    "loans_router"
+    "loans_router",
+    "suggest_router",
+    "stats_router"
 ]
\ No newline at end of file
@@ -0,0 +1,13 @@
+"""
+Маршруты API асинхронного режима (DB_ASYNC): те же пути, схемы и бюджеты
+SQL-запросов, что и в app/api, но корутины на AsyncSession (app/crud/aio) -
+ожидание БД не занимает потоки пула AnyIO.
+
+Синхронными остаются маршруты, которые асинхронная сессия не ускорит
+(они подключаются из app/api как есть и выполняются в пуле потоков):
+- импорт каталога (POST /api/books/import) - потоковое чтение загруженного
+  файла и пакетные транзакции;
+- нечеткий поиск читателей и подсказки (/api/readers/search/, /api/suggest) -
+  поиск по индексам в памяти, которые загружаются и обновляются синхронной сессией;
+- статистика кэша ответов (/api/stats/cache) - без обращения к БД.
+"""
@@ -0,0 +1,105 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.database import get_async_db, get_async_read_db
+from app.crud import aio as crud
+from app.api import books
+from app.api.conditional import etag_matches, make_etag, not_modified, versions_etag
+from app.api.responses import cached_response_async, json_item, json_list
+from app.cache import item_tags
+from app.crud.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.query_budget import query_budget
+from app.schemas.book import BookCreate, BookUpdate, BookInDB
+from app.schemas.catalog_import import ImportReport
+
+router = APIRouter()
+
+@router.get("/", response_model=List[BookInDB])
+@query_budget(2)
+async def read_books(
+    request: Request,
+    skip: int = Query(0, ge=0, description="Пропустить первых N записей"),
+    limit: int = Query(100, ge=1, le=1000, description="Лимит записей"),
+    after: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Получить список всех книг (ETag по версии таблицы книг, кэш ответов)"""
+    async def build():
+        etag = versions_etag(["books"], await crud.counters.get_versions(db, ["books"]))
+        if etag_matches(request, etag):
+            return not_modified(etag), ()
+        try:
+            books = await crud.book.get_books(db, skip=skip, limit=limit, after=after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {"ETag": etag}
+        cursor = next_cursor(books, limit)
+        if cursor:
+            headers[NEXT_CURSOR_HEADER] = cursor
+        return json_list(BookInDB, books, headers=headers), ["books"]
+
+    return await cached_response_async(request, build)
+
+@router.get("/{book_id}", response_model=BookInDB)
+@query_budget(2)
+async def read_book(book_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    """Получить книгу по ID (ETag по версии строки, кэш ответов)"""
+    async def build():
+        version = await crud.book.get_book_version(db, book_id=book_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Книга не найдена")
+        etag = make_etag("book", book_id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag), ()
+        db_book = await crud.book.get_book(db, book_id=book_id)
+        if db_book is None:
+            raise HTTPException(status_code=404, detail="Книга не найдена")
+        return json_item(BookInDB, db_book, headers={"ETag": etag}), item_tags("books", book_id)
+
+    return await cached_response_async(request, build)
+
+@router.post("/", response_model=BookInDB, status_code=201)
+@query_budget(5)
+async def create_book(book: BookCreate, db: AsyncSession = Depends(get_async_db)):
+    """Создать новую книгу"""
+    return await crud.book.create_book(db=db, book=book)
+
+# Импорт каталога остается синхронным: потоковое чтение файла и пачки транзакций
+router.post("/import", response_model=ImportReport)(books.import_books)
+
+@router.put("/{book_id}", response_model=BookInDB)
+@query_budget(4)
+async def update_book(
+    book_id: int, 
+    book_update: BookUpdate, 
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Обновить книгу"""
+    db_book = await crud.book.update_book(db, book_id=book_id, book_update=book_update)
+    if db_book is None:
+        raise HTTPException(status_code=404, detail="Книга не найдена")
+    return db_book
+
+@router.delete("/{book_id}", status_code=204)
+@query_budget(4)
+async def delete_book(book_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Удалить книгу"""
+    success = await crud.book.delete_book(db, book_id=book_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Книга не найдена")
+    return None
+
+@router.get("/search/", response_model=List[BookInDB])
+@query_budget(1)
+async def search_books(
+    q: str = Query(..., min_length=1, description="Поисковый запрос"),
+    skip: int = Query(0, ge=0, description="Пропустить первых N результатов"),
+    limit: int = Query(20, ge=1, le=100, description="Лимит результатов"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Полнотекстовый поиск книг по названию или автору (по релевантности)"""
+    books = await crud.book.search_books(db, query=q, skip=skip, limit=limit)
+    if not books:
+        raise HTTPException(status_code=404, detail="Книги не найдены")
+    return json_list(BookInDB, books)
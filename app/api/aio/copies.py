@@ -0,0 +1,172 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+
+from app.database import get_async_db, get_async_read_db
+from app.crud import aio as crud
+from app.api.conditional import etag_matches, make_etag, not_modified, versions_etag
+from app.api.copies import COPY_LIST_TABLES
+from app.api.responses import cached_response_async, json_item, json_list
+from app.cache import item_tags
+from app.crud.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.query_budget import query_budget
+from app.models.copy import Copy
+from app.schemas.copy import CopyCreate, CopyInDB, CopyUpdate
+
+router = APIRouter()
+
+async def _collection_etag(db: AsyncSession) -> str:
+    return versions_etag(COPY_LIST_TABLES, await crud.counters.get_versions(db, COPY_LIST_TABLES))
+
+@router.get("/", response_model=List[CopyInDB])
+@query_budget(2)
+async def read_copies(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    status: str = Query(None, description="Фильтр по статусу"),
+    after: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Получить список всех экземпляров (ETag по версиям таблиц)"""
+    etag = await _collection_etag(db)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        copies = await crud.copy.get_copies_details(
+            db, skip=skip, limit=limit, status=status, after=after
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"ETag": etag}
+    cursor = next_cursor(copies, limit)
+    if cursor:
+        headers[NEXT_CURSOR_HEADER] = cursor
+    return json_list(CopyInDB, copies, headers=headers)
+
+@router.get("/{copy_id}", response_model=CopyInDB)
+@query_budget(2)
+async def read_copy(copy_id: int, request: Request, response: Response,
+                    db: AsyncSession = Depends(get_async_read_db)):
+    """Получить экземпляр по ID (ETag по версиям строк экземпляра и книги)"""
+    versions = await crud.copy.get_copy_version(db, copy_id=copy_id)
+    if versions is None:
+        raise HTTPException(status_code=404, detail="Экземпляр не найден")
+    copy_version, book_version = versions
+    etag = make_etag("copy", copy_id, copy_version, "book", book_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    copy = await crud.copy.get_copy_details(db, copy_id=copy_id)
+    if copy is None:
+        raise HTTPException(status_code=404, detail="Экземпляр не найден")
+    response.headers["ETag"] = etag
+    return copy
+
+@router.get("/book/{book_id}/available", response_model=List[CopyInDB])
+@query_budget(2)
+async def read_available_copies(book_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    """Получить доступные экземпляры книги (ETag по версиям таблиц)"""
+    etag = await _collection_etag(db)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    copies = await crud.copy.get_available_copies_details(db, book_id=book_id)
+    return json_list(CopyInDB, copies, headers={"ETag": etag})
+
+@router.get("/inventory/{inventory_number}", response_model=CopyInDB)
+@query_budget(1)
+async def read_copy_by_inventory(inventory_number: str, request: Request,
+                                 db: AsyncSession = Depends(get_async_read_db)):
+    """Получить экземпляр по инвентарному номеру (кэш ответов)"""
+    async def build():
+        copy = await crud.copy.get_copy_details_by_inventory(db, inventory_number=inventory_number)
+        if copy is None:
+            raise HTTPException(status_code=404, detail="Экземпляр не найден")
+        # Карточка содержит название книги - запись сбрасывается и при изменении книги
+        return json_item(CopyInDB, copy), item_tags("copies", copy.id) + item_tags("books", copy.book_id)
+
+    return await cached_response_async(request, build)
+
+@router.post("/", response_model=CopyInDB, status_code=201)
+@query_budget(8)
+async def create_copy(copy: CopyCreate, db: AsyncSession = Depends(get_async_db)):
+    """Создать новый экземпляр"""
+    # Проверяем, существует ли книга
+    book = await crud.book.get_book(db, book_id=copy.book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Книга не найдена")
+    
+    # Проверяем, есть ли уже экземпляр с таким инвентарным номером
+    existing = await crud.copy.get_copy_by_inventory(db, inventory_number=copy.inventory_number)
+    if existing:
+        raise HTTPException(status_code=400, detail="Экземпляр с таким инвентарным номером уже существует")
+    
+    db_copy = Copy(
+        book_id=copy.book_id,
+        inventory_number=copy.inventory_number,
+        status=copy.status,
+        acquisition_date=date.today()
+    )
+    db.add(db_copy)
+    await db.commit()
+    
+    # Возвращаем экземпляр с названием книги одним запросом
+    return await crud.copy.get_copy_details(db, copy_id=db_copy.id)
+
+async def _get_copy_or_404(db: AsyncSession, copy_id: int) -> Copy:
+    copy = await crud.copy.get_copy(db, copy_id=copy_id)
+    if copy is None:
+        raise HTTPException(status_code=404, detail="Экземпляр не найден")
+    return copy
+
+@router.put("/{copy_id}", response_model=CopyInDB)
+@query_budget(6)
+async def update_copy(
+    copy_id: int, 
+    copy_update: CopyUpdate, 
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Обновить экземпляр"""
+    copy = await _get_copy_or_404(db, copy_id)
+    
+    # Обновляем поля
+    update_data = copy_update.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        if value is not None:
+            setattr(copy, field, value)
+    
+    await db.commit()
+    
+    # Возвращаем экземпляр с названием книги одним запросом
+    return await crud.copy.get_copy_details(db, copy_id=copy_id)
+
+@router.delete("/{copy_id}", status_code=204)
+@query_budget(4)
+async def delete_copy(copy_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Удалить экземпляр"""
+    copy = await _get_copy_or_404(db, copy_id)
+    await db.delete(copy)
+    await db.commit()
+    return None
+
+@router.patch("/{copy_id}/mark-borrowed", response_model=CopyInDB)
+@query_budget(6)
+async def mark_copy_borrowed(copy_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Пометить экземпляр как выданный"""
+    copy = await _get_copy_or_404(db, copy_id)
+    copy.status = "borrowed"
+    await db.commit()
+    
+    # Возвращаем экземпляр с названием книги одним запросом
+    return await crud.copy.get_copy_details(db, copy_id=copy_id)
+
+@router.patch("/{copy_id}/mark-available", response_model=CopyInDB)
+@query_budget(4)
+async def mark_copy_available(copy_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Пометить экземпляр как доступный"""
+    copy = await _get_copy_or_404(db, copy_id)
+    copy.status = "available"
+    await db.commit()
+    
+    # Возвращаем экземпляр с названием книги одним запросом
+    return await crud.copy.get_copy_details(db, copy_id=copy_id)
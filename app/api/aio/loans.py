@@ -0,0 +1,200 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, timedelta
+
+from app.config import settings
+from app.database import get_async_db, get_async_read_db
+from app.crud import aio as crud
+from app.api.responses import json_list
+from app.crud.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.query_budget import query_budget
+from app.models.loan import OPEN_LOAN_STATUSES, Loan
+from app.schemas.loan import (
+    FinesReport, LoanBatchCreate, LoanBatchResult, LoanCreate, LoanInDB,
+    LoanReturnBatch, LoanReturnBatchResult
+)
+
+router = APIRouter()
+
+@router.get("/", response_model=List[LoanInDB])
+@query_budget(1)
+async def read_loans(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    status: str = Query(None, description="Фильтр по статусу"),
+    after: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Получить список всех выдач"""
+    try:
+        loans = await crud.loan.get_loans_details(
+            db, skip=skip, limit=limit, status=status, after=after
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(loans, limit)
+    return json_list(LoanInDB, loans, headers={NEXT_CURSOR_HEADER: cursor} if cursor else None)
+
+@router.get("/fines", response_model=FinesReport)
+@query_budget(1)
+async def read_fines(
+    reader_id: Optional[int] = Query(None, ge=1, description="Только один читатель"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Начисленные штрафы за просрочку по читателям и итог по библиотеке"""
+    return await crud.overdue.get_fines_report(db, reader_id=reader_id)
+
+@router.get("/{loan_id}", response_model=LoanInDB)
+@query_budget(1)
+async def read_loan(loan_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Получить выдачу по ID"""
+    loan = await crud.loan.get_loan_details(db, loan_id=loan_id)
+    if loan is None:
+        raise HTTPException(status_code=404, detail="Выдача не найдена")
+    return loan
+
+@router.get("/reader/{reader_id}/active", response_model=List[LoanInDB])
+@query_budget(1)
+async def read_active_reader_loans(reader_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Получить активные выдачи читателя"""
+    return json_list(LoanInDB, await crud.loan.get_active_reader_loans_details(db, reader_id=reader_id))
+
+@router.get("/overdue/", response_model=List[LoanInDB])
+@query_budget(1)
+async def read_overdue_loans(db: AsyncSession = Depends(get_async_read_db)):
+    """Получить просроченные выдачи (отмечаются фоновой проверкой)"""
+    return json_list(LoanInDB, await crud.loan.get_overdue_loans_details(db))
+
+@router.post("/", response_model=LoanInDB, status_code=201)
+@query_budget(12)
+async def create_loan(loan: LoanCreate, db: AsyncSession = Depends(get_async_db)):
+    """Создать новую выдачу (взять книгу)"""
+    # Место в лимите читателя занимаем условным UPDATE его счетчика выдач
+    max_books = settings.MAX_BOOKS_PER_READER
+    if not await crud.reader.reserve_loans(db, reader_id=loan.reader_id, count=1, max_books=max_books):
+        await db.rollback()
+        reader = await crud.reader.get_reader(db, reader_id=loan.reader_id)
+        if reader is None:
+            raise HTTPException(status_code=404, detail="Читатель не найден")
+        if reader.status == "blocked":
+            raise HTTPException(status_code=400, detail="Читатель заблокирован")
+        raise HTTPException(status_code=400, detail=f"Превышен лимит книг (максимум {max_books})")
+    
+    # Занимаем экземпляр условным UPDATE: из двух параллельных запросов
+    # на один экземпляр успешен только один
+    if not await crud.copy.try_borrow_copy(db, copy_id=loan.copy_id):
+        await db.rollback()
+        if await crud.copy.get_copy(db, copy_id=loan.copy_id) is None:
+            raise HTTPException(status_code=404, detail="Экземпляр не найден")
+        raise HTTPException(status_code=400, detail="Экземпляр недоступен для выдачи")
+    
+    # Создаем выдачу
+    today = date.today()
+    due_date = today + timedelta(days=loan.loan_days)
+    
+    db_loan = Loan(
+        copy_id=loan.copy_id,
+        reader_id=loan.reader_id,
+        loan_date=today,
+        due_date=due_date,
+        status="active"
+    )
+    
+    db.add(db_loan)
+    await db.commit()
+    
+    # Возвращаем выдачу с дополнительной информацией одним запросом
+    return await crud.loan.get_loan_details(db, loan_id=db_loan.id)
+
+@router.post("/batch", response_model=LoanBatchResult)
+@query_budget(10)
+async def create_loans_batch(batch: LoanBatchCreate, db: AsyncSession = Depends(get_async_db)):
+    """Выдать читателю несколько экземпляров одной транзакцией (результат - по каждому)"""
+    if not batch.copy_ids and not batch.inventory_numbers:
+        raise HTTPException(status_code=400, detail="Не указаны экземпляры")
+    
+    reader = await crud.reader.get_reader(db, reader_id=batch.reader_id)
+    if reader is None:
+        raise HTTPException(status_code=404, detail="Читатель не найден")
+    if reader.status == "blocked":
+        raise HTTPException(status_code=400, detail="Читатель заблокирован")
+    
+    items = await crud.loan.checkout_copies(
+        db,
+        reader_id=batch.reader_id,
+        active_loans=reader.active_loans,
+        copy_ids=batch.copy_ids,
+        inventory_numbers=batch.inventory_numbers,
+        loan_days=batch.loan_days,
+        max_books=settings.MAX_BOOKS_PER_READER
+    )
+    return {
+        "reader_id": batch.reader_id,
+        "created": sum(1 for item in items if item["success"]),
+        "items": items
+    }
+
+@router.post("/return/batch", response_model=LoanReturnBatchResult)
+@query_budget(9)
+async def return_loans_batch(batch: LoanReturnBatch, db: AsyncSession = Depends(get_async_db)):
+    """Вернуть книги по инвентарным номерам (станции возврата, ящики book-drop)"""
+    items = await crud.loan.return_copies(db, inventory_numbers=batch.inventory_numbers)
+    return {
+        "returned": sum(1 for item in items if item["success"]),
+        "items": items
+    }
+
+@router.post("/return/{loan_id}", response_model=LoanInDB)
+@query_budget(10)
+async def return_loan(loan_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Вернуть книгу (закрыть выдачу)"""
+    loan = await crud.loan.get_loan_for_return(db, loan_id=loan_id)
+    if loan is None:
+        raise HTTPException(status_code=404, detail="Выдача не найдена")
+    
+    if loan.status not in OPEN_LOAN_STATUSES:
+        raise HTTPException(status_code=400, detail="Выдача уже закрыта")
+    
+    # Закрываем выдачу, возвращаем экземпляр и уменьшаем счетчик читателя;
+    # выдачу, закрытую параллельным запросом, повторно не закрываем
+    if not await crud.loan.close_loans(db, {loan.loan_id: loan}):
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Выдача уже закрыта")
+    
+    await db.commit()
+    
+    # Возвращаем выдачу с дополнительной информацией одним запросом
+    return await crud.loan.get_loan_details(db, loan_id=loan_id)
+
+@router.delete("/{loan_id}", status_code=204)
+@query_budget(5)
+async def delete_loan(loan_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Удалить выдачу (только для админа)"""
+    loan = await db.get(Loan, loan_id)
+    if loan is None:
+        raise HTTPException(status_code=404, detail="Выдача не найден")
+    
+    if loan.status in OPEN_LOAN_STATUSES:
+        await crud.reader.release_loans(db, {loan.reader_id: 1})
+    await db.delete(loan)
+    await db.commit()
+    return None
+
+@router.get("/stats/summary")
+@query_budget(1)
+async def get_loans_summary(db: AsyncSession = Depends(get_async_read_db)):
+    """Статистика по выдачам (из таблицы счетчиков)"""
+    counters = await crud.counters.get_counters(db)
+    total_loans = sum(
+        value for name, value in counters.items() if name.startswith("loans:")
+    )
+    overdue_loans = counters.get("loans:overdue", 0)
+    active_loans = counters.get("loans:active", 0) + overdue_loans
+    
+    return {
+        "total_loans": total_loans,
+        "active_loans": active_loans,
+        "overdue_loans": overdue_loans,
+        "returned_loans": total_loans - active_loans
+    }
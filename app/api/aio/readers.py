@@ -0,0 +1,147 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.database import get_async_db, get_async_read_db
+from app.crud import aio as crud
+from app.api import readers
+from app.api.conditional import etag_matches, make_etag, not_modified, versions_etag
+from app.api.responses import cached_response_async, json_item, json_list
+from app.cache import item_tags
+from app.crud.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.query_budget import query_budget
+from app.models.reader import Reader
+from app.schemas.reader import ReaderCreate, ReaderInDB, ReaderMatch, ReaderUpdate
+
+router = APIRouter()
+
+@router.get("/", response_model=List[ReaderInDB])
+@query_budget(2)
+async def read_readers(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Получить список всех читателей (ETag по версии таблицы читателей)"""
+    etag = versions_etag(["readers"], await crud.counters.get_versions(db, ["readers"]))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        readers = await crud.reader.get_readers(db, skip=skip, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"ETag": etag}
+    cursor = next_cursor(readers, limit)
+    if cursor:
+        headers[NEXT_CURSOR_HEADER] = cursor
+    return json_list(ReaderInDB, readers, headers=headers)
+
+# Нечеткий поиск идет по индексу в памяти, который загружает синхронная сессия
+router.get("/search/", response_model=List[ReaderMatch])(readers.search_readers_fuzzy)
+
+@router.get("/{reader_id}", response_model=ReaderInDB)
+@query_budget(2)
+async def read_reader(reader_id: int, request: Request, response: Response,
+                      db: AsyncSession = Depends(get_async_read_db)):
+    """Получить читателя по ID (ETag по версии строки)"""
+    version = await crud.reader.get_reader_version(db, reader_id=reader_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Читатель не найден")
+    etag = make_etag("reader", reader_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    reader = await crud.reader.get_reader(db, reader_id=reader_id)
+    if reader is None:
+        raise HTTPException(status_code=404, detail="Читатель не найден")
+    response.headers["ETag"] = etag
+    return reader
+
+@router.get("/card/{library_card}", response_model=ReaderInDB)
+@query_budget(1)
+async def read_reader_by_card(library_card: str, request: Request,
+                              db: AsyncSession = Depends(get_async_read_db)):
+    """Получить читателя по номеру читательского билета (кэш ответов)"""
+    async def build():
+        reader = await crud.reader.get_reader_by_card(db, library_card=library_card)
+        if reader is None:
+            raise HTTPException(status_code=404, detail="Читатель не найден")
+        return json_item(ReaderInDB, reader), item_tags("readers", reader.id)
+
+    return await cached_response_async(request, build)
+
+@router.post("/", response_model=ReaderInDB, status_code=201)
+@query_budget(6)
+async def create_reader(reader: ReaderCreate, db: AsyncSession = Depends(get_async_db)):
+    """Создать нового читателя"""
+    # Проверяем, есть ли уже читатель с таким номером билета
+    existing = await crud.reader.get_reader_by_card(db, library_card=reader.library_card)
+    if existing:
+        raise HTTPException(status_code=400, detail="Читатель с таким номером билета уже существует")
+    
+    db_reader = Reader(
+        full_name=reader.full_name,
+        library_card=reader.library_card,
+        email=reader.email,
+        phone=reader.phone
+    )
+    db.add(db_reader)
+    await db.commit()
+    await db.refresh(db_reader)
+    return db_reader
+
+async def _get_reader_or_404(db: AsyncSession, reader_id: int) -> Reader:
+    reader = await crud.reader.get_reader(db, reader_id=reader_id)
+    if reader is None:
+        raise HTTPException(status_code=404, detail="Читатель не найден")
+    return reader
+
+@router.put("/{reader_id}", response_model=ReaderInDB)
+@query_budget(4)
+async def update_reader(
+    reader_id: int, 
+    reader_update: ReaderUpdate, 
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Обновить читателя"""
+    reader = await _get_reader_or_404(db, reader_id)
+    
+    # Обновляем поля
+    update_data = reader_update.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        if value is not None:
+            setattr(reader, field, value)
+    
+    await db.commit()
+    await db.refresh(reader)
+    return reader
+
+@router.delete("/{reader_id}", status_code=204)
+@query_budget(4)
+async def delete_reader(reader_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Удалить читателя"""
+    reader = await _get_reader_or_404(db, reader_id)
+    await db.delete(reader)
+    await db.commit()
+    return None
+
+@router.patch("/{reader_id}/block", response_model=ReaderInDB)
+@query_budget(6)
+async def block_reader(reader_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Заблокировать читателя"""
+    reader = await _get_reader_or_404(db, reader_id)
+    reader.status = "blocked"
+    await db.commit()
+    await db.refresh(reader)
+    return reader
+
+@router.patch("/{reader_id}/activate", response_model=ReaderInDB)
+@query_budget(4)
+async def activate_reader(reader_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Активировать читателя"""
+    reader = await _get_reader_or_404(db, reader_id)
+    reader.status = "active"
+    await db.commit()
+    await db.refresh(reader)
+    return reader
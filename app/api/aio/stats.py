@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_read_db
+from app.query_budget import query_budget
+from app.crud import aio as crud
+from app.api import stats
+from app.schemas.stats import CacheStats, DashboardStats
+
+router = APIRouter()
+
+@router.get("/dashboard", response_model=DashboardStats)
+@query_budget(1)
+async def read_dashboard_stats(db: AsyncSession = Depends(get_async_read_db)):
+    """Статистика для главной страницы: книги, экземпляры, читатели и выдачи"""
+    return await crud.stats.get_dashboard_stats(db, ttl=settings.STATS_CACHE_TTL)
+
+# Статистика кэша ответов не обращается к БД
+router.get("/cache", response_model=CacheStats)(stats.read_cache_stats)
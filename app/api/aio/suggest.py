@@ -0,0 +1,5 @@
+# Подсказки ищут по индексу в памяти, который загружает синхронная сессия -
+# маршрут остается синхронным (см. app/api/aio/__init__.py)
+from app.api.suggest import router
+
+__all__ = ["router"]
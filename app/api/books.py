@@ -1,37 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import io
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app import crud
+from app.crud import catalog_import
+from app.api.conditional import collection_etag, etag_matches, make_etag, not_modified
+from app.api.responses import cached_response, json_item, json_list
+from app.cache import item_tags
+from app.crud.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.query_budget import query_budget
 from app.schemas.book import BookCreate, BookUpdate, BookInDB
+from app.schemas.catalog_import import ImportReport
 
 router = APIRouter()
 
 @router.get("/", response_model=List[BookInDB])
+@query_budget(2)
 def read_books(
+    request: Request,
     skip: int = Query(0, ge=0, description="Пропустить первых N записей"),
     limit: int = Query(100, ge=1, le=1000, description="Лимит записей"),
-    db: Session = Depends(get_db)
+    after: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+    db: Session = Depends(get_read_db)
 ):
-    """Получить список всех книг"""
-    books = crud.book.get_books(db, skip=skip, limit=limit)
-    return books
+    """Получить список всех книг (ETag по версии таблицы книг, кэш ответов)"""
+    def build():
+        etag = collection_etag(db, ["books"])
+        if etag_matches(request, etag):
+            return not_modified(etag), ()
+        try:
+            books = crud.book.get_books(db, skip=skip, limit=limit, after=after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {"ETag": etag}
+        cursor = next_cursor(books, limit)
+        if cursor:
+            headers[NEXT_CURSOR_HEADER] = cursor
+        return json_list(BookInDB, books, headers=headers), ["books"]
+
+    return cached_response(request, build)
 
 @router.get("/{book_id}", response_model=BookInDB)
-def read_book(book_id: int, db: Session = Depends(get_db)):
-    """Получить книгу по ID"""
-    db_book = crud.book.get_book(db, book_id=book_id)
-    if db_book is None:
-        raise HTTPException(status_code=404, detail="Книга не найдена")
-    return db_book
+@query_budget(2)
+def read_book(book_id: int, request: Request, db: Session = Depends(get_read_db)):
+    """Получить книгу по ID (ETag по версии строки, кэш ответов)"""
+    def build():
+        version = crud.book.get_book_version(db, book_id=book_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Книга не найдена")
+        etag = make_etag("book", book_id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag), ()
+        db_book = crud.book.get_book(db, book_id=book_id)
+        if db_book is None:
+            raise HTTPException(status_code=404, detail="Книга не найдена")
+        return json_item(BookInDB, db_book, headers={"ETag": etag}), item_tags("books", book_id)
+
+    return cached_response(request, build)
 
 @router.post("/", response_model=BookInDB, status_code=201)
+@query_budget(5)
 def create_book(book: BookCreate, db: Session = Depends(get_db)):
     """Создать новую книгу"""
     return crud.book.create_book(db=db, book=book)
 
+# Без бюджета: запросы выполняются на каждую пачку из DEFAULT_BATCH_SIZE строк
+@router.post("/import", response_model=ImportReport)
+def import_books(
+    file: UploadFile = File(..., description="Файл CSV или JSONL"),
+    format: Optional[str] = Query(None, pattern="^(csv|jsonl)$", description="Формат (по умолчанию - по расширению)"),
+    batch_size: int = Query(catalog_import.DEFAULT_BATCH_SIZE, ge=1, le=10000, description="Строк в одной транзакции"),
+    db: Session = Depends(get_db)
+):
+    """Массовый импорт книг и экземпляров; файл читается потоково, ошибки - по строкам"""
+    fmt = format or catalog_import.detect_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Не удалось определить формат файла (csv или jsonl)")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return catalog_import.import_catalog(
+            db, catalog_import.read_rows(stream, fmt), batch_size=batch_size
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Файл должен быть в кодировке UTF-8")
+    finally:
+        stream.detach()
+
 @router.put("/{book_id}", response_model=BookInDB)
+@query_budget(4)
 def update_book(
     book_id: int, 
     book_update: BookUpdate, 
@@ -44,6 +103,7 @@ def update_book(
     return db_book
 
 @router.delete("/{book_id}", status_code=204)
+@query_budget(4)
 def delete_book(book_id: int, db: Session = Depends(get_db)):
     """Удалить книгу"""
     success = crud.book.delete_book(db, book_id=book_id)
@@ -52,12 +112,15 @@ def delete_book(book_id: int, db: Session = Depends(get_db)):
     return None
 
 @router.get("/search/", response_model=List[BookInDB])
+@query_budget(1)
 def search_books(
     q: str = Query(..., min_length=1, description="Поисковый запрос"),
-    db: Session = Depends(get_db)
+    skip: int = Query(0, ge=0, description="Пропустить первых N результатов"),
+    limit: int = Query(20, ge=1, le=100, description="Лимит результатов"),
+    db: Session = Depends(get_read_db)
 ):
-    """Поиск книг по названию или автору"""
-    books = crud.book.search_books(db, query=q)
+    """Полнотекстовый поиск книг по названию или автору (по релевантности)"""
+    books = crud.book.search_books(db, query=q, skip=skip, limit=limit)
     if not books:
         raise HTTPException(status_code=404, detail="Книги не найдены")
-    return books
\ No newline at end of file
+    return json_list(BookInDB, books)
\ No newline at end of file
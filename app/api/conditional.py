@@ -0,0 +1,39 @@
+"""
+Условные GET: ETag и If-None-Match.
+
+ETag списков строится из версий таблиц (счетчики "version:<таблица>",
+см. app/models/counter.py), ETag карточек - из версий строк (колонка version).
+Версии читаются раньше самих данных одним маленьким запросом: если ETag
+совпал с If-None-Match, ответ 304 отдается без чтения и сериализации строк.
+"""
+from typing import Dict, Sequence
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from app.crud.counters import get_versions
+
+def make_etag(*parts) -> str:
+    """Сильный ETag из частей: "books.12", "copy.7.2.book.5.3" """
+    return '"' + ".".join(str(part) for part in parts) + '"'
+
+def versions_etag(tables: Sequence[str], versions: Dict[str, int]) -> str:
+    """ETag списка из уже прочитанных версий таблиц"""
+    return make_etag(*(f"{table}.{versions[table]}" for table in tables))
+
+def collection_etag(db: Session, tables: Sequence[str]) -> str:
+    """ETag списка, содержимое которого зависит от таблиц tables"""
+    return versions_etag(tables, get_versions(db, tables))
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Совпадает ли etag с заголовком If-None-Match (слабое сравнение, RFC 9110)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in header.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
@@ -1,91 +1,92 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date
 
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app import crud
+from app.api.conditional import collection_etag, etag_matches, make_etag, not_modified
+from app.api.responses import cached_response, json_item, json_list
+from app.cache import item_tags
+from app.crud.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.query_budget import query_budget
 from app.models.copy import Copy
 from app.models.book import Book
 from app.schemas.copy import CopyCreate, CopyInDB, CopyUpdate
 
 router = APIRouter()
 
+# Списки экземпляров содержат названия книг, поэтому их ETag зависит от обеих таблиц
+COPY_LIST_TABLES = ["copies", "books"]
+
 @router.get("/", response_model=List[CopyInDB])
+@query_budget(2)
 def read_copies(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status: str = Query(None, description="Фильтр по статусу"),
-    db: Session = Depends(get_db)
+    after: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+    db: Session = Depends(get_read_db)
 ):
-    """Получить список всех экземпляров"""
-    query = db.query(Copy)
-    
-    if status:
-        query = query.filter(Copy.status == status)
-    
-    copies = query.offset(skip).limit(limit).all()
-    
-    # Добавляем название книги к каждому экземпляру
-    result = []
-    for copy in copies:
-        copy_dict = copy.__dict__.copy()
-        book = db.query(Book).filter(Book.id == copy.book_id).first()
-        if book:
-            copy_dict["book_title"] = book.title
-        result.append(CopyInDB(**copy_dict))
-    
-    return result
+    """Получить список всех экземпляров (ETag по версиям таблиц)"""
+    etag = collection_etag(db, COPY_LIST_TABLES)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        copies = crud.copy.get_copies_details(
+            db, skip=skip, limit=limit, status=status, after=after
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"ETag": etag}
+    cursor = next_cursor(copies, limit)
+    if cursor:
+        headers[NEXT_CURSOR_HEADER] = cursor
+    return json_list(CopyInDB, copies, headers=headers)
 
 @router.get("/{copy_id}", response_model=CopyInDB)
-def read_copy(copy_id: int, db: Session = Depends(get_db)):
-    """Получить экземпляр по ID"""
-    copy = db.query(Copy).filter(Copy.id == copy_id).first()
+@query_budget(2)
+def read_copy(copy_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """Получить экземпляр по ID (ETag по версиям строк экземпляра и книги)"""
+    versions = crud.copy.get_copy_version(db, copy_id=copy_id)
+    if versions is None:
+        raise HTTPException(status_code=404, detail="Экземпляр не найден")
+    copy_version, book_version = versions
+    etag = make_etag("copy", copy_id, copy_version, "book", book_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    copy = crud.copy.get_copy_details(db, copy_id=copy_id)
     if copy is None:
         raise HTTPException(status_code=404, detail="Экземпляр не найден")
-    
-    # Добавляем название книги
-    copy_dict = copy.__dict__.copy()
-    book = db.query(Book).filter(Book.id == copy.book_id).first()
-    if book:
-        copy_dict["book_title"] = book.title
-    
-    return CopyInDB(**copy_dict)
+    response.headers["ETag"] = etag
+    return copy
 
 @router.get("/book/{book_id}/available", response_model=List[CopyInDB])
-def read_available_copies(book_id: int, db: Session = Depends(get_db)):
-    """Получить доступные экземпляры книги"""
-    copies = db.query(Copy).filter(
-        Copy.book_id == book_id,
-        Copy.status == "available"
-    ).all()
-    
-    # Добавляем название книги
-    result = []
-    for copy in copies:
-        copy_dict = copy.__dict__.copy()
-        book = db.query(Book).filter(Book.id == copy.book_id).first()
-        if book:
-            copy_dict["book_title"] = book.title
-        result.append(CopyInDB(**copy_dict))
-    
-    return result
+@query_budget(2)
+def read_available_copies(book_id: int, request: Request, db: Session = Depends(get_read_db)):
+    """Получить доступные экземпляры книги (ETag по версиям таблиц)"""
+    etag = collection_etag(db, COPY_LIST_TABLES)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    copies = crud.copy.get_available_copies_details(db, book_id=book_id)
+    return json_list(CopyInDB, copies, headers={"ETag": etag})
 
 @router.get("/inventory/{inventory_number}", response_model=CopyInDB)
-def read_copy_by_inventory(inventory_number: str, db: Session = Depends(get_db)):
-    """Получить экземпляр по инвентарному номеру"""
-    copy = db.query(Copy).filter(Copy.inventory_number == inventory_number).first()
-    if copy is None:
-        raise HTTPException(status_code=404, detail="Экземпляр не найден")
-    
-    # Добавляем название книги
-    copy_dict = copy.__dict__.copy()
-    book = db.query(Book).filter(Book.id == copy.book_id).first()
-    if book:
-        copy_dict["book_title"] = book.title
-    
-    return CopyInDB(**copy_dict)
+@query_budget(1)
+def read_copy_by_inventory(inventory_number: str, request: Request, db: Session = Depends(get_read_db)):
+    """Получить экземпляр по инвентарному номеру (кэш ответов)"""
+    def build():
+        copy = crud.copy.get_copy_details_by_inventory(db, inventory_number=inventory_number)
+        if copy is None:
+            raise HTTPException(status_code=404, detail="Экземпляр не найден")
+        # Карточка содержит название книги - запись сбрасывается и при изменении книги
+        return json_item(CopyInDB, copy), item_tags("copies", copy.id) + item_tags("books", copy.book_id)
+
+    return cached_response(request, build)
 
 @router.post("/", response_model=CopyInDB, status_code=201)
+@query_budget(8)
 def create_copy(copy: CopyCreate, db: Session = Depends(get_db)):
     """Создать новый экземпляр"""
     # Проверяем, существует ли книга
@@ -106,15 +107,12 @@ def create_copy(copy: CopyCreate, db: Session = Depends(get_db)):
     )
     db.add(db_copy)
     db.commit()
-    db.refresh(db_copy)
-    
-    # Добавляем название книги
-    copy_dict = db_copy.__dict__.copy()
-    copy_dict["book_title"] = book.title
     
-    return CopyInDB(**copy_dict)
+    # Возвращаем экземпляр с названием книги одним запросом
+    return crud.copy.get_copy_details(db, copy_id=db_copy.id)
 
 @router.put("/{copy_id}", response_model=CopyInDB)
+@query_budget(6)
 def update_copy(
     copy_id: int, 
     copy_update: CopyUpdate, 
@@ -132,17 +130,12 @@ def update_copy(
             setattr(copy, field, value)
     
     db.commit()
-    db.refresh(copy)
     
-    # Добавляем название книги
-    copy_dict = copy.__dict__.copy()
-    book = db.query(Book).filter(Book.id == copy.book_id).first()
-    if book:
-        copy_dict["book_title"] = book.title
-    
-    return CopyInDB(**copy_dict)
+    # Возвращаем экземпляр с названием книги одним запросом
+    return crud.copy.get_copy_details(db, copy_id=copy_id)
 
 @router.delete("/{copy_id}", status_code=204)
+@query_budget(4)
 def delete_copy(copy_id: int, db: Session = Depends(get_db)):
     """Удалить экземпляр"""
     copy = db.query(Copy).filter(Copy.id == copy_id).first()
@@ -154,6 +147,7 @@ def delete_copy(copy_id: int, db: Session = Depends(get_db)):
     return None
 
 @router.patch("/{copy_id}/mark-borrowed", response_model=CopyInDB)
+@query_budget(6)
 def mark_copy_borrowed(copy_id: int, db: Session = Depends(get_db)):
     """Пометить экземпляр как выданный"""
     copy = db.query(Copy).filter(Copy.id == copy_id).first()
@@ -162,17 +156,12 @@ def mark_copy_borrowed(copy_id: int, db: Session = Depends(get_db)):
     
     copy.status = "borrowed"
     db.commit()
-    db.refresh(copy)
-    
-    # Добавляем название книги
-    copy_dict = copy.__dict__.copy()
-    book = db.query(Book).filter(Book.id == copy.book_id).first()
-    if book:
-        copy_dict["book_title"] = book.title
     
-    return CopyInDB(**copy_dict)
+    # Возвращаем экземпляр с названием книги одним запросом
+    return crud.copy.get_copy_details(db, copy_id=copy_id)
 
 @router.patch("/{copy_id}/mark-available", response_model=CopyInDB)
+@query_budget(4)
 def mark_copy_available(copy_id: int, db: Session = Depends(get_db)):
     """Пометить экземпляр как доступный"""
     copy = db.query(Copy).filter(Copy.id == copy_id).first()
@@ -181,12 +170,6 @@ def mark_copy_available(copy_id: int, db: Session = Depends(get_db)):
     
     copy.status = "available"
     db.commit()
-    db.refresh(copy)
-    
-    # Добавляем название книги
-    copy_dict = copy.__dict__.copy()
-    book = db.query(Book).filter(Book.id == copy.book_id).first()
-    if book:
-        copy_dict["book_title"] = book.title
     
-    return CopyInDB(**copy_dict)
\ No newline at end of file
+    # Возвращаем экземпляр с названием книги одним запросом
+    return crud.copy.get_copy_details(db, copy_id=copy_id)
\ No newline at end of file
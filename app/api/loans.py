@@ -1,162 +1,94 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import date, timedelta
 
-from app.database import get_db
-from app.models.loan import Loan
-from app.models.copy import Copy
-from app.models.reader import Reader
-from app.models.book import Book
-from app.schemas.loan import LoanCreate, LoanInDB
+from app.config import settings
+from app.database import get_db, get_read_db
+from app import crud
+from app.api.responses import json_list
+from app.crud.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.query_budget import query_budget
+from app.models.loan import OPEN_LOAN_STATUSES, Loan
+from app.schemas.loan import (
+    FinesReport, LoanBatchCreate, LoanBatchResult, LoanCreate, LoanInDB,
+    LoanReturnBatch, LoanReturnBatchResult
+)
 
 router = APIRouter()
 
 @router.get("/", response_model=List[LoanInDB])
+@query_budget(1)
 def read_loans(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     status: str = Query(None, description="Фильтр по статусу"),
-    db: Session = Depends(get_db)
+    after: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+    db: Session = Depends(get_read_db)
 ):
     """Получить список всех выдач"""
-    query = db.query(Loan)
-    
-    if status:
-        query = query.filter(Loan.status == status)
-    
-    loans = query.offset(skip).limit(limit).all()
-    
-    # Добавляем дополнительную информацию
-    result = []
-    for loan in loans:
-        loan_dict = loan.__dict__.copy()
-        
-        # Информация об экземпляре и книге
-        copy = db.query(Copy).filter(Copy.id == loan.copy_id).first()
-        if copy:
-            loan_dict["copy_inventory"] = copy.inventory_number
-            book = db.query(Book).filter(Book.id == copy.book_id).first()
-            if book:
-                loan_dict["book_title"] = book.title
-        
-        # Информация о читателе
-        reader = db.query(Reader).filter(Reader.id == loan.reader_id).first()
-        if reader:
-            loan_dict["reader_name"] = reader.full_name
-        
-        result.append(LoanInDB(**loan_dict))
-    
-    return result
+    try:
+        loans = crud.loan.get_loans_details(
+            db, skip=skip, limit=limit, status=status, after=after
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    cursor = next_cursor(loans, limit)
+    return json_list(LoanInDB, loans, headers={NEXT_CURSOR_HEADER: cursor} if cursor else None)
+
+@router.get("/fines", response_model=FinesReport)
+@query_budget(1)
+def read_fines(
+    reader_id: Optional[int] = Query(None, ge=1, description="Только один читатель"),
+    db: Session = Depends(get_read_db)
+):
+    """Начисленные штрафы за просрочку по читателям и итог по библиотеке"""
+    return crud.overdue.get_fines_report(db, reader_id=reader_id)
 
 @router.get("/{loan_id}", response_model=LoanInDB)
-def read_loan(loan_id: int, db: Session = Depends(get_db)):
+@query_budget(1)
+def read_loan(loan_id: int, db: Session = Depends(get_read_db)):
     """Получить выдачу по ID"""
-    loan = db.query(Loan).filter(Loan.id == loan_id).first()
+    loan = crud.loan.get_loan_details(db, loan_id=loan_id)
     if loan is None:
         raise HTTPException(status_code=404, detail="Выдача не найдена")
-    
-    loan_dict = loan.__dict__.copy()
-    
-    # Добавляем дополнительную информацию
-    copy = db.query(Copy).filter(Copy.id == loan.copy_id).first()
-    if copy:
-        loan_dict["copy_inventory"] = copy.inventory_number
-        book = db.query(Book).filter(Book.id == copy.book_id).first()
-        if book:
-            loan_dict["book_title"] = book.title
-    
-    reader = db.query(Reader).filter(Reader.id == loan.reader_id).first()
-    if reader:
-        loan_dict["reader_name"] = reader.full_name
-    
-    return LoanInDB(**loan_dict)
+    return loan
 
 @router.get("/reader/{reader_id}/active", response_model=List[LoanInDB])
-def read_active_reader_loans(reader_id: int, db: Session = Depends(get_db)):
+@query_budget(1)
+def read_active_reader_loans(reader_id: int, db: Session = Depends(get_read_db)):
     """Получить активные выдачи читателя"""
-    loans = db.query(Loan).filter(
-        Loan.reader_id == reader_id,
-        Loan.status == "active"
-    ).all()
-    
-    result = []
-    for loan in loans:
-        loan_dict = loan.__dict__.copy()
-        
-        copy = db.query(Copy).filter(Copy.id == loan.copy_id).first()
-        if copy:
-            loan_dict["copy_inventory"] = copy.inventory_number
-            book = db.query(Book).filter(Book.id == copy.book_id).first()
-            if book:
-                loan_dict["book_title"] = book.title
-        
-        reader = db.query(Reader).filter(Reader.id == loan.reader_id).first()
-        if reader:
-            loan_dict["reader_name"] = reader.full_name
-        
-        result.append(LoanInDB(**loan_dict))
-    
-    return result
+    return json_list(LoanInDB, crud.loan.get_active_reader_loans_details(db, reader_id=reader_id))
 
 @router.get("/overdue/", response_model=List[LoanInDB])
-def read_overdue_loans(db: Session = Depends(get_db)):
-    """Получить просроченные выдачи"""
-    today = date.today()
-    loans = db.query(Loan).filter(
-        Loan.status == "active",
-        Loan.due_date < today
-    ).all()
-    
-    result = []
-    for loan in loans:
-        loan_dict = loan.__dict__.copy()
-        
-        copy = db.query(Copy).filter(Copy.id == loan.copy_id).first()
-        if copy:
-            loan_dict["copy_inventory"] = copy.inventory_number
-            book = db.query(Book).filter(Book.id == copy.book_id).first()
-            if book:
-                loan_dict["book_title"] = book.title
-        
-        reader = db.query(Reader).filter(Reader.id == loan.reader_id).first()
-        if reader:
-            loan_dict["reader_name"] = reader.full_name
-        
-        result.append(LoanInDB(**loan_dict))
-    
-    return result
+@query_budget(1)
+def read_overdue_loans(db: Session = Depends(get_read_db)):
+    """Получить просроченные выдачи (отмечаются фоновой проверкой)"""
+    return json_list(LoanInDB, crud.loan.get_overdue_loans_details(db))
 
 @router.post("/", response_model=LoanInDB, status_code=201)
+@query_budget(12)
 def create_loan(loan: LoanCreate, db: Session = Depends(get_db)):
     """Создать новую выдачу (взять книгу)"""
-    # Проверяем существование читателя
-    reader = db.query(Reader).filter(Reader.id == loan.reader_id).first()
-    if not reader:
-        raise HTTPException(status_code=404, detail="Читатель не найден")
-    
-    # Проверяем статус читателя
-    if reader.status == "blocked":
-        raise HTTPException(status_code=400, detail="Читатель заблокирован")
-    
-    # Проверяем существование экземпляра
-    copy = db.query(Copy).filter(Copy.id == loan.copy_id).first()
-    if not copy:
-        raise HTTPException(status_code=404, detail="Экземпляр не найден")
-    
-    # Проверяем доступность экземпляра
-    if copy.status != "available":
+    # Место в лимите читателя занимаем условным UPDATE его счетчика выдач
+    max_books = settings.MAX_BOOKS_PER_READER
+    if not crud.reader.reserve_loans(db, reader_id=loan.reader_id, count=1, max_books=max_books):
+        db.rollback()
+        reader = crud.reader.get_reader(db, reader_id=loan.reader_id)
+        if reader is None:
+            raise HTTPException(status_code=404, detail="Читатель не найден")
+        if reader.status == "blocked":
+            raise HTTPException(status_code=400, detail="Читатель заблокирован")
+        raise HTTPException(status_code=400, detail=f"Превышен лимит книг (максимум {max_books})")
+    
+    # Занимаем экземпляр условным UPDATE: из двух параллельных запросов
+    # на один экземпляр успешен только один
+    if not crud.copy.try_borrow_copy(db, copy_id=loan.copy_id):
+        db.rollback()
+        if crud.copy.get_copy(db, copy_id=loan.copy_id) is None:
+            raise HTTPException(status_code=404, detail="Экземпляр не найден")
         raise HTTPException(status_code=400, detail="Экземпляр недоступен для выдачи")
     
-    # Проверяем лимит книг у читателя (максимум 5)
-    active_loans_count = db.query(Loan).filter(
-        Loan.reader_id == loan.reader_id,
-        Loan.status == "active"
-    ).count()
-    
-    if active_loans_count >= 5:
-        raise HTTPException(status_code=400, detail="Превышен лимит книг (максимум 5)")
-    
     # Создаем выдачу
     today = date.today()
     due_date = today + timedelta(days=loan.loan_days)
@@ -170,86 +102,99 @@ def create_loan(loan: LoanCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_loan)
-    
-    # Меняем статус экземпляра
-    copy.status = "borrowed"
-    
     db.commit()
-    db.refresh(db_loan)
-    
-    # Добавляем дополнительную информацию для ответа
-    loan_dict = db_loan.__dict__.copy()
-    loan_dict["copy_inventory"] = copy.inventory_number
-    
-    book = db.query(Book).filter(Book.id == copy.book_id).first()
-    if book:
-        loan_dict["book_title"] = book.title
     
-    loan_dict["reader_name"] = reader.full_name
+    # Возвращаем выдачу с дополнительной информацией одним запросом
+    return crud.loan.get_loan_details(db, loan_id=db_loan.id)
+
+@router.post("/batch", response_model=LoanBatchResult)
+@query_budget(10)
+def create_loans_batch(batch: LoanBatchCreate, db: Session = Depends(get_db)):
+    """Выдать читателю несколько экземпляров одной транзакцией (результат - по каждому)"""
+    if not batch.copy_ids and not batch.inventory_numbers:
+        raise HTTPException(status_code=400, detail="Не указаны экземпляры")
+    
+    reader = crud.reader.get_reader(db, reader_id=batch.reader_id)
+    if reader is None:
+        raise HTTPException(status_code=404, detail="Читатель не найден")
+    if reader.status == "blocked":
+        raise HTTPException(status_code=400, detail="Читатель заблокирован")
     
-    return LoanInDB(**loan_dict)
+    items = crud.loan.checkout_copies(
+        db,
+        reader_id=batch.reader_id,
+        active_loans=reader.active_loans,
+        copy_ids=batch.copy_ids,
+        inventory_numbers=batch.inventory_numbers,
+        loan_days=batch.loan_days,
+        max_books=settings.MAX_BOOKS_PER_READER
+    )
+    return {
+        "reader_id": batch.reader_id,
+        "created": sum(1 for item in items if item["success"]),
+        "items": items
+    }
+
+@router.post("/return/batch", response_model=LoanReturnBatchResult)
+@query_budget(9)
+def return_loans_batch(batch: LoanReturnBatch, db: Session = Depends(get_db)):
+    """Вернуть книги по инвентарным номерам (станции возврата, ящики book-drop)"""
+    items = crud.loan.return_copies(db, inventory_numbers=batch.inventory_numbers)
+    return {
+        "returned": sum(1 for item in items if item["success"]),
+        "items": items
+    }
 
 @router.post("/return/{loan_id}", response_model=LoanInDB)
+@query_budget(10)
 def return_loan(loan_id: int, db: Session = Depends(get_db)):
     """Вернуть книгу (закрыть выдачу)"""
-    loan = db.query(Loan).filter(Loan.id == loan_id).first()
+    loan = crud.loan.get_loan_for_return(db, loan_id=loan_id)
     if loan is None:
         raise HTTPException(status_code=404, detail="Выдача не найдена")
     
-    if loan.status != "active":
+    if loan.status not in OPEN_LOAN_STATUSES:
         raise HTTPException(status_code=400, detail="Выдача уже закрыта")
     
-    # Обновляем выдачу
-    loan.return_date = date.today()
-    loan.status = "returned"
-    
-    # Возвращаем экземпляр
-    copy = db.query(Copy).filter(Copy.id == loan.copy_id).first()
-    if copy:
-        copy.status = "available"
+    # Закрываем выдачу, возвращаем экземпляр и уменьшаем счетчик читателя;
+    # выдачу, закрытую параллельным запросом, повторно не закрываем
+    if not crud.loan.close_loans(db, {loan.loan_id: loan}):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Выдача уже закрыта")
     
     db.commit()
-    db.refresh(loan)
-    
-    # Добавляем дополнительную информацию для ответа
-    loan_dict = loan.__dict__.copy()
-    
-    if copy:
-        loan_dict["copy_inventory"] = copy.inventory_number
-        book = db.query(Book).filter(Book.id == copy.book_id).first()
-        if book:
-            loan_dict["book_title"] = book.title
     
-    reader = db.query(Reader).filter(Reader.id == loan.reader_id).first()
-    if reader:
-        loan_dict["reader_name"] = reader.full_name
-    
-    return LoanInDB(**loan_dict)
+    # Возвращаем выдачу с дополнительной информацией одним запросом
+    return crud.loan.get_loan_details(db, loan_id=loan_id)
 
 @router.delete("/{loan_id}", status_code=204)
+@query_budget(5)
 def delete_loan(loan_id: int, db: Session = Depends(get_db)):
     """Удалить выдачу (только для админа)"""
     loan = db.query(Loan).filter(Loan.id == loan_id).first()
     if loan is None:
         raise HTTPException(status_code=404, detail="Выдача не найден")
     
+    if loan.status in OPEN_LOAN_STATUSES:
+        crud.reader.release_loans(db, {loan.reader_id: 1})
     db.delete(loan)
     db.commit()
     return None
 
 @router.get("/stats/summary")
-def get_loans_summary(db: Session = Depends(get_db)):
-    """Статистика по выдачам"""
-    total_loans = db.query(Loan).count()
-    active_loans = db.query(Loan).filter(Loan.status == "active").count()
-    overdue_loans = db.query(Loan).filter(
-        Loan.status == "active",
-        Loan.due_date < date.today()
-    ).count()
+@query_budget(1)
+def get_loans_summary(db: Session = Depends(get_read_db)):
+    """Статистика по выдачам (из таблицы счетчиков)"""
+    counters = crud.counters.get_counters(db)
+    total_loans = sum(
+        value for name, value in counters.items() if name.startswith("loans:")
+    )
+    overdue_loans = counters.get("loans:overdue", 0)
+    active_loans = counters.get("loans:active", 0) + overdue_loans
     
     return {
         "total_loans": total_loans,
         "active_loans": active_loans,
         "overdue_loans": overdue_loans,
         "returned_loans": total_loans - active_loans
-    }
\ No newline at end of file
+    }
@@ -1,40 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app import crud
+from app.api.conditional import collection_etag, etag_matches, make_etag, not_modified
+from app.api.responses import cached_response, json_item, json_list
+from app.cache import item_tags
+from app.crud.pagination import NEXT_CURSOR_HEADER, next_cursor
+from app.query_budget import query_budget
 from app.models.reader import Reader
-from app.schemas.reader import ReaderCreate, ReaderInDB, ReaderUpdate
+from app.schemas.reader import ReaderCreate, ReaderInDB, ReaderMatch, ReaderUpdate
+from app.search.trigram import search_readers
 
 router = APIRouter()
 
 @router.get("/", response_model=List[ReaderInDB])
+@query_budget(2)
 def read_readers(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Курсор следующей страницы (заголовок X-Next-Cursor)"),
+    db: Session = Depends(get_read_db)
+):
+    """Получить список всех читателей (ETag по версии таблицы читателей)"""
+    etag = collection_etag(db, ["readers"])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    try:
+        readers = crud.reader.get_readers(db, skip=skip, limit=limit, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"ETag": etag}
+    cursor = next_cursor(readers, limit)
+    if cursor:
+        headers[NEXT_CURSOR_HEADER] = cursor
+    return json_list(ReaderInDB, readers, headers=headers)
+
+@router.get("/search/", response_model=List[ReaderMatch])
+@query_budget(3)
+def search_readers_fuzzy(
+    q: str = Query(..., min_length=2, description="ФИО или номер билета, допускаются опечатки"),
+    limit: int = Query(10, ge=1, le=50, description="Количество кандидатов"),
     db: Session = Depends(get_db)
 ):
-    """Получить список всех читателей"""
-    readers = db.query(Reader).offset(skip).limit(limit).all()
-    return readers
+    """Нечеткий поиск читателей по ФИО и номеру билета (по сходству)"""
+    return [
+        ReaderMatch(**ReaderInDB.model_validate(reader).model_dump(), score=round(score, 3))
+        for reader, score in search_readers(db, q, limit=limit)
+    ]
 
 @router.get("/{reader_id}", response_model=ReaderInDB)
-def read_reader(reader_id: int, db: Session = Depends(get_db)):
-    """Получить читателя по ID"""
+@query_budget(2)
+def read_reader(reader_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """Получить читателя по ID (ETag по версии строки)"""
+    version = crud.reader.get_reader_version(db, reader_id=reader_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Читатель не найден")
+    etag = make_etag("reader", reader_id, version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     reader = db.query(Reader).filter(Reader.id == reader_id).first()
     if reader is None:
         raise HTTPException(status_code=404, detail="Читатель не найден")
+    response.headers["ETag"] = etag
     return reader
 
 @router.get("/card/{library_card}", response_model=ReaderInDB)
-def read_reader_by_card(library_card: str, db: Session = Depends(get_db)):
-    """Получить читателя по номеру читательского билета"""
-    reader = db.query(Reader).filter(Reader.library_card == library_card).first()
-    if reader is None:
-        raise HTTPException(status_code=404, detail="Читатель не найден")
-    return reader
+@query_budget(1)
+def read_reader_by_card(library_card: str, request: Request, db: Session = Depends(get_read_db)):
+    """Получить читателя по номеру читательского билета (кэш ответов)"""
+    def build():
+        reader = db.query(Reader).filter(Reader.library_card == library_card).first()
+        if reader is None:
+            raise HTTPException(status_code=404, detail="Читатель не найден")
+        return json_item(ReaderInDB, reader), item_tags("readers", reader.id)
+
+    return cached_response(request, build)
 
 @router.post("/", response_model=ReaderInDB, status_code=201)
+@query_budget(6)
 def create_reader(reader: ReaderCreate, db: Session = Depends(get_db)):
     """Создать нового читателя"""
     # Проверяем, есть ли уже читатель с таким номером билета
@@ -54,6 +100,7 @@ def create_reader(reader: ReaderCreate, db: Session = Depends(get_db)):
     return db_reader
 
 @router.put("/{reader_id}", response_model=ReaderInDB)
+@query_budget(4)
 def update_reader(
     reader_id: int, 
     reader_update: ReaderUpdate, 
@@ -75,6 +122,7 @@ def update_reader(
     return reader
 
 @router.delete("/{reader_id}", status_code=204)
+@query_budget(4)
 def delete_reader(reader_id: int, db: Session = Depends(get_db)):
     """Удалить читателя"""
     reader = db.query(Reader).filter(Reader.id == reader_id).first()
@@ -86,6 +134,7 @@ def delete_reader(reader_id: int, db: Session = Depends(get_db)):
     return None
 
 @router.patch("/{reader_id}/block", response_model=ReaderInDB)
+@query_budget(6)
 def block_reader(reader_id: int, db: Session = Depends(get_db)):
     """Заблокировать читателя"""
     reader = db.query(Reader).filter(Reader.id == reader_id).first()
@@ -98,6 +147,7 @@ def block_reader(reader_id: int, db: Session = Depends(get_db)):
     return reader
 
 @router.patch("/{reader_id}/activate", response_model=ReaderInDB)
+@query_budget(4)
 def activate_reader(reader_id: int, db: Session = Depends(get_db)):
     """Активировать читателя"""
     reader = db.query(Reader).filter(Reader.id == reader_id).first()
@@ -0,0 +1,112 @@
+"""
+Быстрый путь ответов API.
+
+Ответы по умолчанию сериализуются через orjson (ORJSONResponse, см. app/main.py).
+Списки отдаются через json_list: элементы проверяются схемой один раз и
+сериализуются в JSON заранее собранным TypeAdapter прямо в pydantic-core.
+Готовый Response FastAPI не проверяет повторно по response_model - тот
+остается в декораторе маршрута для документации OpenAPI.
+
+Горячие GET каталога отдаются через cached_response: готовое тело и заголовки
+ответа хранятся в кэше ответов (app/cache.py) с ключом "маршрут + параметры".
+"""
+import time
+from typing import Awaitable, Callable, Iterable, Mapping, Optional, Tuple, Type
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from app.api.conditional import etag_matches, not_modified
+from app import cache, database
+from app.config import settings
+from app.consistency import recent_write
+from app.schemas.adapters import list_adapter, validate_list
+
+CACHE_HEADER = "X-Cache"
+# Заголовки ответа, которые сохраняются в кэше вместе с телом
+CACHED_HEADERS = ("ETag", "X-Next-Cursor")
+
+def json_list(schema: Type[BaseModel], items: Iterable,
+              headers: Optional[Mapping[str, str]] = None) -> Response:
+    """JSON-ответ со списком элементов схемы schema"""
+    content = list_adapter(schema).dump_json(validate_list(schema, items))
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def json_item(schema: Type[BaseModel], item,
+              headers: Optional[Mapping[str, str]] = None) -> Response:
+    """JSON-ответ с одним элементом схемы schema"""
+    content = schema.model_validate(item, from_attributes=True).model_dump_json()
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def cache_key(request: Request) -> str:
+    """Ключ кэша: путь маршрута с параметрами пути и отсортированные параметры запроса"""
+    return f"{request.url.path}?{urlencode(sorted(request.query_params.multi_items()))}"
+
+def _cached_hit(request: Request, entry: cache.Entry) -> Response:
+    body, headers = entry
+    etag = headers.get("ETag")
+    if etag and etag_matches(request, etag):
+        return not_modified(etag)
+    return Response(
+        content=body, media_type="application/json", headers={**headers, CACHE_HEADER: "HIT"}
+    )
+
+def _store(response_cache: cache.ResponseCache, key: str, response: Response,
+           tags: Iterable[str], generation: int, reads_primary: bool) -> None:
+    ttl = None
+    if database.READ_REPLICA and not reads_primary and (
+        time.time() - response_cache.last_invalidation() < settings.READ_YOUR_WRITES_WINDOW
+    ):
+        ttl = settings.READ_YOUR_WRITES_WINDOW
+    if response.status_code == 200:
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        response_cache.set(key, (bytes(response.body), headers), tags, generation, ttl)
+
+def cached_response(request: Request,
+                    build: Callable[[], Tuple[Response, Iterable[str]]]) -> Response:
+    """
+    Ответ из кэша или построенный build: (ответ, теги для инвалидации).
+    В кэш попадают только ответы 200; 404 и прочие ошибки не кэшируются.
+    Поколение кэша читается до чтения БД, поэтому ответ, построенный по данным,
+    которые успели измениться и сбросить кэш, сохранен не будет.
+
+    При чтении с реплики клиент, писавший за последние READ_YOUR_WRITES_WINDOW
+    секунд (cookie db_last_write), читает основную БД и кэш не использует:
+    запись кэша могла быть построена по реплике, еще не получившей его изменение.
+    Ответ, построенный по реплике вскоре после инвалидации, хранится не дольше
+    того же окна - допустимого отставания реплики.
+    """
+    key = cache_key(request)
+    response_cache = cache.response_cache
+    reads_primary = database.READ_REPLICA and recent_write(request)
+    entry = None if reads_primary else response_cache.get(key)
+    if entry is not None:
+        return _cached_hit(request, entry)
+    generation = response_cache.generation()
+    response, tags = build()
+    _store(response_cache, key, response, tags, generation, reads_primary)
+    response.headers[CACHE_HEADER] = "MISS"
+    return response
+
+async def _call_cache(function, *args):
+    # Бэкенд sqlite ходит в файл - в асинхронном режиме не из цикла событий
+    if cache.response_cache.backend == "sqlite":
+        return await run_in_threadpool(function, *args)
+    return function(*args)
+
+async def cached_response_async(request: Request,
+                                build: Callable[[], Awaitable[Tuple[Response, Iterable[str]]]]) -> Response:
+    """То же, что cached_response, для асинхронных маршрутов (app/api/aio): build - корутина"""
+    key = cache_key(request)
+    response_cache = cache.response_cache
+    reads_primary = database.READ_REPLICA and recent_write(request)
+    entry = None if reads_primary else await _call_cache(response_cache.get, key)
+    if entry is not None:
+        return _cached_hit(request, entry)
+    generation = await _call_cache(response_cache.generation)
+    response, tags = await build()
+    await _call_cache(_store, response_cache, key, response, tags, generation, reads_primary)
+    response.headers[CACHE_HEADER] = "MISS"
+    return response
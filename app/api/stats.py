@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app import cache
+from app.config import settings
+from app.database import get_read_db
+from app.query_budget import query_budget
+from app import crud
+from app.schemas.stats import CacheStats, DashboardStats
+
+router = APIRouter()
+
+@router.get("/dashboard", response_model=DashboardStats)
+@query_budget(1)
+def read_dashboard_stats(db: Session = Depends(get_read_db)):
+    """Статистика для главной страницы: книги, экземпляры, читатели и выдачи"""
+    return crud.stats.get_dashboard_stats(db, ttl=settings.STATS_CACHE_TTL)
+
+@router.get("/cache", response_model=CacheStats)
+@query_budget(0)
+def read_cache_stats():
+    """Статистика кэша ответов каталога: попадания, промахи, инвалидации"""
+    return cache.response_cache.stats()
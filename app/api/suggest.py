@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.database import get_db
+from app.query_budget import query_budget
+from app.schemas.suggest import Suggestion
+from app.search.prefix import get_suggest_index
+
+router = APIRouter()
+
+@router.get("", response_model=List[Suggestion])
+@query_budget(3)
+def suggest(
+    field: str = Query(..., pattern="^(title|author|reader)$", description="Поле: title, author или reader"),
+    prefix: str = Query(..., min_length=1, max_length=255, description="Начало слова"),
+    limit: int = Query(10, ge=1, le=50, description="Количество вариантов"),
+    db: Session = Depends(get_db)
+):
+    """Автодополнение названий книг, авторов и ФИО читателей по префиксу"""
+    index = get_suggest_index(db)
+    return [
+        Suggestion(
+            value=value,
+            id=key if field != "author" else None,
+            detail=detail
+        )
+        for key, value, detail in index.search(field, prefix, limit)
+    ]
@@ -0,0 +1,339 @@
+"""
+Кэш ответов горячих GET-запросов каталога.
+
+Запись кэша - готовый ответ (тело JSON и заголовки) с ключом "маршрут + параметры"
+и тегами: "books" - списки книг, "books:5" - карточка книги 5 и т.д.
+Изменения помечают теги в сессии (ORM - автоматически при flush, массовые
+UPDATE - через invalidate_on_commit в app/crud), а после commit записи с этими
+тегами удаляются. Откат транзакции кэш не трогает.
+
+Бэкенды (RESPONSE_CACHE_BACKEND):
+    memory - LRU с TTL в памяти процесса (по умолчанию для одного воркера).
+             Инвалидация не доходит до других процессов: при нескольких
+             воркерах каждый отдает свои записи до их TTL;
+    sqlite - общий файл SQLite (RESPONSE_CACHE_PATH) для нескольких воркеров:
+             инвалидация в одном процессе видна всем (по умолчанию
+             при WEB_CONCURRENCY > 1);
+    none   - кэш отключен.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+# Тело ответа и его заголовки
+Entry = Tuple[bytes, Dict[str, str]]
+
+_PENDING_TAGS = "cache_tags"
+
+def row_tag(table: str, row_id) -> str:
+    """Тег карточки строки"""
+    return f"{table}:{row_id}"
+
+def item_tags(table: str, row_id) -> list:
+    """Теги записи кэша с карточкой строки"""
+    return [row_tag(table, row_id), row_tag(table, "*")]
+
+def table_tags(table: str, ids: Optional[Iterable] = None) -> set:
+    """
+    Теги, которые задевает изменение строк ids таблицы: списки таблицы
+    и карточки этих строк; без ids - все карточки таблицы ("<таблица>:*")
+    """
+    if ids is None:
+        return {table, row_tag(table, "*")}
+    return {table, *(row_tag(table, row_id) for row_id in ids)}
+
+class ResponseCache:
+    """Интерфейс кэша; сам по себе - отключенный кэш (бэкенд none)"""
+
+    backend = "none"
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats = dict.fromkeys(("hits", "misses", "stores", "invalidations"), 0)
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def generation(self) -> int:
+        """Номер поколения: растет при каждой инвалидации"""
+        return 0
+
+    def last_invalidation(self) -> float:
+        """Время (time.time) последней инвалидации, 0 - не было"""
+        return 0.0
+
+    def get(self, key: str) -> Optional[Entry]:
+        self._count("misses")
+        return None
+
+    def set(self, key: str, entry: Entry, tags: Iterable[str], generation: int,
+            ttl: Optional[float] = None) -> None:
+        """
+        Сохранить ответ, если с момента generation ничего не инвалидировалось:
+        иначе ответ мог быть прочитан до изменения, которое уже сбросило кэш.
+        ttl - время жизни записи, если оно короче TTL кэша
+        """
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """Удалить записи, у которых есть хотя бы один из тегов"""
+
+    def clear(self) -> None:
+        """Очистить кэш полностью"""
+
+    def size(self) -> int:
+        return 0
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update(
+            backend=self.backend,
+            entries=self.size(),
+            hit_ratio=round(stats["hits"] / lookups, 4) if lookups else 0.0,
+        )
+        return stats
+
+class MemoryCache(ResponseCache):
+    """LRU с TTL в памяти процесса"""
+
+    backend = "memory"
+
+    def __init__(self, max_entries: int, ttl: float):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # ключ -> (срок годности, запись, теги)
+        self._entries: "OrderedDict[str, Tuple[float, Entry, frozenset]]" = OrderedDict()
+        self._by_tag: Dict[str, set] = {}
+        self._generation = 0
+        self._invalidated_at = 0.0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def last_invalidation(self) -> float:
+        return self._invalidated_at
+
+    def _drop(self, key: str) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] <= time.monotonic():
+                self._drop(key)
+                item = None
+            if item is not None:
+                self._entries.move_to_end(key)
+        self._count("hits" if item is not None else "misses")
+        return item[1] if item is not None else None
+
+    def set(self, key: str, entry: Entry, tags: Iterable[str], generation: int,
+            ttl: Optional[float] = None) -> None:
+        tags = frozenset(tags)
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + min(self.ttl, ttl or self.ttl), entry, tags)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+        self._count("stores")
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at = time.time()
+            for tag in tags:
+                for key in list(self._by_tag.get(tag, ())):
+                    self._drop(key)
+        self._count("invalidations")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+class SQLiteCache(ResponseCache):
+    """
+    Кэш в файле SQLite, общий для всех воркеров на одной машине.
+    Поколение хранится в том же файле, поэтому инвалидация в одном процессе
+    не дает другому сохранить ответ, прочитанный до изменения.
+    """
+
+    backend = "sqlite"
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS cache_entries ("
+        "key TEXT PRIMARY KEY, body BLOB NOT NULL, headers TEXT NOT NULL, expires_at REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at)",
+        "CREATE TABLE IF NOT EXISTS cache_tags (tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))",
+        "CREATE INDEX IF NOT EXISTS ix_cache_tags_key ON cache_tags (key)",
+        "CREATE TABLE IF NOT EXISTS cache_generation (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO cache_generation (id, value) VALUES (1, 0)",
+        "CREATE TABLE IF NOT EXISTS cache_invalidated (id INTEGER PRIMARY KEY CHECK (id = 1), at REAL NOT NULL)",
+        "INSERT OR IGNORE INTO cache_invalidated (id, at) VALUES (1, 0)",
+    ]
+
+    def __init__(self, path: str, max_entries: int, ttl: float):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Одно соединение на поток; "with conn" - одна транзакция
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def generation(self) -> int:
+        return self._connect().execute("SELECT value FROM cache_generation WHERE id = 1").fetchone()[0]
+
+    def last_invalidation(self) -> float:
+        return self._connect().execute("SELECT at FROM cache_invalidated WHERE id = 1").fetchone()[0]
+
+    def _delete_keys(self, conn: sqlite3.Connection, where: str, params=()) -> None:
+        keys = [(key,) for key, in conn.execute(f"SELECT key FROM cache_entries WHERE {where}", params)]
+        conn.executemany("DELETE FROM cache_tags WHERE key = ?", keys)
+        conn.executemany("DELETE FROM cache_entries WHERE key = ?", keys)
+
+    def get(self, key: str) -> Optional[Entry]:
+        row = self._connect().execute(
+            "SELECT body, headers FROM cache_entries WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+        self._count("hits" if row is not None else "misses")
+        return (row[0], json.loads(row[1])) if row is not None else None
+
+    def set(self, key: str, entry: Entry, tags: Iterable[str], generation: int,
+            ttl: Optional[float] = None) -> None:
+        body, headers = entry
+        conn = self._connect()
+        with conn:
+            # BEGIN IMMEDIATE: проверка поколения и запись - атомарно относительно инвалидации
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT value FROM cache_generation WHERE id = 1").fetchone()[0] != generation:
+                return
+            now = time.time()
+            self._delete_keys(conn, "key = ? OR expires_at <= ?", (key, now))
+            conn.execute(
+                "INSERT INTO cache_entries (key, body, headers, expires_at) VALUES (?, ?, ?, ?)",
+                (key, body, json.dumps(headers), now + min(self.ttl, ttl or self.ttl))
+            )
+            conn.executemany("INSERT INTO cache_tags (tag, key) VALUES (?, ?)", [(tag, key) for tag in set(tags)])
+            # Превышение размера: удаляются записи, которые истекут раньше всех
+            self._delete_keys(
+                conn,
+                "key IN (SELECT key FROM cache_entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        self._count("stores")
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tags = list(set(tags))
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE cache_generation SET value = value + 1 WHERE id = 1")
+            conn.execute("UPDATE cache_invalidated SET at = ? WHERE id = 1", (time.time(),))
+            placeholders = ", ".join("?" * len(tags))
+            if tags:
+                self._delete_keys(
+                    conn, f"key IN (SELECT key FROM cache_tags WHERE tag IN ({placeholders}))", tags
+                )
+        self._count("invalidations")
+
+    def clear(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE cache_generation SET value = value + 1 WHERE id = 1")
+            conn.execute("DELETE FROM cache_tags")
+            conn.execute("DELETE FROM cache_entries")
+
+    def size(self) -> int:
+        return self._connect().execute(
+            "SELECT count(*) FROM cache_entries WHERE expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+def default_backend() -> str:
+    """Бэкенд из настроек; без явной настройки - по числу воркеров"""
+    if settings.RESPONSE_CACHE_BACKEND:
+        return settings.RESPONSE_CACHE_BACKEND
+    return "sqlite" if settings.WEB_CONCURRENCY > 1 else "memory"
+
+def create_cache(backend: str) -> ResponseCache:
+    """Кэш по имени бэкенда"""
+    if backend == "memory":
+        return MemoryCache(settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL)
+    if backend == "sqlite":
+        return SQLiteCache(
+            settings.RESPONSE_CACHE_PATH, settings.RESPONSE_CACHE_MAX_ENTRIES, settings.RESPONSE_CACHE_TTL
+        )
+    if backend == "none":
+        return ResponseCache()
+    raise ValueError(f"Неизвестный бэкенд кэша: {backend}")
+
+response_cache = create_cache(default_backend())
+
+def invalidate_on_commit(db: Session, table: str, ids: Optional[Iterable] = None) -> None:
+    """
+    Пометить изменение строк ids таблицы (без ids - любых ее строк):
+    записи кэша с их тегами удалятся после commit сессии
+    """
+    db.info.setdefault(_PENDING_TAGS, set()).update(table_tags(table, ids))
+
+# Таблицы, ответы по которым кэшируются
+_CACHED_TABLES = {"books", "copies", "readers"}
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table not in _CACHED_TABLES:
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        # У новых строк еще нет карточек в кэше - достаточно тега списков
+        ids = () if obj in session.new else (obj.id,)
+        invalidate_on_commit(session, table, ids)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    tags = session.info.pop(_PENDING_TAGS, None)
+    if tags:
+        response_cache.invalidate(tags)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop(_PENDING_TAGS, None)
@@ -1,26 +1,66 @@
-import os
-from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
-# Загружаем переменные окружения
-load_dotenv()
-
 class Settings(BaseSettings):
-    """Настройки приложения"""
+    """
+    Настройки приложения. Значения читаются из переменных окружения
+    и файла .env (без изменения os.environ при импорте)
+    """
     
     # Настройки приложения
     APP_NAME: str = "Библиотечная система"
     APP_VERSION: str = "1.0.0"
-    DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
+    DEBUG: bool = False
     
     # Настройки базы данных
-    DATABASE_URL: str = os.getenv(
-        "DATABASE_URL", 
-        "sqlite:///./library.db"  # По умолчанию SQLite
-    )
+    DATABASE_URL: str = "sqlite:///./library.db"  # По умолчанию SQLite
+    
+    # Реплика только для чтения (списки, поиск, статистика); пусто - читать с основной БД
+    DATABASE_READ_URL: str = ""
+    # Максимальное отставание реплики (секунды): столько после своей записи
+    # клиент читает с основной БД, и столько после изменений кэш ответов не пополняется
+    READ_YOUR_WRITES_WINDOW: float = 5.0
+    
+    # Применять миграции при старте приложения (lifespan). Для автомасштабируемых
+    # воркеров - false: миграции выполняет отдельный шаг python -m app.schema
+    AUTO_MIGRATE: bool = True
+    
+    # Профиль SQLite: PRAGMA для каждого соединения (пустая строка - не задавать)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # в режиме WAL безопасно и без fsync на каждый commit
+    SQLITE_BUSY_TIMEOUT: int = 5000  # мс ожидания блокировки записи вместо "database is locked"
+    SQLITE_CACHE_SIZE: int = -65536  # отрицательное - в КиБ (64 МиБ на соединение)
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 МиБ файла БД читаются через mmap
+    SQLITE_FOREIGN_KEYS: bool = True
+    # Соединений в пуле только для чтения (0 - читать через основной движок)
+    SQLITE_READ_POOL_SIZE: int = 8
+    
+    # Строк на каждый счетчик library_counters: транзакции разных соединений
+    # обновляют разные строки и не ждут друг друга (1 - одна строка на счетчик)
+    COUNTER_SHARDS: int = 8
+    
+    # Асинхронный режим работы с БД (aiosqlite/asyncpg): маршруты API - корутины
+    # с AsyncSession (app/api/aio), ожидание БД не занимает потоки. ASYNC_DATABASE_URL
+    # по умолчанию выводится из DATABASE_URL заменой драйвера; реплика - из DATABASE_READ_URL
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: str = ""
+    
+    # Потоков AnyIO для синхронных маршрутов: ограничивает число запросов,
+    # одновременно ожидающих БД (по умолчанию AnyIO - 40). В режиме DB_ASYNC
+    # в потоках остаются только импорт каталога и маршруты индексов в памяти
+    THREADPOOL_SIZE: int = 40
+    
+    # Метрики в формате Prometheus: GET /metrics
+    METRICS_ENABLED: bool = True
+    
+    # Заголовки X-DB-Queries/X-DB-Time и проверка бюджетов SQL-запросов маршрутов
+    # (включается и при DEBUG); STRICT - нарушение бюджета вызывает ошибку (тесты)
+    QUERY_DEBUG: bool = False
+    QUERY_BUDGET_STRICT: bool = False
+    # Сколько раз одна форма запроса может выполниться за HTTP-запрос (больше - N+1)
+    QUERY_REPEAT_LIMIT: int = 5
     
     # Настройки безопасности
-    SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
+    SECRET_KEY: str = "dev-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
@@ -30,6 +70,27 @@ class Settings(BaseSettings):
     EXTENSION_DAYS: int = 7
     FINE_PER_DAY: float = 10.0  # Штраф за день просрочки
     
+    # Интервал фоновой проверки просроченных выдач (секунды, 0 - отключена)
+    OVERDUE_SWEEP_INTERVAL: float = 300.0
+    
+    # Время жизни кэша статистики главной страницы (секунды)
+    STATS_CACHE_TTL: float = 5.0
+    
+    # Кэш ответов каталога: memory (в памяти процесса), sqlite (общий файл
+    # для нескольких воркеров) или none. Кэш memory у каждого воркера свой,
+    # и записи других воркеров он не инвалидирует. Пусто - sqlite, если воркеров
+    # несколько (WEB_CONCURRENCY, как у uvicorn и gunicorn), иначе memory
+    RESPONSE_CACHE_BACKEND: str = ""
+    WEB_CONCURRENCY: int = 1
+    RESPONSE_CACHE_TTL: float = 60.0
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+    RESPONSE_CACHE_PATH: str = "./response_cache.db"
+    
+    # Индексы поиска в памяти (подсказки, нечеткий поиск читателей): как часто
+    # сверять их версии с БД (секунды) и максимальный возраст индекса (0 - без ограничения)
+    SEARCH_INDEX_CHECK_INTERVAL: float = 1.0
+    SEARCH_INDEX_MAX_AGE: float = 3600.0
+    
     # Настройки API
     API_V1_PREFIX: str = "/api/v1"
     
@@ -0,0 +1,59 @@
+"""
+Чтение своих записей при чтении с реплики (DATABASE_READ_URL).
+
+Ответ на успешный изменяющий запрос (POST, PUT, PATCH, DELETE) ставит cookie
+с временем записи. Пока с этого момента не прошло READ_YOUR_WRITES_WINDOW секунд
+(допустимое отставание реплики), get_read_db отдает клиенту сессию основной БД,
+и клиент сразу видит свои изменения; остальные клиенты читают с реплики.
+"""
+import math
+import time
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+WRITE_COOKIE = "db_last_write"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+def last_write(request: Request) -> Optional[float]:
+    """Время последней записи клиента из cookie (None - нет или некорректно)"""
+    try:
+        return float(request.cookies[WRITE_COOKIE])
+    except (KeyError, ValueError):
+        return None
+
+def recent_write(request: Request, window: Optional[float] = None) -> bool:
+    """Писал ли клиент за последние window секунд (по умолчанию READ_YOUR_WRITES_WINDOW)"""
+    written = last_write(request)
+    if window is None:
+        window = settings.READ_YOUR_WRITES_WINDOW
+    return written is not None and time.time() - written < window
+
+def write_cookie(written: float, window: float) -> bytes:
+    return (
+        f"{WRITE_COOKIE}={written:.3f}; Max-Age={math.ceil(window)}; Path=/; HttpOnly; SameSite=Lax"
+    ).encode("latin-1")
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware: cookie времени записи на успешные изменяющие запросы"""
+
+    def __init__(self, app: ASGIApp, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", write_cookie(time.time(), self.window)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,50 @@
+"""
+Обслуживание таблицы счетчиков library_counters.
+
+    python -m app.counters rebuild   # пересчитать счетчики с нуля
+    python -m app.counters check     # сравнить счетчики с фактическими значениями
+
+Вместе с таблицей проверяются и пересчитываются счетчики активных выдач
+читателей (readers.active_loans).
+"""
+import argparse
+import sys
+
+from app.database import SessionLocal
+from app.crud import counters
+
+def rebuild() -> int:
+    db = SessionLocal()
+    try:
+        values = counters.rebuild_counters(db)
+        print(f"✅ Счетчики пересчитаны: {len(values)}")
+        for name, value in sorted(values.items()):
+            print(f"   {name}: {value}")
+        fixed = counters.rebuild_reader_loans(db)
+        print(f"✅ Исправлено счетчиков выдач читателей: {fixed}")
+        return 0
+    finally:
+        db.close()
+
+def check() -> int:
+    db = SessionLocal()
+    try:
+        mismatches = counters.check_counters(db)
+        if not mismatches:
+            print("✅ Счетчики совпадают с фактическими значениями")
+            return 0
+        print(f"❌ Расхождений: {len(mismatches)}")
+        for name, stored, live in mismatches:
+            print(f"   {name}: счетчик {stored}, факт {live}")
+        return 1
+    finally:
+        db.close()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Обслуживание счетчиков статистики")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args(argv)
+    return rebuild() if args.command == "rebuild" else check()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-# Пока только книга
+from . import book, copy, counters, lease, loan, overdue, reader, stats
 from .book import get_book, get_books, create_book, update_book, delete_book, search_books
 
 __all__ = [
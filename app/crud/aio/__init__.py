@@ -0,0 +1,9 @@
+"""
+CRUD асинхронного режима (DB_ASYNC): те же операции, что и в app/crud, на AsyncSession.
+
+Запросы и разбор их результатов общие с синхронными модулями (функции
+*_select, *_update, plan_*, finish_* в app/crud), здесь - только ожидание БД.
+События сессии (счетчики, версии, кэш ответов, индексы поиска) срабатывают
+и для AsyncSession: их получает ее синхронная сессия.
+"""
+from . import book, copy, counters, loan, overdue, reader, stats
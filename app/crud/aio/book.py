@@ -0,0 +1,71 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.models.book import Book
+from app.schemas.book import BookCreate, BookUpdate
+from app.crud.pagination import paginate
+from app.search import fulltext
+
+async def get_book(db: AsyncSession, book_id: int) -> Optional[Book]:
+    """Получить книгу по ID"""
+    return await db.scalar(select(Book).where(Book.id == book_id))
+
+async def get_book_version(db: AsyncSession, book_id: int) -> Optional[int]:
+    """Версия строки книги (для ETag) или None, если книги нет"""
+    return await db.scalar(select(Book.version).where(Book.id == book_id))
+
+async def get_books(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None
+) -> List[Book]:
+    """Получить список книг (offset или курсор after)"""
+    query = paginate(select(Book), [Book.id], skip=skip, limit=limit, after=after)
+    return list(await db.scalars(query))
+
+async def create_book(db: AsyncSession, book: BookCreate) -> Book:
+    """Создать новую книгу"""
+    db_book = Book(
+        title=book.title,
+        author=book.author,
+        year=book.year,
+        publisher=book.publisher,
+        genre=book.genre,
+        isbn=book.isbn
+    )
+    db.add(db_book)
+    await db.commit()
+    await db.refresh(db_book)
+    return db_book
+
+async def update_book(db: AsyncSession, book_id: int, book_update: BookUpdate) -> Optional[Book]:
+    """Обновить книгу"""
+    db_book = await get_book(db, book_id)
+    if not db_book:
+        return None
+    
+    update_data = book_update.model_dump(exclude_unset=True)
+    for field, value in update_data.items():
+        setattr(db_book, field, value)
+    
+    await db.commit()
+    await db.refresh(db_book)
+    return db_book
+
+async def delete_book(db: AsyncSession, book_id: int) -> bool:
+    """Удалить книгу"""
+    db_book = await get_book(db, book_id)
+    if not db_book:
+        return False
+    
+    await db.delete(db_book)
+    await db.commit()
+    return True
+
+async def search_books(db: AsyncSession, query: str, skip: int = 0, limit: int = 100) -> List[Book]:
+    """Полнотекстовый поиск книг по названию или автору (см. app/search/fulltext.py)"""
+    q = fulltext.search_books_query(db.get_bind().dialect.name, query, skip=skip, limit=limit)
+    if q is None:
+        return []
+    return list(await db.scalars(q))
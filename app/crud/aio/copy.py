@@ -0,0 +1,73 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from app.cache import invalidate_on_commit
+from app.crud.aio.counters import apply_counter_deltas
+from app.crud.copy import borrow_copy_update, borrow_deltas, copy_details_select, to_copy_details
+from app.crud.pagination import paginate
+from app.models.book import Book
+from app.models.copy import Copy
+from app.schemas.copy import CopyInDB
+
+async def get_copy(db: AsyncSession, copy_id: int) -> Optional[Copy]:
+    return await db.scalar(select(Copy).where(Copy.id == copy_id))
+
+async def get_copy_by_inventory(db: AsyncSession, inventory_number: str) -> Optional[Copy]:
+    return await db.scalar(select(Copy).where(Copy.inventory_number == inventory_number))
+
+async def get_copy_version(db: AsyncSession, copy_id: int) -> Optional[Tuple[int, Optional[int]]]:
+    """Версии строк экземпляра и его книги или None, если экземпляра нет"""
+    row = (await db.execute(
+        select(Copy.version, Book.version).outerjoin(
+            Book, Book.id == Copy.book_id
+        ).where(Copy.id == copy_id)
+    )).first()
+    return None if row is None else tuple(row)
+
+async def try_borrow_copy(db: AsyncSession, copy_id: int) -> bool:
+    """
+    Атомарно перевести экземпляр из available в borrowed (compare-and-set).
+    False - экземпляра нет или он уже не доступен, например выдан параллельным запросом.
+    """
+    result = await db.execute(borrow_copy_update(copy_id))
+    if result.rowcount != 1:
+        return False
+    await apply_counter_deltas(await db.connection(), borrow_deltas(1))
+    invalidate_on_commit(db, "copies", [copy_id])
+    return True
+
+async def get_copy_details(db: AsyncSession, copy_id: int) -> Optional[CopyInDB]:
+    """Получить экземпляр с названием книги"""
+    row = (await db.execute(copy_details_select().where(Copy.id == copy_id))).first()
+    if row is None:
+        return None
+    return CopyInDB(**row._asdict())
+
+async def get_copy_details_by_inventory(db: AsyncSession, inventory_number: str) -> Optional[CopyInDB]:
+    """Получить экземпляр по инвентарному номеру с названием книги"""
+    row = (await db.execute(copy_details_select().where(Copy.inventory_number == inventory_number))).first()
+    if row is None:
+        return None
+    return CopyInDB(**row._asdict())
+
+async def get_copies_details(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    after: Optional[str] = None
+) -> List[CopyInDB]:
+    """Получить список экземпляров с названиями книг (offset или курсор after)"""
+    query = copy_details_select()
+    if status:
+        query = query.where(Copy.status == status)
+    query = paginate(query, [Copy.id], skip=skip, limit=limit, after=after)
+    return to_copy_details((await db.execute(query)).all())
+
+async def get_available_copies_details(db: AsyncSession, book_id: int) -> List[CopyInDB]:
+    """Доступные экземпляры книги (поиск по индексу book_id + status)"""
+    query = copy_details_select().where(
+        Copy.book_id == book_id,
+        Copy.status == "available"
+    )
+    return to_copy_details((await db.execute(query)).all())
@@ -0,0 +1,27 @@
+from typing import Dict, Mapping, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.crud.counters import counters_query, versions_from_rows
+from app.models.counter import counter_changes, counter_upsert, version_name
+
+async def apply_counter_deltas(connection: AsyncConnection, deltas: Mapping[str, int]) -> None:
+    """
+    Прибавить приращения к счетчикам в текущей транзакции (см. app/models/counter.py).
+    Асинхронные драйверы есть только для SQLite и PostgreSQL, и оба поддерживают
+    INSERT ... ON CONFLICT - запасной UPDATE + INSERT здесь не нужен
+    """
+    changes = counter_changes(connection, deltas)
+    if changes:
+        await connection.execute(counter_upsert(connection.dialect.name), changes)
+
+async def get_counters(db: AsyncSession) -> Dict[str, int]:
+    """Текущие значения счетчиков (сумма по строкам shard)"""
+    return dict((await db.execute(counters_query())).all())
+
+async def get_versions(db: AsyncSession, tables: Sequence[str]) -> Dict[str, int]:
+    """Версии таблиц (таблица -> версия; 0, если таблица еще не менялась)"""
+    if not tables:
+        return {}
+    rows = await db.execute(counters_query([version_name(table) for table in tables]))
+    return versions_from_rows(tables, rows)
@@ -0,0 +1,122 @@
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Sequence, Set
+from app.cache import invalidate_on_commit
+from app.crud.aio.counters import apply_counter_deltas
+from app.crud.aio.reader import release_loans, reserve_loans
+from app.crud.loan import (
+    borrow_copies_update, checkout_candidates_select, checkout_deltas, close_loans_updates,
+    closed_loans_moves, finish_checkout, finish_returns, loan_details_select, loan_for_return_select,
+    new_loan_rows, new_loans_select, open_loans_by_inventory_select, plan_checkout, plan_returns,
+    reject_over_limit, release_copies_deltas, release_copies_update, to_loan_details
+)
+from app.crud.pagination import paginate
+from app.models.counter import counter_name, version_deltas
+from app.models.loan import OPEN_LOAN_STATUSES, Loan
+from app.schemas.loan import LoanInDB
+
+async def get_loan_details(db: AsyncSession, loan_id: int) -> Optional[LoanInDB]:
+    """Получить выдачу с дополнительной информацией"""
+    row = (await db.execute(loan_details_select().where(Loan.id == loan_id))).first()
+    if row is None:
+        return None
+    return LoanInDB(**row._asdict())
+
+async def get_loans_details(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    after: Optional[str] = None
+) -> List[LoanInDB]:
+    """Получить список выдач с дополнительной информацией (offset или курсор after)"""
+    query = loan_details_select()
+    if status:
+        query = query.where(Loan.status == status)
+    query = paginate(query, [Loan.id], skip=skip, limit=limit, after=after)
+    return to_loan_details((await db.execute(query)).all())
+
+async def get_active_reader_loans_details(db: AsyncSession, reader_id: int) -> List[LoanInDB]:
+    """Активные (в том числе просроченные) выдачи читателя с дополнительной информацией"""
+    query = loan_details_select().where(
+        Loan.reader_id == reader_id,
+        Loan.status.in_(OPEN_LOAN_STATUSES)
+    )
+    return to_loan_details((await db.execute(query)).all())
+
+async def get_overdue_loans_details(db: AsyncSession) -> List[LoanInDB]:
+    """Просроченные выдачи с дополнительной информацией (чтение по индексу статуса)"""
+    query = loan_details_select().where(Loan.status == "overdue")
+    return to_loan_details((await db.execute(query)).all())
+
+async def checkout_copies(
+    db: AsyncSession,
+    reader_id: int,
+    active_loans: int,
+    copy_ids: Sequence[int] = (),
+    inventory_numbers: Sequence[str] = (),
+    loan_days: int = 14,
+    max_books: int = 5
+) -> List[Dict]:
+    """Выдать читателю несколько экземпляров в одной транзакции (см. app/crud/loan.py)"""
+    copies = (await db.execute(checkout_candidates_select(copy_ids, inventory_numbers))).all()
+    items, chosen = plan_checkout(copies, copy_ids, inventory_numbers, active_loans, max_books)
+    if not chosen:
+        return items
+
+    if not await reserve_loans(db, reader_id, len(chosen), max_books):
+        await db.rollback()
+        return reject_over_limit(items, max_books)
+
+    borrowed = set(await db.scalars(borrow_copies_update(chosen)))
+    await release_loans(db, {reader_id: len(chosen) - len(borrowed)})
+    if borrowed:
+        await db.execute(insert(Loan.__table__), new_loan_rows(reader_id, chosen, borrowed, loan_days))
+        await apply_counter_deltas(await db.connection(), checkout_deltas(len(borrowed)))
+        invalidate_on_commit(db, "copies", borrowed)
+    await db.commit()
+
+    rows = (await db.execute(new_loans_select(borrowed))).all() if borrowed else []
+    return finish_checkout(items, borrowed, rows)
+
+async def get_loan_for_return(db: AsyncSession, loan_id: int):
+    """Выдача со статусом ее экземпляра - все, что нужно для close_loans"""
+    return (await db.execute(loan_for_return_select(loan_id))).first()
+
+async def close_loans(db: AsyncSession, loans: Dict[int, object]) -> Set[int]:
+    """
+    Закрыть выдачи (loan_id -> строка с copy_id, reader_id и copy_status),
+    см. app/crud/loan.py. Возвращает id закрытых выдач; commit делает вызывающий.
+    """
+    closed = set()
+    deltas = {}
+    for open_status, statement in close_loans_updates(db, loans):
+        ids = set(await db.scalars(statement))
+        deltas[counter_name("loans", open_status)] = -len(ids)
+        closed |= ids
+    if not closed:
+        return closed
+
+    deltas[counter_name("loans", "returned")] = len(closed)
+    deltas.update(version_deltas("loans"))
+    by_status, by_reader = closed_loans_moves(loans, closed)
+    for old_status, copy_ids in by_status.items():
+        moved = (await db.execute(release_copies_update(copy_ids, old_status))).rowcount
+        release_copies_deltas(deltas, old_status, moved)
+    if by_status:
+        deltas.update(version_deltas("copies"))
+        invalidate_on_commit(db, "copies", [copy_id for copy_ids in by_status.values() for copy_id in copy_ids])
+    await release_loans(db, by_reader)
+    await apply_counter_deltas(await db.connection(), deltas)
+    return closed
+
+async def return_copies(db: AsyncSession, inventory_numbers: Sequence[str]) -> List[Dict]:
+    """Закрыть открытые выдачи по инвентарным номерам экземпляров (см. app/crud/loan.py)"""
+    rows = (await db.execute(open_loans_by_inventory_select(inventory_numbers))).all()
+    items, to_close = plan_returns(rows, inventory_numbers)
+    if not to_close:
+        return items
+
+    closed = await close_loans(db, to_close)
+    await db.commit()
+    return finish_returns(items, closed)
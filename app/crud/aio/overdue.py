@@ -0,0 +1,9 @@
+from typing import Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.overdue import fines_report, fines_report_query
+
+async def get_fines_report(db: AsyncSession, reader_id: Optional[int] = None) -> Dict:
+    """Начисленные штрафы по читателям и итог по библиотеке (см. app/crud/overdue.py)"""
+    return fines_report(await db.execute(fines_report_query(reader_id)))
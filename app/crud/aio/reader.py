@@ -0,0 +1,51 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+from app.cache import invalidate_on_commit
+from app.crud.aio.counters import apply_counter_deltas
+from app.crud.pagination import paginate
+from app.crud.reader import release_loans_params, release_loans_update, reserve_loans_update
+from app.models.counter import version_deltas
+from app.models.reader import Reader
+
+async def get_reader(db: AsyncSession, reader_id: int) -> Optional[Reader]:
+    return await db.scalar(select(Reader).where(Reader.id == reader_id))
+
+async def get_reader_version(db: AsyncSession, reader_id: int) -> Optional[int]:
+    """Версия строки читателя (для ETag) или None, если читателя нет"""
+    return await db.scalar(select(Reader.version).where(Reader.id == reader_id))
+
+async def get_reader_by_card(db: AsyncSession, library_card: str) -> Optional[Reader]:
+    return await db.scalar(select(Reader).where(Reader.library_card == library_card))
+
+async def get_readers(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None
+) -> List[Reader]:
+    """Получить список читателей (offset или курсор after)"""
+    query = paginate(select(Reader), [Reader.id], skip=skip, limit=limit, after=after)
+    return list(await db.scalars(query))
+
+async def reserve_loans(db: AsyncSession, reader_id: int, count: int, max_books: int) -> bool:
+    """
+    Атомарно увеличить число активных выдач активного читателя на count,
+    если лимит max_books не будет превышен (условный UPDATE одной строки).
+    False - читателя нет, он заблокирован или лимит исчерпан.
+    """
+    result = await db.execute(reserve_loans_update(reader_id, count, max_books))
+    if result.rowcount != 1:
+        return False
+    await apply_counter_deltas(await db.connection(), version_deltas("readers"))
+    invalidate_on_commit(db, "readers", [reader_id])
+    return True
+
+async def release_loans(db: AsyncSession, released: Dict[int, int]) -> None:
+    """Уменьшить число активных выдач читателей: reader_id -> число закрытых выдач"""
+    params = release_loans_params(released)
+    if not params:
+        return
+    await db.execute(release_loans_update(), params)
+    await apply_counter_deltas(await db.connection(), version_deltas("readers"))
+    invalidate_on_commit(db, "readers", [param["reader_key"] for param in params])
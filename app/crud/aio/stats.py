@@ -0,0 +1,26 @@
+import time
+from typing import Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.aio.counters import get_counters
+from app.crud.stats import cached_dashboard, dashboard_from_counters, store_dashboard
+
+async def get_dashboard_counts(db: AsyncSession) -> Dict:
+    """Статистика для главной страницы из таблицы счетчиков"""
+    return dashboard_from_counters(await get_counters(db))
+
+async def get_dashboard_stats(db: AsyncSession, ttl: float) -> Dict:
+    """
+    Статистика для главной страницы с кэшированием на ttl секунд.
+    Кэш общий с синхронным режимом: ключ - синхронный Engine сессии
+    """
+    engine = db.get_bind()
+    cached = cached_dashboard(engine, ttl)
+    if cached is not None:
+        return cached
+
+    now = time.monotonic()
+    stats = await get_dashboard_counts(db)
+    store_dashboard(engine, stats, now)
+    return stats
@@ -2,14 +2,25 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.models.book import Book
 from app.schemas.book import BookCreate, BookUpdate
+from app.crud.pagination import paginate
+from app.search import fulltext
 
 def get_book(db: Session, book_id: int) -> Optional[Book]:
     """Получить книгу по ID"""
     return db.query(Book).filter(Book.id == book_id).first()
 
-def get_books(db: Session, skip: int = 0, limit: int = 100) -> List[Book]:
-    """Получить список книг"""
-    return db.query(Book).offset(skip).limit(limit).all()
+def get_book_version(db: Session, book_id: int) -> Optional[int]:
+    """Версия строки книги (для ETag) или None, если книги нет"""
+    return db.query(Book.version).filter(Book.id == book_id).scalar()
+
+def get_books(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None
+) -> List[Book]:
+    """Получить список книг (offset или курсор after)"""
+    return paginate(db.query(Book), [Book.id], skip=skip, limit=limit, after=after).all()
 
 def create_book(db: Session, book: BookCreate) -> Book:
     """Создать новую книгу"""
@@ -50,9 +61,6 @@ def delete_book(db: Session, book_id: int) -> bool:
     db.commit()
     return True
 
-def search_books(db: Session, query: str) -> List[Book]:
-    """Поиск книг по названию или автору"""
-    return db.query(Book).filter(
-        (Book.title.ilike(f"%{query}%")) | 
-        (Book.author.ilike(f"%{query}%"))
-    ).all()
\ No newline at end of file
+def search_books(db: Session, query: str, skip: int = 0, limit: int = 100) -> List[Book]:
+    """Полнотекстовый поиск книг по названию или автору (см. app/search/fulltext.py)"""
+    return fulltext.search_books(db, query, skip=skip, limit=limit)
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+Потоковый импорт каталога из CSV или JSONL.
+
+Строка файла - книга (поля BookCreate) и ее экземпляры: inventory_number
+(в CSV несколько номеров через ";", в JSONL - строка или список) и status.
+Книга с уже известным ISBN не дублируется - экземпляры добавляются к ней.
+Строки обрабатываются пачками: проверка конфликтов - одним запросом IN на пачку,
+вставка - executemany, одна транзакция на пачку. Строка проверяется
+целиком (книга и все экземпляры) до вставки: неверная строка не оставляет
+в базе книгу без экземпляров.
+"""
+import collections
+import csv
+import json
+import os
+from datetime import date
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.cache import invalidate_on_commit
+from app.models.book import Book
+from app.models.copy import Copy
+from app.models.counter import apply_session_deltas, counter_name, version_deltas
+from app.schemas.book import BookCreate
+from app.schemas.catalog_import import ImportReport, ImportRowError
+from app.schemas.copy import CopyCreate
+from app.search.live import track_book
+
+FORMATS = ("csv", "jsonl")
+DEFAULT_BATCH_SIZE = 1000
+# Сколько ошибок по строкам возвращается в отчете (считаются все)
+MAX_REPORTED_ERRORS = 1000
+
+BOOK_FIELDS = tuple(BookCreate.model_fields)
+
+# Строка файла: (номер строки, поля или None, ошибка разбора или None)
+Row = Tuple[int, Optional[Dict], Optional[str]]
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """Формат по расширению файла"""
+    extension = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if extension == "ndjson":
+        return "jsonl"
+    return extension if extension in FORMATS else None
+
+def read_rows(stream: IO[str], fmt: str) -> Iterator[Row]:
+    """Читать строки файла по одной, не загружая его целиком"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for fields in reader:
+            yield reader.line_num, {
+                key.strip(): (value.strip() or None) if isinstance(value, str) else value
+                for key, value in fields.items() if key
+            }, None
+        return
+
+    for line_num, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            fields = json.loads(line)
+        except ValueError as e:
+            yield line_num, None, f"Некорректный JSON: {e}"
+            continue
+        if not isinstance(fields, dict):
+            yield line_num, None, "Строка должна быть JSON-объектом"
+        else:
+            yield line_num, fields, None
+
+def _inventory_numbers(value) -> List[str]:
+    if value is None:
+        return []
+    values = value if isinstance(value, list) else str(value).split(";")
+    return [str(number).strip() for number in values if str(number).strip()]
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+def _add_error(report: ImportReport, row: int, message: str) -> None:
+    report.errors_total += 1
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append(ImportRowError(row=row, message=message))
+
+def _validate_row(fields: Dict) -> Tuple[BookCreate, List[CopyCreate]]:
+    """Книга и экземпляры строки; ValueError с текстом ошибки, если строка неверна"""
+    try:
+        book = BookCreate.model_validate(
+            {key: fields[key] for key in BOOK_FIELDS if fields.get(key) is not None}
+        )
+    except ValidationError as e:
+        raise ValueError(_validation_message(e))
+    copies = []
+    for number in _inventory_numbers(fields.get("inventory_number")):
+        try:
+            # id книги известен только после вставки - до нее проверяются остальные поля
+            copies.append(CopyCreate(book_id=1, inventory_number=number,
+                                     status=fields.get("status") or "available"))
+        except ValidationError as e:
+            raise ValueError(f"Экземпляр {number}: {_validation_message(e)}")
+    return book, copies
+
+def _import_batch(db: Session, batch: List[Row], report: ImportReport) -> None:
+    # 1. Проверка строк схемами - книги и экземпляры до любой вставки
+    parsed = []
+    for line, fields, error in batch:
+        if not error:
+            try:
+                book, row_copies = _validate_row(fields)
+            except ValueError as e:
+                error = str(e)
+        if error:
+            _add_error(report, line, error)
+            continue
+        parsed.append((line, book, row_copies))
+
+    # 2. Конфликты ISBN и инвентарных номеров - по одному запросу на пачку
+    isbns = {book.isbn for _, book, _ in parsed if book.isbn}
+    book_ids = dict(db.execute(
+        select(Book.isbn, Book.id).where(Book.isbn.in_(isbns))
+    ).all()) if isbns else {}
+    numbers = {copy.inventory_number for _, _, row_copies in parsed for copy in row_copies}
+    taken = set(db.scalars(
+        select(Copy.inventory_number).where(Copy.inventory_number.in_(numbers))
+    )) if numbers else set()
+
+    new_books = []
+    new_isbns = {}
+    accepted = []
+    matched = 0
+    for line, book, row_copies in parsed:
+        row_numbers = [copy.inventory_number for copy in row_copies]
+        repeated = [number for number, count in collections.Counter(row_numbers).items() if count > 1]
+        if repeated:
+            _add_error(report, line, f"Инвентарный номер {repeated[0]} повторяется в строке")
+            continue
+        conflicts = [number for number in row_numbers if number in taken]
+        if conflicts:
+            _add_error(report, line, f"Экземпляр с инвентарным номером {conflicts[0]} уже существует")
+            continue
+        taken.update(row_numbers)
+        if book.isbn in book_ids:
+            ref = (book_ids[book.isbn], None)
+            matched += 1
+        elif book.isbn in new_isbns:
+            ref = (None, new_isbns[book.isbn])
+            matched += 1
+        else:
+            ref = (None, len(new_books))
+            if book.isbn:
+                new_isbns[book.isbn] = len(new_books)
+            new_books.append(book.model_dump())
+        accepted.append((ref, row_copies))
+
+    # 3. Вставка книг и экземпляров. id книг возвращаются в порядке
+    # параметров (sort_by_parameter_order): на PostgreSQL вставка остается
+    # пакетной, на SQLite SQLAlchemy вставляет книги по одной
+    created_ids = []
+    if new_books:
+        books = Book.__table__
+        created_ids = list(db.scalars(
+            insert(books).returning(books.c.id, sort_by_parameter_order=True), new_books
+        ))
+    today = date.today()
+    copies = []
+    deltas = {counter_name("books"): len(new_books)}
+    for (book_id, new_index), row_copies in accepted:
+        if book_id is None:
+            book_id = created_ids[new_index]
+        for copy in row_copies:
+            copies.append({**copy.model_dump(), "book_id": book_id, "acquisition_date": today})
+            name = counter_name("copies", copy.status)
+            deltas[name] = deltas.get(name, 0) + 1
+    if copies:
+        db.execute(insert(Copy.__table__), copies)
+
+    # Новые строки есть только в списках - карточки в кэше не затронуты
+    if new_books:
+        deltas.update(version_deltas("books", "books:search"))
+        invalidate_on_commit(db, "books", ())
+    if copies:
+        deltas.update(version_deltas("copies"))
+        invalidate_on_commit(db, "copies", ())
+    apply_session_deltas(db, deltas)
+    for book_id, book in zip(created_ids, new_books):
+        track_book(db, book_id, book["title"], book["author"])
+    db.commit()
+    report.books_created += len(new_books)
+    report.books_matched += matched
+    report.copies_created += len(copies)
+
+def _merge(report: ImportReport, batch_report: ImportReport) -> None:
+    report.books_created += batch_report.books_created
+    report.books_matched += batch_report.books_matched
+    report.copies_created += batch_report.copies_created
+    report.errors_total += batch_report.errors_total
+    report.errors.extend(batch_report.errors[:MAX_REPORTED_ERRORS - len(report.errors)])
+
+def import_catalog(db: Session, rows: Iterable[Row],
+                   batch_size: int = DEFAULT_BATCH_SIZE) -> ImportReport:
+    """Импортировать строки пачками по batch_size; ошибки собираются по строкам"""
+    report = ImportReport()
+    batch = []
+
+    def flush() -> None:
+        batch_report = ImportReport()
+        try:
+            _import_batch(db, batch, batch_report)
+        except IntegrityError:
+            # Конфликт с параллельной вставкой: пачка откатывается целиком
+            db.rollback()
+            batch_report = ImportReport()
+            for line, _, _ in batch:
+                _add_error(batch_report, line, "Конфликт при вставке, строка не импортирована")
+        _merge(report, batch_report)
+        batch.clear()
+
+    for row in rows:
+        report.rows += 1
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return report
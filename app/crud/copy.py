@@ -1,7 +1,14 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import Update, select, update
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.sql import Select
+from typing import Dict, List, Optional, Tuple
+from app.cache import invalidate_on_commit
 from app.models.copy import Copy
 from app.models.book import Book
+from app.models.counter import apply_counter_deltas, counter_name, version_deltas
+from app.schemas.adapters import validate_rows
+from app.schemas.copy import CopyInDB
+from app.crud.pagination import paginate
 
 def get_copy(db: Session, copy_id: int) -> Optional[Copy]:
     return db.query(Copy).filter(Copy.id == copy_id).first()
@@ -19,6 +26,44 @@ def get_available_copies(db: Session, book_id: int) -> List[Copy]:
         Copy.status == "available"
     ).all()
 
+def get_copy_version(db: Session, copy_id: int) -> Optional[Tuple[int, Optional[int]]]:
+    """
+    Версии строк экземпляра и его книги (карточка экземпляра содержит
+    название книги) или None, если экземпляра нет
+    """
+    row = db.query(Copy.version, Book.version).outerjoin(
+        Book, Book.id == Copy.book_id
+    ).filter(Copy.id == copy_id).first()
+    return None if row is None else tuple(row)
+
+def borrow_copy_update(copy_id: int) -> Update:
+    """Условный UPDATE: экземпляр из available в borrowed (compare-and-set)"""
+    copies = Copy.__table__
+    return update(copies).where(
+        copies.c.id == copy_id,
+        copies.c.status == "available"
+    ).values(status="borrowed", version=copies.c.version + 1)
+
+def borrow_deltas(count: int) -> Dict[str, int]:
+    """Приращения счетчиков при выдаче count доступных экземпляров"""
+    return {
+        counter_name("copies", "available"): -count,
+        counter_name("copies", "borrowed"): count,
+        **version_deltas("copies"),
+    }
+
+def try_borrow_copy(db: Session, copy_id: int) -> bool:
+    """
+    Атомарно перевести экземпляр из available в borrowed (compare-and-set).
+    False - экземпляра нет или он уже не доступен, например выдан параллельным запросом.
+    """
+    result = db.execute(borrow_copy_update(copy_id))
+    if result.rowcount != 1:
+        return False
+    apply_counter_deltas(db.connection(), borrow_deltas(1))
+    invalidate_on_commit(db, "copies", [copy_id])
+    return True
+
 def create_copy(db: Session, copy_data: dict) -> Copy:
     db_copy = Copy(**copy_data)
     db.add(db_copy)
@@ -50,4 +95,63 @@ def delete_copy(db: Session, copy_id: int) -> bool:
 
 def get_copies_with_books(db: Session, skip: int = 0, limit: int = 100) -> List[Copy]:
     """Получить экземпляры с информацией о книгах"""
-    return db.query(Copy).join(Book).offset(skip).limit(limit).all()
\ No newline at end of file
+    return db.query(Copy).join(Book).offset(skip).limit(limit).all()
+
+# Проекция экземпляра для ответов API: название книги подтягивается
+# через JOIN, а не отдельным запросом на каждый экземпляр
+COPY_DETAILS_COLUMNS = (
+    Copy.id,
+    Copy.book_id,
+    Copy.inventory_number,
+    Copy.status,
+    Copy.acquisition_date,
+    Book.title.label("book_title"),
+)
+
+def copy_details_query(db: Session) -> Query:
+    """Запрос экземпляров вместе с названием книги"""
+    return db.query(*COPY_DETAILS_COLUMNS).outerjoin(Book, Book.id == Copy.book_id)
+
+def copy_details_select() -> Select:
+    """То же, что copy_details_query, для асинхронной сессии (app/crud/aio)"""
+    return select(*COPY_DETAILS_COLUMNS).outerjoin(Book, Book.id == Copy.book_id)
+
+def to_copy_details(rows) -> List[CopyInDB]:
+    """Преобразовать строки проекции в схемы ответа (одна проверка на весь список)"""
+    return validate_rows(CopyInDB, rows)
+
+def get_copy_details(db: Session, copy_id: int) -> Optional[CopyInDB]:
+    """Получить экземпляр с названием книги"""
+    row = copy_details_query(db).filter(Copy.id == copy_id).first()
+    if row is None:
+        return None
+    return CopyInDB(**row._asdict())
+
+def get_copy_details_by_inventory(db: Session, inventory_number: str) -> Optional[CopyInDB]:
+    """Получить экземпляр по инвентарному номеру с названием книги"""
+    row = copy_details_query(db).filter(Copy.inventory_number == inventory_number).first()
+    if row is None:
+        return None
+    return CopyInDB(**row._asdict())
+
+def get_copies_details(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    after: Optional[str] = None
+) -> List[CopyInDB]:
+    """Получить список экземпляров с названиями книг (offset или курсор after)"""
+    query = copy_details_query(db)
+    if status:
+        query = query.filter(Copy.status == status)
+    query = paginate(query, [Copy.id], skip=skip, limit=limit, after=after)
+    return to_copy_details(query.all())
+
+def get_available_copies_details(db: Session, book_id: int) -> List[CopyInDB]:
+    """Доступные экземпляры книги (поиск по индексу book_id + status)"""
+    query = copy_details_query(db).filter(
+        Copy.book_id == book_id,
+        Copy.status == "available"
+    )
+    return to_copy_details(query.all())
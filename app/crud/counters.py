@@ -0,0 +1,134 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, event, func, insert, literal, null, select, union_all, update, String
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+from sqlalchemy.orm import Session
+
+from app.cache import invalidate_on_commit
+from app.database import Base
+from app.models.book import Book
+from app.models.copy import Copy
+from app.models.counter import (
+    VERSION_PREFIX, LibraryCounter, apply_counter_deltas, counter_name, version_deltas, version_name
+)
+from app.models.loan import OPEN_LOAN_STATUSES, Loan
+from app.models.reader import Reader
+
+def live_counts_query():
+    """
+    Фактические значения всех счетчиков одним запросом:
+    строки (раздел, статус, количество), объединенные через UNION ALL
+    """
+    no_status = null().cast(String)
+    return union_all(
+        select(literal("books"), no_status, func.count()).select_from(Book),
+        select(literal("copies"), Copy.status, func.count()).group_by(Copy.status),
+        select(literal("readers"), Reader.status, func.count()).group_by(Reader.status),
+        select(literal("loans"), Loan.status, func.count()).group_by(Loan.status),
+    )
+
+def _live_counts(connection: Connection) -> Dict[str, int]:
+    return {
+        counter_name(section, status): count
+        for section, status, count in connection.execute(live_counts_query())
+    }
+
+def counters_query(names: Optional[Sequence[str]] = None) -> Select:
+    """Значения счетчиков (всех или только names): сумма по строкам shard"""
+    query = select(LibraryCounter.name, func.sum(LibraryCounter.value)).group_by(LibraryCounter.name)
+    if names is not None:
+        query = query.where(LibraryCounter.name.in_(names))
+    return query
+
+def get_counters(db: Session) -> Dict[str, int]:
+    """Текущие значения счетчиков (одно чтение маленькой таблицы, сумма по строкам shard)"""
+    return dict(db.execute(counters_query()).all())
+
+def versions_from_rows(tables: Sequence[str], rows) -> Dict[str, int]:
+    """Версии таблиц из строк counters_query по их счетчикам версий"""
+    names = {version_name(table): table for table in tables}
+    versions = dict.fromkeys(tables, 0)
+    for name, value in rows:
+        versions[names[name]] = value
+    return versions
+
+def get_versions(db: Session, tables: Sequence[str]) -> Dict[str, int]:
+    """Версии таблиц (таблица -> версия; 0, если таблица еще не менялась)"""
+    if not tables:
+        return {}
+    return versions_from_rows(tables, db.execute(counters_query([version_name(table) for table in tables])))
+
+def get_live_counts(db: Session) -> Dict[str, int]:
+    """Значения счетчиков, посчитанные по таблицам заново"""
+    return _live_counts(db.connection())
+
+def _rebuild(connection: Connection) -> Dict[str, int]:
+    # Сначала DELETE: он берет блокировку записи, и подсчет ниже
+    # видит согласованное состояние таблиц. Пересчитанные значения пишутся
+    # в строку shard 0. Версии таблиц не пересчитываются:
+    # сброс вернул бы уже выданные клиентам ETag
+    table = LibraryCounter.__table__
+    connection.execute(delete(table).where(table.c.name.not_like(f"{VERSION_PREFIX}%")))
+    counts = _live_counts(connection)
+    if counts:
+        connection.execute(
+            insert(LibraryCounter.__table__),
+            [{"name": name, "value": value} for name, value in counts.items()]
+        )
+    return counts
+
+def rebuild_counters(db: Session) -> Dict[str, int]:
+    """Пересчитать все счетчики с нуля"""
+    counts = _rebuild(db.connection())
+    db.commit()
+    return counts
+
+def _live_reader_loans():
+    return select(func.count(Loan.id)).where(
+        Loan.reader_id == Reader.id,
+        Loan.status.in_(OPEN_LOAN_STATUSES)
+    ).correlate(Reader).scalar_subquery()
+
+def rebuild_reader_loans(db: Session) -> int:
+    """Пересчитать счетчики активных выдач читателей; возвращает число исправленных"""
+    live = _live_reader_loans()
+    readers = Reader.__table__
+    fixed = db.execute(
+        update(readers).where(readers.c.active_loans != live).values(
+            active_loans=live, version=readers.c.version + 1
+        )
+    ).rowcount
+    if fixed:
+        apply_counter_deltas(db.connection(), version_deltas("readers"))
+        invalidate_on_commit(db, "readers")
+    db.commit()
+    return fixed
+
+def check_counters(db: Session) -> List[Tuple[str, int, int]]:
+    """
+    Расхождения счетчиков с фактическими значениями: (имя, счетчик, факт).
+    Счетчики читателей называются "readers.active_loans:<id>".
+    """
+    stored = {
+        name: value for name, value in get_counters(db).items()
+        if not name.startswith(VERSION_PREFIX)
+    }
+    live = get_live_counts(db)
+    mismatches = [
+        (name, stored.get(name, 0), live.get(name, 0))
+        for name in sorted(set(stored) | set(live))
+        if stored.get(name, 0) != live.get(name, 0)
+    ]
+    live_loans = _live_reader_loans()
+    for reader_id, active_loans, actual in db.query(
+        Reader.id, Reader.active_loans, live_loans
+    ).filter(Reader.active_loans != live_loans).order_by(Reader.id):
+        mismatches.append((f"readers.active_loans:{reader_id}", active_loans, actual))
+    return mismatches
+
+@event.listens_for(Base.metadata, "after_create")
+def _fill_new_counters(target, connection, tables=(), **kw):
+    # Таблица счетчиков создана к уже заполненной базе - посчитать ее сразу
+    if LibraryCounter.__table__ in tables:
+        _rebuild(connection)
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.lease import SchedulerLease
+
+def acquire_lease(db: Session, name: str, owner: str, seconds: float,
+                  now: Optional[datetime] = None) -> bool:
+    """
+    Взять или продлить аренду задачи name на seconds секунд.
+    Условный UPDATE удается только владельцу или после истечения чужой аренды;
+    первую аренду создает INSERT, и из параллельных INSERT успешен один.
+    now - время с поясом (по умолчанию текущее UTC), как и столбец expires_at.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    leases = SchedulerLease.__table__
+    expires_at = now + timedelta(seconds=seconds)
+    acquired = db.execute(
+        update(leases).where(
+            leases.c.name == name,
+            or_(leases.c.owner == owner, leases.c.expires_at < now)
+        ).values(owner=owner, expires_at=expires_at)
+    ).rowcount == 1
+    if not acquired:
+        try:
+            db.execute(insert(leases).values(name=name, owner=owner, expires_at=expires_at))
+        except IntegrityError:
+            # Аренда есть и принадлежит другому процессу
+            db.rollback()
+            return False
+    db.commit()
+    return True
+
+def release_lease(db: Session, name: str, owner: str) -> None:
+    """Отпустить аренду, чтобы другой процесс мог взять задачу сразу"""
+    leases = SchedulerLease.__table__
+    db.execute(delete(leases).where(leases.c.name == name, leases.c.owner == owner))
+    db.commit()
@@ -1,8 +1,21 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import date
-from app.models.loan import Loan
+from sqlalchemy import Update, case, insert, or_, select, update
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.sql import Select
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from datetime import date, timedelta
+from app.models.loan import OPEN_LOAN_STATUSES, Loan
 from app.models.copy import Copy
+from app.models.book import Book
+from app.models.reader import Reader
+from app.cache import invalidate_on_commit
+from app.config import settings
+from app.crud.copy import borrow_deltas
+from app.crud.overdue import fine_expression
+from app.crud.reader import release_loans, reserve_loans
+from app.models.counter import apply_counter_deltas, counter_name, version_deltas
+from app.schemas.adapters import validate_rows
+from app.schemas.loan import LoanInDB
+from app.crud.pagination import paginate
 
 def get_loan(db: Session, loan_id: int) -> Optional[Loan]:
     return db.query(Loan).filter(Loan.id == loan_id).first()
@@ -11,14 +24,10 @@ def get_loans(db: Session, skip: int = 0, limit: int = 100) -> List[Loan]:
     return db.query(Loan).offset(skip).limit(limit).all()
 
 def get_active_loans(db: Session) -> List[Loan]:
-    return db.query(Loan).filter(Loan.status == "active").all()
+    return db.query(Loan).filter(Loan.status.in_(OPEN_LOAN_STATUSES)).all()
 
 def get_overdue_loans(db: Session) -> List[Loan]:
-    today = date.today()
-    return db.query(Loan).filter(
-        Loan.status == "active",
-        Loan.due_date < today
-    ).all()
+    return db.query(Loan).filter(Loan.status == "overdue").all()
 
 def get_reader_loans(db: Session, reader_id: int) -> List[Loan]:
     return db.query(Loan).filter(Loan.reader_id == reader_id).all()
@@ -26,7 +35,7 @@ def get_reader_loans(db: Session, reader_id: int) -> List[Loan]:
 def get_active_reader_loans(db: Session, reader_id: int) -> List[Loan]:
     return db.query(Loan).filter(
         Loan.reader_id == reader_id,
-        Loan.status == "active"
+        Loan.status.in_(OPEN_LOAN_STATUSES)
     ).all()
 
 def create_loan(db: Session, loan_data: dict) -> Loan:
@@ -58,17 +67,383 @@ def delete_loan(db: Session, loan_id: int) -> bool:
     db.commit()
     return True
 
-def can_borrow_more(db: Session, reader_id: int, max_books: int = 5) -> bool:
-    """Проверяет, может ли читатель взять еще книги"""
-    active_loans_count = db.query(Loan).filter(
-        Loan.reader_id == reader_id,
-        Loan.status == "active"
-    ).count()
-    return active_loans_count < max_books
+def can_borrow_more(db: Session, reader_id: int, max_books: Optional[int] = None) -> bool:
+    """Проверяет, может ли читатель взять еще книги (чтение одной строки)"""
+    if max_books is None:
+        max_books = settings.MAX_BOOKS_PER_READER
+    active_loans = db.query(Reader.active_loans).filter(Reader.id == reader_id).scalar()
+    return active_loans is not None and active_loans < max_books
 
 def is_copy_available(db: Session, copy_id: int) -> bool:
     """Проверяет, доступен ли экземпляр для выдачи"""
     copy = db.query(Copy).filter(Copy.id == copy_id).first()
     if not copy:
         return False
-    return copy.status == "available"
\ No newline at end of file
+    return copy.status == "available"
+
+# Проекция выдачи для ответов API: выдача + инвентарный номер, название книги
+# и ФИО читателя одним запросом с JOIN вместо трех запросов на каждую строку
+LOAN_DETAILS_COLUMNS = (
+    Loan.id,
+    Loan.copy_id,
+    Loan.reader_id,
+    Loan.loan_date,
+    Loan.due_date,
+    Loan.return_date,
+    Loan.status,
+    Loan.fine_amount,
+    Copy.inventory_number.label("copy_inventory"),
+    Book.title.label("book_title"),
+    Reader.full_name.label("reader_name"),
+)
+
+def _join_loan_details(query):
+    return query.outerjoin(
+        Copy, Copy.id == Loan.copy_id
+    ).outerjoin(
+        Book, Book.id == Copy.book_id
+    ).outerjoin(
+        Reader, Reader.id == Loan.reader_id
+    )
+
+def loan_details_query(db: Session) -> Query:
+    """Запрос выдач вместе с данными экземпляра, книги и читателя"""
+    return _join_loan_details(db.query(*LOAN_DETAILS_COLUMNS))
+
+def loan_details_select() -> Select:
+    """То же, что loan_details_query, для асинхронной сессии (app/crud/aio)"""
+    return _join_loan_details(select(*LOAN_DETAILS_COLUMNS))
+
+def to_loan_details(rows) -> List[LoanInDB]:
+    """Преобразовать строки проекции в схемы ответа (одна проверка на весь список)"""
+    return validate_rows(LoanInDB, rows)
+
+def get_loan_details(db: Session, loan_id: int) -> Optional[LoanInDB]:
+    """Получить выдачу с дополнительной информацией"""
+    row = loan_details_query(db).filter(Loan.id == loan_id).first()
+    if row is None:
+        return None
+    return LoanInDB(**row._asdict())
+
+def get_loans_details(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    after: Optional[str] = None
+) -> List[LoanInDB]:
+    """Получить список выдач с дополнительной информацией (offset или курсор after)"""
+    query = loan_details_query(db)
+    if status:
+        query = query.filter(Loan.status == status)
+    query = paginate(query, [Loan.id], skip=skip, limit=limit, after=after)
+    return to_loan_details(query.all())
+
+def get_active_reader_loans_details(db: Session, reader_id: int) -> List[LoanInDB]:
+    """Активные (в том числе просроченные) выдачи читателя с дополнительной информацией"""
+    query = loan_details_query(db).filter(
+        Loan.reader_id == reader_id,
+        Loan.status.in_(OPEN_LOAN_STATUSES)
+    )
+    return to_loan_details(query.all())
+
+def get_overdue_loans_details(db: Session) -> List[LoanInDB]:
+    """Просроченные выдачи с дополнительной информацией (чтение по индексу статуса)"""
+    query = loan_details_query(db).filter(Loan.status == "overdue")
+    return to_loan_details(query.all())
+
+def checkout_candidates_select(copy_ids: Sequence[int], inventory_numbers: Sequence[str]) -> Select:
+    """Все запрошенные к выдаче экземпляры одним запросом"""
+    conditions = []
+    if copy_ids:
+        conditions.append(Copy.id.in_(copy_ids))
+    if inventory_numbers:
+        conditions.append(Copy.inventory_number.in_(inventory_numbers))
+    return select(Copy.id, Copy.inventory_number, Copy.status).where(or_(*conditions))
+
+def plan_checkout(
+    copies,
+    copy_ids: Sequence[int],
+    inventory_numbers: Sequence[str],
+    active_loans: int,
+    max_books: int
+) -> Tuple[List[Dict], List[int]]:
+    """
+    Разобрать запрос на выдачу по прочитанным экземплярам: элементы результата
+    в порядке запроса и id экземпляров, которые можно попытаться выдать
+    """
+    by_id = {copy.id: copy for copy in copies}
+    by_inventory = {copy.inventory_number: copy for copy in copies}
+
+    requested = [(by_id.get(copy_id), copy_id, None) for copy_id in copy_ids]
+    requested += [(by_inventory.get(number), None, number) for number in inventory_numbers]
+    allowed = max_books - active_loans
+    items = []
+    chosen = []
+    seen = set()
+    for copy, copy_id, number in requested:
+        item = {"copy_id": copy_id, "inventory_number": number, "success": False}
+        if copy is not None:
+            item.update(copy_id=copy.id, inventory_number=copy.inventory_number)
+        if copy is None:
+            item["detail"] = "Экземпляр не найден"
+        elif copy.id in seen:
+            item["detail"] = "Экземпляр указан повторно"
+        elif copy.status != "available":
+            item["detail"] = "Экземпляр недоступен для выдачи"
+        elif len(chosen) >= allowed:
+            item["detail"] = f"Превышен лимит книг (максимум {max_books})"
+        else:
+            chosen.append(copy.id)
+        if copy is not None:
+            seen.add(copy.id)
+        items.append(item)
+    return items, chosen
+
+def reject_over_limit(items: List[Dict], max_books: int) -> List[Dict]:
+    """Отказать во всех еще не разобранных элементах: лимит занят параллельной выдачей"""
+    for item in items:
+        if not item.get("detail"):
+            item["detail"] = f"Превышен лимит книг (максимум {max_books})"
+    return items
+
+def borrow_copies_update(chosen: Sequence[int]) -> Update:
+    """Условный UPDATE: экземпляр, выданный параллельным запросом, не изменится"""
+    copies_table = Copy.__table__
+    return update(copies_table).where(
+        copies_table.c.id.in_(chosen),
+        copies_table.c.status == "available"
+    ).values(status="borrowed", version=copies_table.c.version + 1).returning(copies_table.c.id)
+
+def new_loan_rows(reader_id: int, chosen: Sequence[int], borrowed: Set[int], loan_days: int) -> List[Dict]:
+    """Строки новых выдач для executemany, в порядке запроса"""
+    today = date.today()
+    due_date = today + timedelta(days=loan_days)
+    return [
+        {"copy_id": copy_id, "reader_id": reader_id, "loan_date": today,
+         "due_date": due_date, "status": "active"}
+        for copy_id in chosen if copy_id in borrowed
+    ]
+
+def checkout_deltas(count: int) -> Dict[str, int]:
+    """Приращения счетчиков при выдаче count экземпляров"""
+    return {
+        **borrow_deltas(count),
+        counter_name("loans", "active"): count,
+        **version_deltas("copies", "loans"),
+    }
+
+def new_loans_select(borrowed: Set[int]) -> Select:
+    """Только что созданные выдачи экземпляров borrowed"""
+    return loan_details_select().where(
+        Loan.copy_id.in_(borrowed),
+        Loan.status == "active"
+    )
+
+def finish_checkout(items: List[Dict], borrowed: Set[int], rows) -> List[Dict]:
+    """Заполнить результат выдачи по выданным экземплярам и их новым выдачам"""
+    loans = {loan.copy_id: loan for loan in to_loan_details(rows)}
+    for item in items:
+        if item["success"] or item.get("detail"):
+            continue
+        if item["copy_id"] in borrowed:
+            item.update(success=True, loan=loans.get(item["copy_id"]))
+        else:
+            item["detail"] = "Экземпляр недоступен для выдачи"
+    return items
+
+def checkout_copies(
+    db: Session,
+    reader_id: int,
+    active_loans: int,
+    copy_ids: Sequence[int] = (),
+    inventory_numbers: Sequence[str] = (),
+    loan_days: int = 14,
+    max_books: int = 5
+) -> List[Dict]:
+    """
+    Выдать читателю несколько экземпляров в одной транзакции.
+    Число запросов не зависит от числа экземпляров: все экземпляры читаются
+    одним запросом, статусы меняются одним UPDATE ... WHERE status = 'available',
+    выдачи вставляются одним executemany. Результат - по элементу на каждый
+    запрошенный экземпляр (в порядке запроса).
+    """
+    copies = db.execute(checkout_candidates_select(copy_ids, inventory_numbers)).all()
+    items, chosen = plan_checkout(copies, copy_ids, inventory_numbers, active_loans, max_books)
+    if not chosen:
+        return items
+
+    # Места в лимите читателя занимаются условным UPDATE; если параллельная
+    # выдача успела их занять, лимит проверяется заново уже без гонки
+    if not reserve_loans(db, reader_id, len(chosen), max_books):
+        db.rollback()
+        return reject_over_limit(items, max_books)
+
+    borrowed = set(db.scalars(borrow_copies_update(chosen)))
+    release_loans(db, {reader_id: len(chosen) - len(borrowed)})
+    if borrowed:
+        db.execute(insert(Loan.__table__), new_loan_rows(reader_id, chosen, borrowed, loan_days))
+        apply_counter_deltas(db.connection(), checkout_deltas(len(borrowed)))
+        invalidate_on_commit(db, "copies", borrowed)
+    db.commit()
+
+    rows = db.execute(new_loans_select(borrowed)).all() if borrowed else []
+    return finish_checkout(items, borrowed, rows)
+
+def loan_for_return_select(loan_id: int) -> Select:
+    """Выдача со статусом ее экземпляра - все, что нужно для close_loans"""
+    return select(
+        Loan.id.label("loan_id"),
+        Loan.status,
+        Loan.copy_id,
+        Loan.reader_id,
+        Copy.status.label("copy_status"),
+    ).outerjoin(
+        Copy, Copy.id == Loan.copy_id
+    ).where(Loan.id == loan_id)
+
+def get_loan_for_return(db: Session, loan_id: int):
+    """Выдача со статусом ее экземпляра - все, что нужно для close_loans"""
+    return db.execute(loan_for_return_select(loan_id)).first()
+
+def close_loans_updates(db, loan_ids) -> List[Tuple[str, Update]]:
+    """
+    UPDATE закрытия выдач loan_ids - по одному на открытый статус (для счетчиков).
+    Закрываются только еще открытые выдачи; штраф выдачи с истекшим сроком
+    фиксируется на день возврата. db нужна только для диалекта.
+    """
+    loans_table = Loan.__table__
+    today = date.today()
+    fine = case(
+        (loans_table.c.due_date < today, fine_expression(db, today)),
+        else_=loans_table.c.fine_amount
+    )
+    return [
+        (open_status, update(loans_table).where(
+            loans_table.c.id.in_(loan_ids),
+            loans_table.c.status == open_status
+        ).values(
+            status="returned", return_date=today, fine_amount=fine
+        ).returning(loans_table.c.id))
+        for open_status in OPEN_LOAN_STATUSES
+    ]
+
+def closed_loans_moves(loans: Dict[int, object], closed: Set[int]) -> Tuple[Dict[str, List[int]], Dict[int, int]]:
+    """
+    Что поменять после закрытия выдач: экземпляры, которые вернутся в available,
+    сгруппированные по прежнему статусу, и число закрытых выдач по читателям
+    """
+    by_status = {}
+    by_reader = {}
+    for loan_id in closed:
+        row = loans[loan_id]
+        by_reader[row.reader_id] = by_reader.get(row.reader_id, 0) + 1
+        if row.copy_status is not None and row.copy_status != "available":
+            by_status.setdefault(row.copy_status, []).append(row.copy_id)
+    return by_status, by_reader
+
+def release_copies_update(copy_ids: Sequence[int], old_status: str) -> Update:
+    """Условный UPDATE: экземпляры из old_status обратно в available"""
+    copies_table = Copy.__table__
+    return update(copies_table).where(
+        copies_table.c.id.in_(copy_ids),
+        copies_table.c.status == old_status
+    ).values(status="available", version=copies_table.c.version + 1)
+
+def release_copies_deltas(deltas: Dict[str, int], old_status: str, moved: int) -> None:
+    """Учесть в deltas экземпляры, вернувшиеся из old_status в available"""
+    deltas[counter_name("copies", old_status)] = -moved
+    deltas[counter_name("copies", "available")] = (
+        deltas.get(counter_name("copies", "available"), 0) + moved
+    )
+
+def close_loans(db: Session, loans: Dict[int, object]) -> Set[int]:
+    """
+    Закрыть выдачи (loan_id -> строка с copy_id, reader_id и copy_status)
+    несколькими UPDATE по множеству id: выдачи (по одному UPDATE на открытый статус -
+    для счетчиков), экземпляры (группами по прежнему статусу) и счетчики читателей.
+    Закрываются только еще открытые выдачи, поэтому параллельный возврат той же
+    книги ничего не испортит. Штраф выдачи с истекшим сроком фиксируется на день
+    возврата. Возвращает id закрытых выдач; commit делает вызывающий.
+    """
+    closed = set()
+    deltas = {}
+    for open_status, statement in close_loans_updates(db, loans):
+        ids = set(db.scalars(statement))
+        deltas[counter_name("loans", open_status)] = -len(ids)
+        closed |= ids
+    if not closed:
+        return closed
+
+    deltas[counter_name("loans", "returned")] = len(closed)
+    deltas.update(version_deltas("loans"))
+    by_status, by_reader = closed_loans_moves(loans, closed)
+    for old_status, copy_ids in by_status.items():
+        moved = db.execute(release_copies_update(copy_ids, old_status)).rowcount
+        release_copies_deltas(deltas, old_status, moved)
+    if by_status:
+        deltas.update(version_deltas("copies"))
+        invalidate_on_commit(db, "copies", [copy_id for copy_ids in by_status.values() for copy_id in copy_ids])
+    release_loans(db, by_reader)
+    apply_counter_deltas(db.connection(), deltas)
+    return closed
+
+def open_loans_by_inventory_select(inventory_numbers: Sequence[str]) -> Select:
+    """Экземпляры по инвентарным номерам вместе с их открытыми выдачами (одним JOIN)"""
+    return select(
+        Copy.id.label("copy_id"),
+        Copy.inventory_number,
+        Copy.status.label("copy_status"),
+        Loan.id.label("loan_id"),
+        Loan.reader_id,
+    ).outerjoin(
+        Loan, (Loan.copy_id == Copy.id) & Loan.status.in_(OPEN_LOAN_STATUSES)
+    ).where(
+        Copy.inventory_number.in_(inventory_numbers)
+    )
+
+def plan_returns(rows, inventory_numbers: Sequence[str]) -> Tuple[List[Dict], Dict[int, object]]:
+    """Элементы результата возврата в порядке запроса и выдачи для close_loans"""
+    by_inventory = {row.inventory_number: row for row in rows}
+    items = []
+    to_close = {}
+    for number in inventory_numbers:
+        row = by_inventory.get(number)
+        item = {"inventory_number": number, "success": False}
+        if row is None:
+            item["detail"] = "Экземпляр не найден"
+        elif row.loan_id is None:
+            item["detail"] = "Нет активной выдачи"
+        elif row.loan_id in to_close:
+            item["detail"] = "Экземпляр указан повторно"
+        else:
+            item["loan_id"] = row.loan_id
+            to_close[row.loan_id] = row
+        items.append(item)
+    return items, to_close
+
+def finish_returns(items: List[Dict], closed: Set[int]) -> List[Dict]:
+    """Отметить в результате возврата закрытые выдачи"""
+    for item in items:
+        if "loan_id" not in item:
+            continue
+        if item["loan_id"] in closed:
+            item["success"] = True
+        else:
+            item["detail"] = "Выдача уже закрыта"
+    return items
+
+def return_copies(db: Session, inventory_numbers: Sequence[str]) -> List[Dict]:
+    """
+    Закрыть открытые выдачи по инвентарным номерам экземпляров.
+    Выдачи находятся одним JOIN и закрываются через close_loans;
+    результат - по каждому номеру в порядке запроса.
+    """
+    rows = db.execute(open_loans_by_inventory_select(inventory_numbers)).all()
+    items, to_close = plan_returns(rows, inventory_numbers)
+    if not to_close:
+        return items
+
+    closed = close_loans(db, to_close)
+    db.commit()
+    return finish_returns(items, closed)
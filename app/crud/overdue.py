@@ -0,0 +1,124 @@
+"""
+Просрочка выдач: статус "overdue" и начисленные штрафы.
+
+Каждый шаг - один UPDATE по множеству строк без чтения выдач в Python.
+Фоновая проверка (app/scheduler.py) вызывает sweep_overdue раз в
+OVERDUE_SWEEP_INTERVAL секунд, поэтому списки и сводки просрочки читают
+готовый статус по индексу (status, due_date). Отчет по штрафам суммирует
+начисленные штрафы (fine_amount) агрегатом SQL.
+"""
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy import func, literal, select, text, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.config import settings
+from app.models.counter import apply_counter_deltas, counter_name, version_deltas
+from app.models.loan import FINED_CONDITION, Loan
+from app.models.reader import Reader
+
+def days_between(db: Session, start, end):
+    """SQL-выражение: число дней между датами start и end"""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.julianday(end) - func.julianday(start)
+    # PostgreSQL и другие: разность двух дат - число дней
+    return end - start
+
+def fine_expression(db: Session, today: date, fine_per_day: Optional[float] = None):
+    """SQL-выражение: штраф выдачи на дату today (для выдач с истекшим сроком)"""
+    if fine_per_day is None:
+        fine_per_day = settings.FINE_PER_DAY
+    return days_between(db, Loan.__table__.c.due_date, literal(today)) * fine_per_day
+
+def mark_overdue(db: Session, today: date) -> int:
+    """
+    Перевести активные выдачи с истекшим сроком в "overdue", а выдачи,
+    срок которых продлили, - обратно в "active". Возвращает число просроченных.
+    """
+    loans = Loan.__table__
+    overdue = db.execute(
+        update(loans).where(
+            loans.c.status == "active",
+            loans.c.due_date < today
+        ).values(status="overdue")
+    ).rowcount
+    extended = db.execute(
+        update(loans).where(
+            loans.c.status == "overdue",
+            loans.c.due_date >= today
+        ).values(status="active", fine_amount=0)
+    ).rowcount
+    if overdue or extended:
+        apply_counter_deltas(db.connection(), {
+            counter_name("loans", "active"): extended - overdue,
+            counter_name("loans", "overdue"): overdue - extended,
+            **version_deltas("loans"),
+        })
+    return overdue
+
+def accrue_fines(db: Session, today: date, fine_per_day: Optional[float] = None) -> int:
+    """Пересчитать штрафы просроченных выдач; меняются только изменившиеся строки"""
+    loans = Loan.__table__
+    fine = fine_expression(db, today, fine_per_day)
+    fined = db.execute(
+        update(loans).where(
+            loans.c.status == "overdue",
+            loans.c.fine_amount != fine
+        ).values(fine_amount=fine)
+    ).rowcount
+    if fined:
+        apply_counter_deltas(db.connection(), version_deltas("loans"))
+    return fined
+
+def sweep_overdue(db: Session, today: Optional[date] = None,
+                  fine_per_day: Optional[float] = None) -> Dict[str, int]:
+    """Отметить просроченные выдачи и начислить штрафы одной транзакцией"""
+    if today is None:
+        today = date.today()
+    result = {
+        "overdue": mark_overdue(db, today),
+        "fined": accrue_fines(db, today, fine_per_day),
+    }
+    db.commit()
+    return result
+
+def fines_report_query(reader_id: Optional[int] = None) -> Select:
+    """
+    Запрос отчета по штрафам: GROUP BY по частичному покрывающему индексу
+    ix_loans_fined_reader_id - читаются только выдачи со штрафом
+    """
+    loans = Loan.__table__
+    reader_name = select(Reader.full_name).where(
+        Reader.id == loans.c.reader_id
+    ).scalar_subquery().label("full_name")
+    query = select(
+        loans.c.reader_id,
+        reader_name,
+        func.count().label("loans"),
+        func.sum(loans.c.fine_amount).label("amount"),
+    ).where(text(FINED_CONDITION)).group_by(loans.c.reader_id).order_by(loans.c.reader_id)
+    if reader_id is not None:
+        query = query.where(loans.c.reader_id == reader_id)
+    return query
+
+def fines_report(rows) -> Dict:
+    """Отчет по штрафам из строк fines_report_query: по читателям и итог"""
+    readers = [
+        {"reader_id": row.reader_id, "reader_name": row.full_name, "loans": row.loans, "amount": row.amount}
+        for row in rows
+    ]
+    return {
+        "total_loans": sum(reader["loans"] for reader in readers),
+        "total_amount": sum(reader["amount"] for reader in readers),
+        "readers": readers,
+    }
+
+def get_fines_report(db: Session, reader_id: Optional[int] = None) -> Dict:
+    """
+    Начисленные штрафы по читателям и итог по библиотеке: сумма Loan.fine_amount,
+    который ведут фоновая проверка и возврат. Один запрос GROUP BY по частичному
+    покрывающему индексу ix_loans_fined_reader_id: читаются только выдачи со штрафом.
+    """
+    return fines_report(db.execute(fines_report_query(reader_id)))
@@ -0,0 +1,69 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# Заголовок ответа, в котором возвращается курсор следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Закодировать значения ключа сортировки в непрозрачный курсор"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _matches_type(value: Any, column) -> bool:
+    """Подходит ли значение из курсора к типу колонки ключа сортировки"""
+    expected = column.type.python_type
+    if isinstance(value, bool):
+        return expected is bool
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    """Раскодировать курсор для колонок columns; ValueError, если он поврежден"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Некорректный курсор") from e
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("Некорректный курсор")
+    if not all(_matches_type(value, column) for value, column in zip(values, columns)):
+        raise ValueError("Некорректный курсор")
+    return values
+
+def paginate(
+    query: Query,
+    columns: Sequence,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None
+) -> Query:
+    """
+    Применить к запросу постраничный вывод.
+    С курсором (after) выполняется поиск по индексу (sort_key, id) > курсор,
+    поэтому любая страница стоит столько же, сколько первая; без курсора
+    используется обычный offset. Курсор вместе с skip - ValueError.
+    """
+    if after and skip:
+        raise ValueError("Курсор after нельзя сочетать с параметром skip")
+    query = query.order_by(*columns)
+    if after:
+        values = decode_cursor(after, columns)
+        if len(columns) == 1:
+            query = query.filter(columns[0] > values[0])
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def next_cursor(items: Sequence, limit: int, keys: Sequence[str] = ("id",)) -> Optional[str]:
+    """Курсор следующей страницы или None, если страница последняя"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, key) for key in keys])
@@ -1,15 +1,29 @@
+from sqlalchemy import Update, bindparam, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
+from app.cache import invalidate_on_commit
+from app.models.counter import apply_counter_deltas, version_deltas
 from app.models.reader import Reader
+from app.crud.pagination import paginate
 
 def get_reader(db: Session, reader_id: int) -> Optional[Reader]:
     return db.query(Reader).filter(Reader.id == reader_id).first()
 
+def get_reader_version(db: Session, reader_id: int) -> Optional[int]:
+    """Версия строки читателя (для ETag) или None, если читателя нет"""
+    return db.query(Reader.version).filter(Reader.id == reader_id).scalar()
+
 def get_reader_by_card(db: Session, library_card: str) -> Optional[Reader]:
     return db.query(Reader).filter(Reader.library_card == library_card).first()
 
-def get_readers(db: Session, skip: int = 0, limit: int = 100) -> List[Reader]:
-    return db.query(Reader).offset(skip).limit(limit).all()
+def get_readers(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None
+) -> List[Reader]:
+    """Получить список читателей (offset или курсор after)"""
+    return paginate(db.query(Reader), [Reader.id], skip=skip, limit=limit, after=after).all()
 
 def create_reader(db: Session, reader_data: dict) -> Reader:
     db_reader = Reader(**reader_data)
@@ -38,4 +52,55 @@ def delete_reader(db: Session, reader_id: int) -> bool:
     
     db.delete(db_reader)
     db.commit()
-    return True
\ No newline at end of file
+    return True
+
+def reserve_loans_update(reader_id: int, count: int, max_books: int) -> Update:
+    """
+    Условный UPDATE одной строки: число активных выдач активного читателя
+    растет на count, если лимит max_books не будет превышен
+    """
+    readers = Reader.__table__
+    return update(readers).where(
+        readers.c.id == reader_id,
+        readers.c.status == "active",
+        readers.c.active_loans + count <= max_books
+    ).values(active_loans=readers.c.active_loans + count, version=readers.c.version + 1)
+
+def reserve_loans(db: Session, reader_id: int, count: int, max_books: int) -> bool:
+    """
+    Атомарно увеличить число активных выдач активного читателя на count,
+    если лимит max_books не будет превышен (условный UPDATE одной строки).
+    False - читателя нет, он заблокирован или лимит исчерпан.
+    """
+    result = db.execute(reserve_loans_update(reader_id, count, max_books))
+    if result.rowcount != 1:
+        return False
+    apply_counter_deltas(db.connection(), version_deltas("readers"))
+    invalidate_on_commit(db, "readers", [reader_id])
+    return True
+
+def release_loans_update() -> Update:
+    """UPDATE для executemany с параметрами release_loans_params"""
+    readers = Reader.__table__
+    return update(readers).where(
+        readers.c.id == bindparam("reader_key")
+    ).values(
+        active_loans=readers.c.active_loans - bindparam("released"),
+        version=readers.c.version + 1
+    )
+
+def release_loans_params(released: Dict[int, int]) -> List[Dict]:
+    """Параметры release_loans_update: по строке на читателя с закрытыми выдачами"""
+    return [
+        {"reader_key": reader_id, "released": count}
+        for reader_id, count in sorted(released.items()) if count
+    ]
+
+def release_loans(db: Session, released: Dict[int, int]) -> None:
+    """Уменьшить число активных выдач читателей: reader_id -> число закрытых выдач"""
+    params = release_loans_params(released)
+    if not params:
+        return
+    db.execute(release_loans_update(), params)
+    apply_counter_deltas(db.connection(), version_deltas("readers"))
+    invalidate_on_commit(db, "readers", [param["reader_key"] for param in params])
@@ -0,0 +1,63 @@
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.crud.counters import get_counters
+
+def dashboard_from_counters(counters: Dict[str, int]) -> Dict:
+    """Статистика для главной страницы из значений счетчиков"""
+    stats = {
+        "books": 0,
+        "copies": {"total": 0, "by_status": {}},
+        "readers": {"total": 0, "by_status": {}},
+        "loans": {"total": 0, "by_status": {}, "overdue": 0},
+    }
+    for name, value in counters.items():
+        section, _, status = name.partition(":")
+        if not value:
+            continue
+        if section == "books":
+            stats["books"] = value
+        elif section in stats and status:
+            stats[section]["total"] += value
+            stats[section]["by_status"][status] = value
+    # Просрочку отмечает фоновая проверка (app/crud/overdue.py)
+    stats["loans"]["overdue"] = stats["loans"]["by_status"].get("overdue", 0)
+    return stats
+
+def get_dashboard_counts(db: Session) -> Dict:
+    """Статистика для главной страницы из таблицы счетчиков"""
+    return dashboard_from_counters(get_counters(db))
+
+# Короткоживущий кэш статистики: отдельно для каждого движка БД
+# (для асинхронной сессии - ее синхронный Engine, см. app/crud/aio/stats.py)
+_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_cache_lock = threading.Lock()
+
+def cached_dashboard(engine, ttl: float) -> Optional[Dict]:
+    """Статистика из кэша, если она моложе ttl секунд"""
+    with _cache_lock:
+        cached = _cache.get(engine)
+    if cached is not None and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+    return None
+
+def store_dashboard(engine, stats: Dict, started: float) -> None:
+    """Сохранить статистику, посчитанную начиная с момента started"""
+    with _cache_lock:
+        _cache[engine] = (started, stats)
+
+def get_dashboard_stats(db: Session, ttl: float) -> Dict:
+    """Статистика для главной страницы с кэшированием на ttl секунд"""
+    engine = db.get_bind()
+    cached = cached_dashboard(engine, ttl)
+    if cached is not None:
+        return cached
+
+    now = time.monotonic()
+    stats = get_dashboard_counts(db)
+    store_dashboard(engine, stats, now)
+    return stats
@@ -1,21 +1,91 @@
-from sqlalchemy import create_engine
+from typing import List
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.config import settings
+from app.consistency import recent_write
+from app.metrics import TimedSession
+
+def sqlite_pragmas(read_only: bool = False) -> List[str]:
+    """
+    Профиль SQLite из настроек SQLITE_*: PRAGMA для каждого нового соединения.
+    Пустое значение настройки - PRAGMA не выполняется
+    """
+    pragmas = [
+        ("busy_timeout", settings.SQLITE_BUSY_TIMEOUT),
+        ("foreign_keys", "ON" if settings.SQLITE_FOREIGN_KEYS else "OFF"),
+        ("synchronous", settings.SQLITE_SYNCHRONOUS),
+        ("cache_size", settings.SQLITE_CACHE_SIZE),
+        ("mmap_size", settings.SQLITE_MMAP_SIZE),
+    ]
+    if read_only:
+        pragmas.append(("query_only", "ON"))
+    else:
+        # Режим журнала хранится в файле БД - его меняют только соединения записи
+        pragmas.insert(0, ("journal_mode", settings.SQLITE_JOURNAL_MODE))
+    return [f"PRAGMA {name}={value}" for name, value in pragmas if value not in (None, "")]
+
+def configure_sqlite(engine: Engine, read_only: bool = False) -> None:
+    """Применять профиль SQLite к каждому новому соединению engine"""
+    statements = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+def read_only_url(url: str) -> str:
+    """URL того же файла SQLite, открытого только для чтения (mode=ro)"""
+    parsed = make_url(url)
+    path = parsed.database or ""
+    if path.startswith("file:"):
+        path = path[len("file:"):].split("?", 1)[0]
+    return parsed.set(
+        database=f"file:{path}", query={**parsed.query, "mode": "ro", "uri": "true"}
+    ).render_as_string(hide_password=False)
 
 # Создаем движок базы данных
-# Для SQLite нужно добавить connect_args для поддержки foreign keys
-if settings.DATABASE_URL.startswith("sqlite"):
+IS_SQLITE = settings.DATABASE_URL.startswith("sqlite")
+if IS_SQLITE:
     engine = create_engine(
         settings.DATABASE_URL,
         connect_args={"check_same_thread": False}  # Только для SQLite
     )
+    configure_sqlite(engine)
 else:
     engine = create_engine(settings.DATABASE_URL)
 
-# Создаем фабрику сессий
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Движок чтения: реплика (DATABASE_READ_URL) или, для SQLite в файле, отдельный
+# пул соединений только для чтения - в режиме WAL читатели не ждут писателя
+read_engine = engine
+READ_REPLICA = bool(settings.DATABASE_READ_URL)
+IS_SQLITE_FILE = IS_SQLITE and make_url(settings.DATABASE_URL).database not in (None, "", ":memory:")
+if READ_REPLICA:
+    if settings.DATABASE_READ_URL.startswith("sqlite"):
+        read_engine = create_engine(settings.DATABASE_READ_URL, connect_args={"check_same_thread": False})
+        configure_sqlite(read_engine, read_only=True)
+    else:
+        read_engine = create_engine(settings.DATABASE_READ_URL)
+elif IS_SQLITE_FILE and settings.SQLITE_READ_POOL_SIZE > 0:
+    read_engine = create_engine(
+        read_only_url(settings.DATABASE_URL),
+        connect_args={"check_same_thread": False},
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=settings.SQLITE_READ_POOL_SIZE,
+    )
+    configure_sqlite(read_engine, read_only=True)
+
+# Создаем фабрики сессий (TimedSession засекает ожидание соединения из пула, см. app/metrics.py)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=TimedSession)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=TimedSession)
 
 # Базовый класс для моделей
 Base = declarative_base()
@@ -30,4 +100,94 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db(request: Request):
+    """
+    Сессия для маршрутов, которые только читают (списки, поиск, статистика):
+    реплика или пул только для чтения. Клиент, который сам только что писал
+    (cookie последней записи, см. app/consistency.py), читает с основной БД -
+    реплика могла еще не получить его изменения
+    """
+    if READ_REPLICA and recent_write(request):
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Асинхронные драйверы для синхронных URL из DATABASE_URL
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def async_database_url(url: str) -> str:
+    """URL того же сервера БД с асинхронным драйвером (aiosqlite, asyncpg)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Нет асинхронного драйвера для {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def create_async_db_engine(url: str, read_only: bool = False, **kwargs):
+    """
+    Асинхронный движок с тем же профилем SQLite, что и у синхронного.
+    Для файла SQLite - пул соединений (aiosqlite по умолчанию открывает
+    соединение на каждый запрос)
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return create_async_engine(url, **kwargs)
+    if parsed.database not in (None, "", ":memory:"):
+        kwargs.setdefault("poolclass", AsyncAdaptedQueuePool)
+    async_engine = create_async_engine(url, **kwargs)
+    configure_sqlite(async_engine.sync_engine, read_only)
+    return async_engine
+
+# Асинхронный режим (DB_ASYNC): маршруты API - корутины (app/api/aio), ожидание БД
+# не занимает потоки пула AnyIO. Синхронные движки остаются для миграций, фоновой
+# проверки просрочки, импорта каталога и индексов поиска в памяти
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    ASYNC_URL = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_db_engine(ASYNC_URL)
+    async_read_engine = async_engine
+    if READ_REPLICA:
+        async_read_engine = create_async_db_engine(async_database_url(settings.DATABASE_READ_URL), read_only=True)
+    elif IS_SQLITE_FILE and settings.SQLITE_READ_POOL_SIZE > 0:
+        async_read_engine = create_async_db_engine(
+            read_only_url(ASYNC_URL),
+            read_only=True,
+            pool_size=settings.SQLITE_READ_POOL_SIZE,
+            max_overflow=settings.SQLITE_READ_POOL_SIZE,
+        )
+    # expire_on_commit=False: ленивая загрузка атрибутов после commit в AsyncSession
+    # невозможна, маршруты явно перечитывают объекты (refresh), как и синхронные
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False, sync_session_class=TimedSession
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, autoflush=False, expire_on_commit=False, sync_session_class=TimedSession
+    )
+
+async def get_async_db():
+    """Асинхронная сессия базы данных для маршрутов в режиме DB_ASYNC"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db(request: Request):
+    """Асинхронный аналог get_read_db: реплика или пул только для чтения"""
+    if READ_REPLICA and recent_write(request):
+        factory = AsyncSessionLocal
+    else:
+        factory = AsyncReadSessionLocal
+    async with factory() as db:
+        yield db
@@ -0,0 +1,49 @@
+"""
+Массовый импорт каталога из файла.
+
+    python -m app.import_catalog books.csv
+    python -m app.import_catalog books.jsonl --batch-size 5000
+"""
+import argparse
+import sys
+import time
+
+from app.database import SessionLocal
+from app.crud import catalog_import
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Импорт книг и экземпляров из CSV или JSONL")
+    parser.add_argument("path", help="Путь к файлу")
+    parser.add_argument("--format", choices=catalog_import.FORMATS,
+                        help="Формат файла (по умолчанию - по расширению)")
+    parser.add_argument("--batch-size", type=int, default=catalog_import.DEFAULT_BATCH_SIZE,
+                        help="Строк в одной транзакции")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or catalog_import.detect_format(args.path)
+    if fmt is None:
+        parser.error("не удалось определить формат файла, укажите --format")
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            report = catalog_import.import_catalog(
+                db, catalog_import.read_rows(stream, fmt), batch_size=args.batch_size
+            )
+    finally:
+        db.close()
+
+    print(f"📥 Импорт завершен за {time.perf_counter() - started:.1f} с")
+    print(f"   Строк: {report.rows}")
+    print(f"   📚 Новых книг: {report.books_created}, найдено по ISBN: {report.books_matched}")
+    print(f"   📖 Экземпляров: {report.copies_created}")
+    if report.errors_total:
+        print(f"❌ Ошибок: {report.errors_total}")
+        for error in report.errors:
+            print(f"   строка {error.row}: {error.message}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
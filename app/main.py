@@ -1,30 +1,89 @@
+import importlib
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import anyio.to_thread
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, PlainTextResponse
 
 from app.config import settings
-from app.database import engine, Base
+from app.consistency import ReadYourWritesMiddleware
+from app.database import READ_REPLICA, SessionLocal, async_engine, async_read_engine, engine, read_engine
+from app.query_budget import DB_TIME_HEADER, QUERIES_HEADER, QueryBudgetMiddleware
+
+# Роутеры API: (модуль, префикс, тег). Модули роутеров тянут за собой CRUD,
+# поиск и кэш ответов, поэтому импортируются при старте (lifespan), а не при импорте app.main.
+# В режиме DB_ASYNC модули берутся из app.api.aio - те же маршруты на AsyncSession
+ROUTERS = [
+    ("books", "/api/books", "Книги"),
+    ("readers", "/api/readers", "Читатели"),
+    ("copies", "/api/copies", "Экземпляры"),
+    ("loans", "/api/loans", "Выдачи"),
+    ("suggest", "/api/suggest", "Поиск"),
+    ("stats", "/api/stats", "Статистика"),
+]
 
-# Импортируем роутеры
-from app.api.books import router as books_router
-from app.api.readers import router as readers_router
-from app.api.copies import router as copies_router
-from app.api.loans import router as loans_router
+def include_routers(app: FastAPI) -> None:
+    """Подключить роутеры API (один раз на приложение)"""
+    if getattr(app.state, "routers_included", False):
+        return
+    package = "app.api.aio" if settings.DB_ASYNC else "app.api"
+    for module, prefix, tag in ROUTERS:
+        app.include_router(importlib.import_module(f"{package}.{module}").router, prefix=prefix, tags=[tag])
+    app.state.routers_included = True
 
-# Создаем таблицы в БД
-try:
-    Base.metadata.create_all(bind=engine)
+def apply_migrations() -> None:
+    """
+    Создать и обновить таблицы в БД миграциями Alembic.
+    Ошибка миграции прерывает старт: воркер не должен работать со старой схемой
+    """
+    # Alembic импортируется только здесь: воркерам с AUTO_MIGRATE=false он не нужен
+    from app.schema import migrate
+
+    migrate(engine)
     print("✅ Таблицы базы данных созданы успешно")
-except Exception as e:
-    print(f"❌ Ошибка при создании таблиц: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Старт и остановка приложения. Импорт app.main не обращается к БД
+    и не импортирует роутеры: они, миграции и фоновые задачи подключаются
+    здесь, при старте сервера
+    """
+    include_routers(app)
+    if settings.AUTO_MIGRATE:
+        apply_migrations()
+    # Пул потоков, в котором выполняются синхронные маршруты
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    # Фоновая проверка просроченных выдач и начисление штрафов
+    if settings.OVERDUE_SWEEP_INTERVAL > 0:
+        from app.scheduler import OverdueSweeper
+
+        app.state.overdue_sweeper = OverdueSweeper(SessionLocal, settings.OVERDUE_SWEEP_INTERVAL)
+        app.state.overdue_sweeper.start()
+    try:
+        yield
+    finally:
+        sweeper = getattr(app.state, "overdue_sweeper", None)
+        if sweeper is not None:
+            sweeper.stop()
+            app.state.overdue_sweeper = None
+        if async_engine is not None:
+            await async_engine.dispose()
+        if async_read_engine is not async_engine:
+            await async_read_engine.dispose()
 
 # Создаем экземпляр FastAPI приложения
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan,
+    # Сериализация ответов через orjson; списки - см. app/api/responses.py
+    default_response_class=ORJSONResponse
 )
 
 # Настройка CORS
@@ -34,22 +93,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Cache", QUERIES_HEADER, DB_TIME_HEADER],
 )
 
-# Подключаем статические файлы и шаблоны
+# Чтение своих записей при чтении с реплики (см. app/consistency.py)
+if READ_REPLICA:
+    app.add_middleware(ReadYourWritesMiddleware, window=settings.READ_YOUR_WRITES_WINDOW)
+
+# Бюджеты SQL-запросов маршрутов (см. app/query_budget.py); проверка
+# включается настройками QUERY_DEBUG или DEBUG
+app.add_middleware(QueryBudgetMiddleware)
+
+# Метрики Prometheus (см. app/metrics.py); middleware добавляется последним,
+# чтобы длительность запроса включала все остальные
+if settings.METRICS_ENABLED:
+    from app import metrics
+
+    metrics.instrument_queries()
+    metrics.instrument_engine(engine, "primary")
+    if read_engine is not engine:
+        metrics.instrument_engine(read_engine, "read")
+    if async_engine is not None:
+        metrics.instrument_engine(async_engine.sync_engine, "async")
+    if async_read_engine is not async_engine:
+        metrics.instrument_engine(async_read_engine.sync_engine, "async_read")
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Подключаем статические файлы
 app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
 
-# Подключаем роутеры
-app.include_router(books_router, prefix="/api/books", tags=["Книги"])
-app.include_router(readers_router, prefix="/api/readers", tags=["Читатели"])
-app.include_router(copies_router, prefix="/api/copies", tags=["Экземпляры"])
-app.include_router(loans_router, prefix="/api/loans", tags=["Выдачи"])
+@lru_cache(maxsize=None)
+def get_templates():
+    """Шаблоны Jinja2 загружаются при первой отдаче HTML-страницы"""
+    from fastapi.templating import Jinja2Templates
+
+    return Jinja2Templates(directory="templates")
 
 # HTML страница
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
-    return templates.TemplateResponse(
+    return get_templates().TemplateResponse(
         "index.html",
         {"request": request, "app_name": settings.APP_NAME}
     )
@@ -66,10 +149,17 @@ async def health_check():
             "/api/readers", 
             "/api/copies",
             "/api/loans",
+            "/api/suggest",
+            "/api/stats/dashboard",
             "/api/docs"
         ]
     }
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def read_metrics():
+        return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,345 @@
+"""
+Метрики приложения в текстовом формате Prometheus (GET /metrics).
+
+- MetricsMiddleware: число запросов по маршруту, методу и статусу,
+  гистограмма длительности запросов, число SQL-запросов и время в БД на запрос;
+- события курсора SQLAlchemy (before/after_cursor_execute) считают запросы
+  и время БД текущего HTTP-запроса через contextvars (пул потоков AnyIO
+  копирует контекст запроса);
+- ожидание соединения из пула движков (instrument_engine и сессии TimedSession);
+- занятость пула потоков AnyIO, в котором выполняются синхронные маршруты.
+
+Маршрут в метках - шаблон пути (/api/books/{book_id}), а не сам путь:
+число рядов метрики не зависит от числа книг и читателей. Запросы, не
+попавшие ни в один маршрут, учитываются с маршрутом "unmatched".
+"""
+import bisect
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """Метрика с метками; значения по наборам меток хранятся в словаре под блокировкой"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in values
+        ]
+
+class Gauge(Metric):
+    """Значение снимается функцией collect в момент отдачи метрик"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Iterable[Tuple[tuple, float]]],
+                 labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, labels)} {_number(value)}" for labels, value in self.collect()
+        ]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Счетчики по корзинам (последняя - +Inf), сумма, количество
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._values.get(labels)
+        return series[2] if series else 0
+
+    def sum(self, *labels: str) -> float:
+        series = self._values.get(labels)
+        return series[1] if series else 0.0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, ([*counts], total, count)) for labels, (counts, total, count) in self._values.items())
+        lines = self.header()
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self.metrics:
+            metric.clear()
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "library_http_requests_total", "Число HTTP-запросов", ("method", "route", "status")
+))
+http_duration = registry.register(Histogram(
+    "library_http_request_duration_seconds", "Длительность HTTP-запросов", ("method", "route")
+))
+request_queries = registry.register(Histogram(
+    "library_http_request_db_queries", "Число SQL-запросов на HTTP-запрос", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS
+))
+request_db_time = registry.register(Histogram(
+    "library_http_request_db_seconds", "Время выполнения SQL-запросов на HTTP-запрос", ("method", "route")
+))
+db_queries = registry.register(Counter(
+    "library_db_queries_total", "Число SQL-запросов (в том числе вне HTTP-запросов)"
+))
+db_time = registry.register(Counter(
+    "library_db_query_seconds_total", "Суммарное время выполнения SQL-запросов"
+))
+pool_wait = registry.register(Histogram(
+    "library_db_pool_checkout_seconds", "Ожидание соединения из пула движка", ("engine",),
+    buckets=POOL_WAIT_BUCKETS
+))
+
+# Пулы соединений и пул потоков: снимаются при отдаче метрик
+_engines: Dict[str, Engine] = {}
+
+def _pool_connections():
+    for name, engine in sorted(_engines.items()):
+        checkedout = getattr(engine.pool, "checkedout", None)
+        if checkedout is not None:
+            yield (name,), checkedout()
+
+def _threadpool(attribute: str):
+    def collect():
+        # Лимитер AnyIO доступен только в цикле событий - /metrics отдается корутиной
+        import anyio.to_thread
+
+        try:
+            limiter = anyio.to_thread.current_default_thread_limiter()
+        except RuntimeError:
+            return []
+        return [((), getattr(limiter, attribute))]
+    return collect
+
+registry.register(Gauge(
+    "library_db_pool_checked_out", "Соединений, выданных из пула движка", _pool_connections, ("engine",)
+))
+registry.register(Gauge(
+    "library_threadpool_busy", "Занятых потоков пула синхронных маршрутов", _threadpool("borrowed_tokens")
+))
+registry.register(Gauge(
+    "library_threadpool_size", "Размер пула потоков синхронных маршрутов", _threadpool("total_tokens")
+))
+
+class RequestStats:
+    """
+    SQL-запросы одного HTTP-запроса. statements - счетчик форм запросов,
+    ведется только при проверке бюджетов (app/query_budget.py)
+    """
+    __slots__ = ("queries", "db_time", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = None
+
+# Статистика текущего HTTP-запроса. Пул потоков AnyIO копирует
+# контекст, поэтому события курсора видят объект запроса, в котором выполняются
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+# Время начала запроса хранится в контексте выполнения: у каждого запроса он свой
+# и пропадает вместе с запросом, в том числе завершившимся ошибкой. Без контекста
+# (служебные запросы диалекта) - в conn.info, значение перезаписывается следующим
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_started = time.perf_counter()
+    else:
+        conn.info["query_started"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        started = getattr(context, "query_started", None)
+    else:
+        started = conn.info.pop("query_started", None)
+    if started is None:
+        # События подключены, пока запрос уже выполнялся
+        return
+    elapsed = time.perf_counter() - started
+    db_queries.inc()
+    db_time.inc(amount=elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+        if stats.statements is not None:
+            stats.statements[statement] += 1
+
+def instrument_queries() -> None:
+    """Учитывать SQL-запросы всех движков (в том числе тестовых)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Учитывать пул engine в метриках: число выданных соединений и, для сессий
+    TimedSession, ожидание соединения из пула
+    """
+    _engines[name] = engine
+
+def _engine_name(engine: Engine) -> Optional[str]:
+    for name, instrumented in _engines.items():
+        if instrumented is engine:
+            return name
+    return None
+
+class TimedSession(Session):
+    """
+    Сессия, которая засекает получение соединения для транзакции (engine.connect(),
+    то есть в основном ожидание свободного соединения в пуле). У пула нет события
+    перед выдачей соединения, поэтому начало отмечается при запросе соединения
+    сессией, а конец - событием after_begin, которое вызывается только для нового
+    соединения транзакции
+    """
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        self.info["connect_started"] = time.perf_counter()
+        return super()._connection_for_bind(engine, execution_options, **kw)
+
+@event.listens_for(TimedSession, "after_begin")
+def _connection_acquired(session, transaction, connection):
+    started = session.info.pop("connect_started", None)
+    if started is None or transaction.nested:
+        return
+    name = _engine_name(connection.engine)
+    if name is not None:
+        pool_wait.observe(time.perf_counter() - started, name)
+
+def route_template(scope: Scope) -> str:
+    """Шаблон пути маршрута, обработавшего запрос (Router кладет endpoint в scope)"""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+    templates = getattr(app.state, "route_templates", None)
+    if templates is None or endpoint not in templates:
+        # Таблица строится при первом запросе и после добавления маршрутов
+        templates = {}
+        for route in app.routes:
+            if getattr(route, "endpoint", None) is not None:
+                templates.setdefault(route.endpoint, route.path)
+        app.state.route_templates = templates
+    return templates.get(endpoint, "unmatched")
+
+class MetricsMiddleware:
+    """ASGI middleware: метрики HTTP-запросов и их SQL-запросов"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_request.reset(token)
+            elapsed = time.perf_counter() - started
+            method, route = scope["method"], route_template(scope)
+            http_requests.inc(method, route, str(status))
+            http_duration.observe(elapsed, method, route)
+            request_queries.observe(stats.queries, method, route)
+            request_db_time.observe(stats.db_time, method, route)
@@ -4,6 +4,8 @@ from app.models.copy import Copy
 from app.models.reader import Reader
 from app.models.librarian import Librarian
 from app.models.loan import Loan
+from app.models.counter import LibraryCounter
+from app.models.lease import SchedulerLease
 
 # Список всех моделей для миграций
-__all__ = ["Book", "Copy", "Reader", "Librarian", "Loan"]
\ No newline at end of file
+__all__ = ["Book", "Copy", "Reader", "Librarian", "Loan", "LibraryCounter", "SchedulerLease"]
\ No newline at end of file
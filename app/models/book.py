@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, DDL, event
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -19,6 +19,8 @@ class Book(Base):
     # Методанные
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Версия строки: растет при каждом изменении (ETag карточки, см. app/api/conditional.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     def __repr__(self):
         return f"<Book(id={self.id}, title='{self.title}', author='{self.author}')>"
@@ -34,4 +36,48 @@ class Book(Base):
             "genre": self.genre,
             "isbn": self.isbn,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-        }
\ No newline at end of file
+        }
+
+# Полнотекстовый индекс каталога (запросы к нему - в app/search/fulltext.py).
+# SQLite: таблица FTS5 books_fts, которую синхронизируют триггеры на books;
+# буква "ё" приводится к "е", регистр сворачивает токенизатор unicode61.
+# PostgreSQL: GIN-индекс по выражению to_tsvector('russian', ...).
+def _fts_text(ref: str) -> str:
+    return f"replace(replace(coalesce({ref}, ''), 'ё', 'е'), 'Ё', 'Е')"
+
+BOOKS_FTS_SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5("
+    "title, author, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN "
+    "INSERT INTO books_fts(rowid, title, author) "
+    f"VALUES (new.id, {_fts_text('new.title')}, {_fts_text('new.author')}); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author ON books BEGIN "
+    "DELETE FROM books_fts WHERE rowid = old.id; "
+    "INSERT INTO books_fts(rowid, title, author) "
+    f"VALUES (new.id, {_fts_text('new.title')}, {_fts_text('new.author')}); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN "
+    "DELETE FROM books_fts WHERE rowid = old.id; END",
+]
+
+BOOKS_FTS_SQLITE_REBUILD = [
+    "DELETE FROM books_fts",
+    "INSERT INTO books_fts(rowid, title, author) "
+    f"SELECT id, {_fts_text('title')}, {_fts_text('author')} FROM books",
+]
+
+BOOKS_TSVECTOR = (
+    "to_tsvector('russian', coalesce(title, '') || ' ' || coalesce(author, ''))"
+)
+
+BOOKS_FTS_POSTGRES_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_books_fts ON books USING gin ({BOOKS_TSVECTOR})",
+]
+
+for _statement in BOOKS_FTS_SQLITE_DDL:
+    event.listen(Book.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+for _statement in BOOKS_FTS_POSTGRES_DDL:
+    event.listen(Book.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+event.listen(
+    Book.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite")
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -18,9 +18,16 @@ class Copy(Base):
         index=True
     )  # available, borrowed, under_repair, written_off
     acquisition_date = Column(Date, server_default=func.current_date())
+    # Версия строки: растет при каждом изменении (ETag карточки, см. app/api/conditional.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Связи
     book = relationship("Book", backref="copies")
     
+    __table_args__ = (
+        # Доступные экземпляры книги: WHERE book_id = ? AND status = ?
+        Index("ix_copies_book_id_status", "book_id", "status"),
+    )
+    
     def __repr__(self):
         return f"<Copy(id={self.id}, inv='{self.inventory_number}', status='{self.status}')>"
\ No newline at end of file
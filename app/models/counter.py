@@ -0,0 +1,214 @@
+import random
+from collections import Counter
+from typing import Dict, List, Mapping, Optional
+
+from sqlalchemy import Column, Integer, String, bindparam, event, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, attributes
+
+from app.config import settings
+from app.database import Base
+from app.models.book import Book
+from app.models.copy import Copy
+from app.models.loan import Loan
+from app.models.reader import Reader
+
+class LibraryCounter(Base):
+    """
+    Счетчик, поддерживаемый инкрементально в той же транзакции, что и изменение:
+    "books", "copies:<статус>", "readers:<статус>", "loans:<статус>",
+    а также версии таблиц "version:<таблица>" (ETag списков).
+
+    Значение счетчика - сумма его строк по shard: иначе каждая выдача
+    обновляла бы одни и те же строки, и на PostgreSQL выдачи шли бы по очереди
+    """
+
+    __tablename__ = "library_counters"
+
+    name = Column(String(64), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    value = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<LibraryCounter(name='{self.name}', shard={self.shard}, value={self.value})>"
+
+def counter_name(section: str, status: Optional[str] = None) -> str:
+    """Имя счетчика раздела; у разделов со статусами - отдельный счетчик на статус"""
+    return section if status is None else f"{section}:{status}"
+
+# Версия таблицы растет на 1 при каждом изменении ее строк (flush ORM или
+# массовый UPDATE/INSERT); пересчет счетчиков версии не сбрасывает
+VERSION_PREFIX = "version:"
+
+def version_name(table: str) -> str:
+    """Имя счетчика версии таблицы"""
+    return f"{VERSION_PREFIX}{table}"
+
+def version_deltas(*tables: str) -> Dict[str, int]:
+    """Приращения версий таблиц для apply_counter_deltas"""
+    return {version_name(table): 1 for table in tables}
+
+_SHARD_KEY = "counter_shard"
+
+# INSERT ... ON CONFLICT DO UPDATE по диалектам; у остальных - UPDATE и INSERT недостающих
+_UPSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def counter_shard(connection: Connection) -> int:
+    """
+    Строка счетчиков, в которую пишет соединение. Выбирается случайно один раз
+    на соединение БД: все приращения транзакции попадают в одни и те же строки
+    """
+    seed = connection.info.setdefault(_SHARD_KEY, random.randrange(1 << 16))
+    return seed % max(settings.COUNTER_SHARDS, 1)
+
+def counter_changes(connection, deltas: Mapping[str, int]) -> List[Dict]:
+    """
+    Параметры executemany для приращений deltas в строке shard соединения
+    (Connection или AsyncConnection: info у них общий)
+    """
+    shard = counter_shard(connection)
+    return [
+        {"counter": name, "counter_shard": shard, "delta": delta}
+        for name, delta in sorted(deltas.items()) if delta
+    ]
+
+def counter_upsert(dialect: str):
+    """
+    INSERT ... ON CONFLICT DO UPDATE приращений (параметры counter_changes)
+    или None, если диалект его не поддерживает
+    """
+    upsert = _UPSERT.get(dialect)
+    if upsert is None:
+        return None
+    table = LibraryCounter.__table__
+    statement = upsert(table).values(
+        name=bindparam("counter"), shard=bindparam("counter_shard"), value=bindparam("delta")
+    )
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.name, table.c.shard],
+        set_={"value": table.c.value + statement.excluded.value}
+    )
+
+def apply_counter_deltas(connection: Connection, deltas: Mapping[str, int]) -> None:
+    """
+    Прибавить приращения к счетчикам в текущей транзакции.
+    Вызывается автоматически при flush ORM; массовые операции в обход ORM
+    (UPDATE/INSERT ядра SQLAlchemy) должны вызывать ее сами.
+    """
+    table = LibraryCounter.__table__
+    changes = counter_changes(connection, deltas)
+    if not changes:
+        return
+    upsert = counter_upsert(connection.dialect.name)
+    if upsert is not None:
+        # Один INSERT ... ON CONFLICT с набором параметров (executemany): новая строка
+        # shard создается без гонки с параллельной транзакцией
+        connection.execute(upsert, changes)
+        return
+    shard = changes[0]["counter_shard"]
+    # Один UPDATE с набором параметров (executemany) вместо запроса на каждый счетчик
+    result = connection.execute(
+        update(table).where(
+            table.c.name == bindparam("counter"), table.c.shard == bindparam("counter_shard")
+        ).values(value=table.c.value + bindparam("delta")),
+        changes
+    )
+    if connection.dialect.supports_sane_multi_rowcount and result.rowcount == len(changes):
+        return
+    names = [change["counter"] for change in changes]
+    existing = set(connection.execute(
+        select(table.c.name).where(table.c.name.in_(names), table.c.shard == shard)
+    ).scalars())
+    missing = [{"name": change["counter"], "shard": shard, "value": change["delta"]} for change in changes
+               if change["counter"] not in existing]
+    if missing:
+        connection.execute(insert(table), missing)
+
+# Модель -> (раздел, атрибут статуса или None)
+_TRACKED = {
+    Book: ("books", None),
+    Copy: ("copies", "status"),
+    Reader: ("readers", "status"),
+    Loan: ("loans", "status"),
+}
+
+# Модели с версией строки: ORM увеличивает ее при каждом изменении объекта
+_VERSIONED = (Book, Copy, Reader)
+
+# Версии столбцов, по которым строятся индексы поиска в памяти (app/search/live.py).
+# Растут только при изменении этих столбцов: выдача меняет строку читателя,
+# но не его ФИО, и индексы из-за нее не перестраиваются
+SEARCH_VERSIONS = {
+    Book: ("books:search", ("title", "author")),
+    Reader: ("readers:search", ("full_name", "library_card")),
+}
+
+# Версии, увеличенные в текущей транзакции сессии: таблица -> приращение
+BUMPED_VERSIONS_KEY = "bumped_versions"
+
+def search_columns_changed(obj) -> bool:
+    """Изменились ли у объекта столбцы, по которым строятся индексы поиска"""
+    _, columns = SEARCH_VERSIONS[type(obj)]
+    return any(attributes.get_history(obj, column).has_changes() for column in columns)
+
+def apply_session_deltas(session: Session, deltas: Mapping[str, int]) -> None:
+    """apply_counter_deltas в транзакции сессии; увеличенные версии запоминаются в ней до commit"""
+    apply_counter_deltas(session.connection(), deltas)
+    bumped = session.info.setdefault(BUMPED_VERSIONS_KEY, Counter())
+    for name, delta in deltas.items():
+        if name.startswith(VERSION_PREFIX) and delta:
+            bumped[name[len(VERSION_PREFIX):]] += delta
+
+@event.listens_for(Session, "before_flush")
+def _bump_row_versions(session, flush_context, instances):
+    for obj in session.dirty:
+        if isinstance(obj, _VERSIONED) and session.is_modified(obj):
+            obj.version = type(obj).version + 1
+
+@event.listens_for(Session, "after_flush")
+def _count_changes(session, flush_context):
+    deltas = Counter()
+    changed = set()
+    for obj in session.new:
+        tracked = _TRACKED.get(type(obj))
+        if tracked:
+            section, attr = tracked
+            deltas[counter_name(section, getattr(obj, attr) if attr else None)] += 1
+            changed.add(obj.__tablename__)
+        if type(obj) in SEARCH_VERSIONS:
+            changed.add(SEARCH_VERSIONS[type(obj)][0])
+    for obj in session.deleted:
+        if type(obj) in SEARCH_VERSIONS:
+            changed.add(SEARCH_VERSIONS[type(obj)][0])
+        tracked = _TRACKED.get(type(obj))
+        if tracked:
+            changed.add(obj.__tablename__)
+            section, attr = tracked
+            status = None
+            if attr:
+                history = attributes.get_history(obj, attr)
+                status = history.deleted[0] if history.deleted else getattr(obj, attr)
+            deltas[counter_name(section, status)] -= 1
+    for obj in session.dirty:
+        tracked = _TRACKED.get(type(obj))
+        if not tracked or obj in session.deleted or not session.is_modified(obj):
+            continue
+        changed.add(obj.__tablename__)
+        if type(obj) in SEARCH_VERSIONS and search_columns_changed(obj):
+            changed.add(SEARCH_VERSIONS[type(obj)][0])
+        section, attr = tracked
+        if not attr:
+            continue
+        history = attributes.get_history(obj, attr)
+        if history.added and history.deleted and history.added[0] != history.deleted[0]:
+            deltas[counter_name(section, history.deleted[0])] -= 1
+            deltas[counter_name(section, history.added[0])] += 1
+    deltas.update(version_deltas(*changed))
+    if deltas:
+        apply_session_deltas(session, deltas)
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_bumped_versions(session):
+    session.info.pop(BUMPED_VERSIONS_KEY, None)
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, String
+from app.database import Base
+
+class SchedulerLease(Base):
+    """
+    Аренда фоновой задачи: задачу выполняет только процесс-владелец,
+    пока не истек expires_at (выбор лидера между воркерами через БД)
+    """
+    
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String(64), primary_key=True)
+    owner = Column(String(128), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)  # UTC
+    
+    def __repr__(self):
+        return f"<SchedulerLease(name='{self.name}', owner='{self.owner}')>"
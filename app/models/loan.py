@@ -1,8 +1,16 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey  # Добавили String
+from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
+# Статусы выдач, при которых книга на руках у читателя. "overdue" ставит
+# фоновая проверка просрочки (app/scheduler.py), когда истекает due_date
+OPEN_LOAN_STATUSES = ("active", "overdue")
+
+# Условие частичного индекса выдач со штрафом. Константа в запросе - текстом:
+# с параметром (fine_amount > ?) SQLite не может использовать частичный индекс
+FINED_CONDITION = "fine_amount > 0"
+
 class Loan(Base):
     """Модель выдачи книги"""
     
@@ -25,11 +33,29 @@ class Loan(Base):
         default="active",
         index=True
     )  # active, returned, overdue
+    # Начисленный штраф за просрочку: пересчитывается фоновой проверкой
+    # и фиксируется при возврате
+    fine_amount = Column(Float, nullable=False, default=0, server_default="0")
     
     # Связи
     copy = relationship("Copy", backref="loans")
     reader = relationship("Reader", backref="loans")
     librarian = relationship("Librarian", backref="loans")
     
+    __table_args__ = (
+        # Выдачи экземпляра и проверка, выдан ли он сейчас
+        Index("ix_loans_copy_id_status", "copy_id", "status"),
+        # Активные выдачи читателя: WHERE reader_id = ? AND status = ?
+        Index("ix_loans_reader_id_status", "reader_id", "status"),
+        # Просроченные выдачи: WHERE status = ? AND due_date < ?
+        Index("ix_loans_status_due_date", "status", "due_date"),
+        # Отчет по штрафам: WHERE fine_amount > 0 GROUP BY reader_id. Частичный
+        # покрывающий индекс содержит только выдачи со штрафом и уже упорядочен
+        # по reader_id - планировщик берет его вместо ix_loans_reader_id_status
+        # (тот читал бы все выдачи). Условие запроса должно совпадать с FINED_CONDITION
+        Index("ix_loans_fined_reader_id", "reader_id", "fine_amount",
+              sqlite_where=text(FINED_CONDITION), postgresql_where=text(FINED_CONDITION)),
+    )
+    
     def __repr__(self):
         return f"<Loan(id={self.id}, copy_id={self.copy_id}, reader_id={self.reader_id})>"
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date
+from sqlalchemy import Column, Integer, String, Date, DDL, event
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -19,7 +19,26 @@ class Reader(Base):
         default="active",
         index=True
     )  # active, blocked
+    # Число активных выдач: меняется атомарно при выдаче, возврате и удалении
+    # выдачи, чтобы проверка лимита была чтением или условным UPDATE одной строки
+    active_loans = Column(Integer, nullable=False, default=0, server_default="0")
     registration_date = Column(Date, server_default=func.current_date())
+    # Версия строки: растет при каждом изменении (ETag карточки, см. app/api/conditional.py)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     def __repr__(self):
-        return f"<Reader(id={self.id}, name='{self.full_name}', card='{self.library_card}')>"
\ No newline at end of file
+        return f"<Reader(id={self.id}, name='{self.full_name}', card='{self.library_card}')>"
+
+# Нечеткий поиск по ФИО и номеру билета (см. app/search/trigram.py).
+# На PostgreSQL используются расширение pg_trgm и GIN-индексы триграмм,
+# на остальных СУБД - индекс триграмм в памяти приложения.
+READERS_TRGM_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_readers_full_name_trgm ON readers "
+    "USING gin (full_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_readers_library_card_trgm ON readers "
+    "USING gin (library_card gin_trgm_ops)",
+]
+
+for _statement in READERS_TRGM_POSTGRES_DDL:
+    event.listen(Reader.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
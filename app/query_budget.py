@@ -0,0 +1,128 @@
+"""
+Бюджет SQL-запросов на HTTP-запрос и поиск N+1 (настройка QUERY_DEBUG или DEBUG).
+
+Бюджет объявляется рядом с маршрутом:
+
+    @router.get("/{copy_id}", response_model=CopyInDB)
+    @query_budget(3)
+    def read_copy(...):
+
+QueryBudgetMiddleware считает SQL-запросы каждого HTTP-запроса через события
+курсора (app/metrics.py) и добавляет к ответу заголовки X-DB-Queries и X-DB-Time
+(миллисекунды). Нарушением считается:
+
+- запросов больше, чем объявлено в бюджете маршрута;
+- одна и та же форма запроса (текст с параметрами, списки IN свернуты)
+  выполнена больше QUERY_REPEAT_LIMIT раз - типичный признак N+1.
+
+Нарушение записывается в журнал предупреждением; при QUERY_BUDGET_STRICT
+(в тестах) вызывает QueryBudgetExceeded, и тест маршрута падает.
+"""
+import collections
+import logging
+import re
+from typing import Callable, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import metrics
+from app.config import settings
+
+QUERIES_HEADER = "X-DB-Queries"
+DB_TIME_HEADER = "X-DB-Time"
+
+logger = logging.getLogger(__name__)
+
+# Списки параметров (IN (?, ?, ...), VALUES (...), (...)) и числа: от них форма запроса не зависит
+_PARAMETER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|:\w+))*\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACES = re.compile(r"\s+")
+
+class QueryBudgetExceeded(AssertionError):
+    """Маршрут выполнил больше SQL-запросов, чем допускает его бюджет"""
+
+class QueryBudget:
+    def __init__(self, queries: int, repeats: Optional[int] = None):
+        self.queries = queries
+        self.repeats = repeats
+
+def query_budget(queries: int, repeats: Optional[int] = None) -> Callable:
+    """
+    Декоратор маршрута: не больше queries SQL-запросов на HTTP-запрос и не больше
+    repeats повторов одной формы запроса (по умолчанию QUERY_REPEAT_LIMIT)
+    """
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.query_budget = QueryBudget(queries, repeats)
+        return endpoint
+    return decorate
+
+def statement_shape(statement: str) -> str:
+    """Форма запроса: без значений списков параметров, чисел и лишних пробелов"""
+    shape = _PARAMETER_LIST.sub("(?)", statement)
+    shape = _NUMBER.sub("N", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+def repeated_shapes(statements: collections.Counter, limit: int) -> List[tuple]:
+    """Формы запросов, выполненные больше limit раз: [(форма, число), ...]"""
+    shapes = collections.Counter()
+    for statement, count in statements.items():
+        shapes[statement_shape(statement)] += count
+    return [(shape, count) for shape, count in shapes.most_common() if count > limit]
+
+def budget_violations(stats: metrics.RequestStats, budget: Optional[QueryBudget]) -> List[str]:
+    violations = []
+    if budget is not None and stats.queries > budget.queries:
+        violations.append(f"{stats.queries} SQL-запросов при бюджете {budget.queries}")
+    limit = budget.repeats if budget is not None and budget.repeats is not None else settings.QUERY_REPEAT_LIMIT
+    for shape, count in repeated_shapes(stats.statements, limit):
+        violations.append(f"запрос выполнен {count} раз (возможен N+1): {shape[:200]}")
+    return violations
+
+def enabled() -> bool:
+    return settings.QUERY_DEBUG or settings.DEBUG
+
+class QueryBudgetMiddleware:
+    """ASGI middleware: заголовки X-DB-Queries/X-DB-Time и проверка бюджетов маршрутов"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not enabled():
+            await self.app(scope, receive, send)
+            return
+
+        metrics.instrument_queries()
+        # Счетчик запросов общий с MetricsMiddleware, если она включена
+        stats = metrics.current_request.get()
+        token = None
+        if stats is None:
+            stats = metrics.RequestStats()
+            token = metrics.current_request.set(stats)
+        stats.statements = collections.Counter()
+
+        async def send_with_queries(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                self.check(scope, stats)
+                headers = list(message.get("headers", []))
+                headers.append((QUERIES_HEADER.lower().encode(), str(stats.queries).encode()))
+                headers.append((DB_TIME_HEADER.lower().encode(), f"{stats.db_time * 1000:.3f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_queries)
+        finally:
+            if token is not None:
+                metrics.current_request.reset(token)
+
+    def check(self, scope: Scope, stats: metrics.RequestStats) -> None:
+        budget = getattr(scope.get("endpoint"), "query_budget", None)
+        violations = budget_violations(stats, budget)
+        if not violations:
+            return
+        route = f"{scope['method']} {metrics.route_template(scope)}"
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(f"{route}: " + "; ".join(violations))
+        for violation in violations:
+            logger.warning("%s: %s", route, violation)
@@ -0,0 +1,71 @@
+"""
+Фоновые задачи, выполняемые внутри процесса приложения.
+
+OverdueSweeper раз в OVERDUE_SWEEP_INTERVAL секунд отмечает просроченные
+выдачи и начисляет штрафы (crud.overdue.sweep_overdue). Если приложение
+запущено несколькими воркерами на одной БД, проверку выполняет только
+владелец аренды в таблице scheduler_leases; остальные процессы подхватят
+задачу, когда аренда истечет.
+"""
+import os
+import socket
+import threading
+import uuid
+from typing import Callable, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.crud.lease import acquire_lease, release_lease
+from app.crud.overdue import sweep_overdue
+
+OVERDUE_SWEEP_LEASE = "overdue_sweep"
+
+class OverdueSweeper:
+    """Периодическая проверка просрочки в фоновом потоке"""
+
+    def __init__(self, session_factory: Callable[[], Session], interval: float,
+                 lease_seconds: Optional[float] = None):
+        self.session_factory = session_factory
+        self.interval = interval
+        # Аренда переживает один пропущенный запуск, но не зависший процесс
+        self.lease_seconds = lease_seconds if lease_seconds is not None else interval * 2
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> Optional[Dict[str, int]]:
+        """Одна проверка; None - аренда у другого процесса"""
+        db = self.session_factory()
+        try:
+            if not acquire_lease(db, OVERDUE_SWEEP_LEASE, self.owner, self.lease_seconds):
+                return None
+            return sweep_overdue(db)
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Ошибка проверки просроченных выдач: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="overdue-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        db = self.session_factory()
+        try:
+            release_lease(db, OVERDUE_SWEEP_LEASE, self.owner)
+        finally:
+            db.close()
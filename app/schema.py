@@ -0,0 +1,78 @@
+"""
+Создание и обновление схемы БД миграциями Alembic (каталог migrations/).
+
+    python -m app.schema   # миграции и поисковые индексы - шаг перед запуском воркеров
+
+Приложение выполняет то же самое при старте (lifespan в app/main.py),
+если не отключено настройкой AUTO_MIGRATE.
+"""
+import argparse
+import os
+import sys
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from app.database import Base, engine
+from app.search import ensure_search_indexes
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# Ревизия, соответствующая схеме, которую раньше создавал create_all
+BASELINE_REVISION = "0001"
+
+def alembic_config() -> Config:
+    config = Config(ALEMBIC_INI)
+    config.set_main_option(
+        "script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations")
+    )
+    return config
+
+def upgrade_schema(engine: Engine, revision: str = "head") -> None:
+    """
+    Применить миграции к базе. База, созданная через create_all до появления
+    миграций, сначала дополняется недостающими таблицами и помечается базовой ревизией.
+    """
+    config = alembic_config()
+    with engine.connect() as connection:
+        # SQLite: миграции в режиме batch пересоздают таблицы, и при включенных
+        # внешних ключах DROP TABLE каскадно удалил бы строки дочерних таблиц.
+        # PRAGMA действует только вне транзакции - до begin()
+        foreign_keys = False
+        if connection.dialect.name == "sqlite":
+            foreign_keys = bool(connection.exec_driver_sql("PRAGMA foreign_keys").scalar())
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            connection.commit()
+        try:
+            with connection.begin():
+                config.attributes["connection"] = connection
+                tables = inspect(connection).get_table_names()
+                if "alembic_version" not in tables and "books" in tables:
+                    Base.metadata.create_all(bind=connection)
+                    command.stamp(config, BASELINE_REVISION)
+                command.upgrade(config, revision)
+        finally:
+            if foreign_keys:
+                connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+                connection.commit()
+
+def migrate(engine: Engine) -> None:
+    """Применить миграции и создать поисковые индексы"""
+    upgrade_schema(engine)
+    ensure_search_indexes(engine)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("--revision", default="head", help="Целевая ревизия (по умолчанию head)")
+    args = parser.parse_args(argv)
+    if args.revision == "head":
+        migrate(engine)
+    else:
+        upgrade_schema(engine, args.revision)
+    print(f"✅ Схема базы данных обновлена до ревизии {args.revision}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+from functools import lru_cache
+from typing import Iterable, List, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+@lru_cache(maxsize=None)
+def list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter списка схемы: собирается один раз на схему"""
+    return TypeAdapter(List[schema])
+
+def validate_list(schema: Type[BaseModel], items: Iterable) -> List[BaseModel]:
+    """
+    Проверить список одним вызовом pydantic-core: ORM-объекты читаются
+    по атрибутам, готовые экземпляры схемы повторно не проверяются
+    """
+    return list_adapter(schema).validate_python(items, from_attributes=True)
+
+def validate_rows(schema: Type[BaseModel], rows: Iterable) -> List[BaseModel]:
+    """
+    Строки запроса (Row) в схемы: словари по именам колонок и одна проверка
+    на весь список. Чтение Row по атрибутам в pydantic вдвое медленнее
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return list_adapter(schema).validate_python([dict(zip(keys, row)) for row in rows])
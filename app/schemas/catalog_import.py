@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+class ImportRowError(BaseModel):
+    row: int = Field(..., description="Номер строки файла")
+    message: str
+
+class ImportReport(BaseModel):
+    rows: int = 0
+    books_created: int = 0
+    books_matched: int = Field(0, description="Строки, привязанные к уже существующей книге по ISBN")
+    copies_created: int = 0
+    errors_total: int = 0
+    errors: List[ImportRowError] = Field(default_factory=list, description="Первые ошибки по строкам")
@@ -2,16 +2,18 @@ from pydantic import BaseModel, Field
 from typing import Optional
 from datetime import date
 
+COPY_STATUS_PATTERN = "^(available|borrowed|under_repair|written_off)$"
+
 class CopyBase(BaseModel):
     book_id: int = Field(..., ge=1, description="ID книги")
     inventory_number: str = Field(..., min_length=1, max_length=50, description="Инвентарный номер")
-    status: str = Field("available", description="Статус: available, borrowed, under_repair, written_off")
+    status: str = Field("available", pattern=COPY_STATUS_PATTERN, description="Статус: available, borrowed, under_repair, written_off")
 
 class CopyCreate(CopyBase):
     pass
 
 class CopyUpdate(BaseModel):
-    status: Optional[str] = Field(None, description="Статус: available, borrowed, under_repair, written_off")
+    status: Optional[str] = Field(None, pattern=COPY_STATUS_PATTERN, description="Статус: available, borrowed, under_repair, written_off")
 
 class CopyInDB(CopyBase):
     id: int
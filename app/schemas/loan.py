@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 
 class LoanBase(BaseModel):
@@ -18,9 +18,55 @@ class LoanInDB(LoanBase):
     due_date: date
     return_date: Optional[date] = None
     status: str = "active"
+    fine_amount: float = 0
     book_title: Optional[str] = None
     reader_name: Optional[str] = None
     copy_inventory: Optional[str] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Выдача нескольких экземпляров одному читателю за один запрос
+class LoanBatchCreate(BaseModel):
+    reader_id: int = Field(..., ge=1, description="ID читателя")
+    copy_ids: List[int] = Field(default_factory=list, max_length=50, description="ID экземпляров")
+    inventory_numbers: List[str] = Field(default_factory=list, max_length=50, description="Инвентарные номера")
+    loan_days: int = Field(14, ge=1, le=90, description="Срок выдачи в днях")
+
+class LoanBatchItem(BaseModel):
+    copy_id: Optional[int] = None
+    inventory_number: Optional[str] = None
+    success: bool
+    detail: Optional[str] = None  # Причина отказа
+    loan: Optional[LoanInDB] = None
+
+class LoanBatchResult(BaseModel):
+    reader_id: int
+    created: int
+    items: List[LoanBatchItem]
+
+# Возврат по отсканированным инвентарным номерам
+class LoanReturnBatch(BaseModel):
+    inventory_numbers: List[str] = Field(..., min_length=1, max_length=1000, description="Инвентарные номера")
+
+class LoanReturnItem(BaseModel):
+    inventory_number: str
+    success: bool
+    loan_id: Optional[int] = None
+    detail: Optional[str] = None  # Причина отказа
+
+class LoanReturnBatchResult(BaseModel):
+    returned: int
+    items: List[LoanReturnItem]
+
+# Отчет по начисленным штрафам
+class ReaderFines(BaseModel):
+    reader_id: int
+    reader_name: Optional[str] = None
+    loans: int = Field(..., description="Выдачи со штрафом")
+    amount: float
+
+class FinesReport(BaseModel):
+    total_loans: int
+    total_amount: float
+    readers: List[ReaderFines]
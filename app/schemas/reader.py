@@ -20,7 +20,11 @@ class ReaderUpdate(BaseModel):
 class ReaderInDB(ReaderBase):
     id: int
     status: str = "active"
+    active_loans: int = 0
     registration_date: Optional[date] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ReaderMatch(ReaderInDB):
+    score: float = Field(..., description="Сходство с запросом (0..1)")
\ No newline at end of file
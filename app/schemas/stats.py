@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import Dict
+
+class StatusCounts(BaseModel):
+    total: int = 0
+    by_status: Dict[str, int] = Field(default_factory=dict, description="Количество по статусам")
+
+class LoanCounts(StatusCounts):
+    overdue: int = Field(0, description="Просроченные выдачи (статус overdue)")
+
+class DashboardStats(BaseModel):
+    books: int = Field(0, description="Количество книг в каталоге")
+    copies: StatusCounts
+    readers: StatusCounts
+    loans: LoanCounts
+
+class CacheStats(BaseModel):
+    backend: str = Field(..., description="Бэкенд кэша ответов: memory, sqlite или none")
+    entries: int = Field(0, description="Записей в кэше")
+    hits: int = Field(0, description="Попадания")
+    misses: int = Field(0, description="Промахи")
+    stores: int = Field(0, description="Сохраненные ответы")
+    invalidations: int = Field(0, description="Инвалидации после commit")
+    hit_ratio: float = Field(0.0, description="Доля попаданий")
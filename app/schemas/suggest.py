@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class Suggestion(BaseModel):
+    value: str = Field(..., description="Вариант автодополнения")
+    id: Optional[int] = Field(None, description="ID книги или читателя (для авторов не задан)")
+    detail: Optional[str] = Field(None, description="Пояснение: автор книги или номер билета читателя")
@@ -0,0 +1,13 @@
+# Поиск по каталогу и читателям
+from .fulltext import search_books, ensure_fulltext_index, rebuild_fulltext_index
+from .trigram import search_readers, ensure_trigram_index
+
+def ensure_search_indexes(engine) -> None:
+    """Создать поисковые индексы для уже существующих таблиц"""
+    ensure_fulltext_index(engine)
+    ensure_trigram_index(engine)
+
+__all__ = [
+    "search_books", "ensure_fulltext_index", "rebuild_fulltext_index",
+    "search_readers", "ensure_trigram_index", "ensure_search_indexes"
+]
@@ -0,0 +1,125 @@
+import re
+from typing import List, Optional
+
+from sqlalchemy import column, func, inspect, literal_column, select, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.models.book import (
+    Book,
+    BOOKS_FTS_SQLITE_DDL,
+    BOOKS_FTS_SQLITE_REBUILD,
+    BOOKS_FTS_POSTGRES_DDL,
+    BOOKS_TSVECTOR,
+)
+
+books_fts = table("books_fts", column("rowid"))
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Окончания для облегченного стемминга русских слов (длинные - первыми).
+# Основа ищется как префикс, поэтому "книги" находит "книга" и "книгой".
+_RU_ENDINGS = sorted([
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими",
+    "ией", "иях", "ием", "ий", "ия", "ие", "ию", "ых", "их", "ой", "ей",
+    "ый", "ая", "яя", "ое", "ее", "ую", "юю", "ом", "ем", "ам", "ям",
+    "ах", "ях", "ов", "ев", "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+], key=len, reverse=True)
+
+_MIN_STEM = 3
+
+def normalize(value: str) -> str:
+    """Нижний регистр и замена "ё" на "е" (как в индексе)"""
+    return value.lower().replace("ё", "е")
+
+def stem(word: str) -> str:
+    """Отбросить русское окончание, оставив основу не короче трех букв"""
+    for ending in _RU_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= _MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+def query_terms(query: str) -> List[str]:
+    """Основы слов поискового запроса"""
+    return [stem(word) for word in _WORD_RE.findall(normalize(query))]
+
+def _sqlite_match(terms: List[str]) -> str:
+    # Каждая основа - префиксный запрос в кавычках, слова объединяются через AND
+    return " ".join(f'"{term}"*' for term in terms)
+
+def _postgres_tsquery(terms: List[str]) -> str:
+    return " & ".join(f"{term}:*" for term in terms)
+
+def search_books_query(dialect: str, query: str, skip: int = 0, limit: int = 100) -> Optional[Select]:
+    """
+    Запрос поиска книг по названию и автору с ранжированием по релевантности
+    для диалекта dialect; None - в запросе нет ни одного слова
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+
+    if dialect == "sqlite":
+        # Совпадения в названии весят вдвое больше совпадений в авторе
+        q = select(Book).join(
+            books_fts, books_fts.c.rowid == Book.id
+        ).where(
+            text("books_fts MATCH :match").bindparams(match=_sqlite_match(terms))
+        ).order_by(
+            literal_column("bm25(books_fts, 2.0, 1.0)"), Book.id
+        )
+    elif dialect == "postgresql":
+        # Конфигурация 'russian' - литерал, чтобы выражение совпало с GIN-индексом
+        vector = literal_column(BOOKS_TSVECTOR)
+        tsquery = func.to_tsquery(literal_column("'russian'"), _postgres_tsquery(terms))
+        q = select(Book).where(
+            vector.op("@@")(tsquery)
+        ).order_by(
+            func.ts_rank(vector, tsquery).desc(), Book.id
+        )
+    else:
+        # Запасной вариант для остальных СУБД: ILIKE, но с ограничением выборки
+        pattern = f"%{query}%"
+        q = select(Book).where(
+            (Book.title.ilike(pattern)) | (Book.author.ilike(pattern))
+        ).order_by(Book.id)
+
+    return q.offset(skip).limit(limit)
+
+def search_books(db: Session, query: str, skip: int = 0, limit: int = 100) -> List[Book]:
+    """Поиск книг по названию и автору с ранжированием по релевантности"""
+    q = search_books_query(db.get_bind().dialect.name, query, skip=skip, limit=limit)
+    if q is None:
+        return []
+    return list(db.scalars(q))
+
+def ensure_fulltext_index(engine: Engine) -> None:
+    """
+    Создать полнотекстовый индекс для уже существующей таблицы books.
+    Для новых баз индекс создается вместе с таблицей (см. app/models/book.py).
+    """
+    if not inspect(engine).has_table(Book.__tablename__):
+        return
+
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'"
+            )).first()
+            for statement in BOOKS_FTS_SQLITE_DDL:
+                conn.execute(text(statement))
+            if not exists:
+                for statement in BOOKS_FTS_SQLITE_REBUILD:
+                    conn.execute(text(statement))
+        elif engine.dialect.name == "postgresql":
+            for statement in BOOKS_FTS_POSTGRES_DDL:
+                conn.execute(text(statement))
+
+def rebuild_fulltext_index(db: Session) -> None:
+    """Полностью перестроить индекс SQLite FTS5 по таблице books"""
+    if db.get_bind().dialect.name != "sqlite":
+        return
+    for statement in BOOKS_FTS_SQLITE_REBUILD:
+        db.execute(text(statement))
+    db.commit()
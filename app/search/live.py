@@ -0,0 +1,209 @@
+"""
+Индексы поиска в памяти процесса (подсказки, нечеткий поиск читателей).
+
+Индекс строится из БД при первом обращении и затем обновляется изменениями,
+закоммиченными этим процессом. Изменения, сделанные другими воркерами
+или массовыми операциями, процесс не видит, поэтому у каждого индекса есть
+версии: счетчики version:books:search и version:readers:search растут
+с каждым commit, меняющим индексируемые столбцы. Не чаще раза в
+SEARCH_INDEX_CHECK_INTERVAL секунд версии в БД сравниваются с версиями
+индекса, и при расхождении индекс строится заново. SEARCH_INDEX_MAX_AGE
+ограничивает возраст индекса для изменений, прошедших мимо счетчиков
+(ручной SQL). Новый индекс строится рядом со старым и подменяет его
+целиком: запросы никогда не видят наполовину загруженный индекс.
+"""
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.crud.counters import get_versions
+from app.models.book import Book
+from app.models.counter import BUMPED_VERSIONS_KEY, SEARCH_VERSIONS as SEARCH_COLUMNS, search_columns_changed
+from app.models.reader import Reader
+
+# Изменение для индексов в памяти: ("book" | "reader", id, значения или None при удалении).
+# Значения книги - (title, author), читателя - (full_name, library_card)
+Change = Tuple[str, int, Optional[tuple]]
+
+# Версии индексируемых столбцов (счетчики version:<имя>, app/models/counter.py) по видам изменений
+SEARCH_VERSIONS = {"book": SEARCH_COLUMNS[Book][0], "reader": SEARCH_COLUMNS[Reader][0]}
+
+class LiveIndex(ABC):
+    """
+    Индекс в памяти, который строится из БД и затем обновляется
+    изменениями после каждого commit
+    """
+    # Версии (ключи SEARCH_VERSIONS), от которых зависит индекс
+    versions_of: Tuple[str, ...] = ()
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.versions: Dict[str, int] = {}
+
+    @abstractmethod
+    def load(self, db: Session) -> None:
+        """Построить индекс по таблицам БД"""
+
+    @abstractmethod
+    def apply(self, changes: List[Change]) -> None:
+        """Применить изменения, закоммиченные этим процессом"""
+
+class _IndexSlot:
+    """Текущий индекс одного вида для одной БД и его перестроение"""
+
+    def __init__(self, factory: Callable[[], LiveIndex]):
+        self.factory = factory
+        self.index: Optional[LiveIndex] = None
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        # Изменения, закоммиченные во время перестроения: применяются к новому индексу
+        self.during_build: Optional[List[Tuple[List[Change], Mapping[str, int]]]] = None
+        self.built_at = 0.0
+        self.checked_at = 0.0
+
+    def current(self, db: Session) -> LiveIndex:
+        if self.index is None:
+            with self.build_lock:
+                if self.index is None:
+                    self._build(db)
+            return self.index
+        now = time.monotonic()
+        if now - self.checked_at < settings.SEARCH_INDEX_CHECK_INTERVAL:
+            return self.index
+        self.checked_at = now
+        index = self.index
+        versions = self._versions(db, index)
+        with index.lock:
+            stale = versions != index.versions
+        if settings.SEARCH_INDEX_MAX_AGE and now - self.built_at >= settings.SEARCH_INDEX_MAX_AGE:
+            stale = True
+        if stale and self.build_lock.acquire(blocking=False):
+            # Пока индекс перестраивается, остальные запросы читают старый
+            try:
+                self._build(db, versions)
+            finally:
+                self.build_lock.release()
+        return self.index
+
+    @staticmethod
+    def _versions(db: Session, index: LiveIndex) -> Dict[str, int]:
+        return get_versions(db, [SEARCH_VERSIONS[kind] for kind in index.versions_of])
+
+    def _build(self, db: Session, versions: Optional[Dict[str, int]] = None) -> None:
+        with self.lock:
+            self.during_build = []
+        try:
+            index = self.factory()
+            # Версии читаются до данных: изменение между ними приведет
+            # к лишнему перестроению, но не к устаревшему индексу
+            index.versions = versions if versions is not None else self._versions(db, index)
+            index.load(db)
+        except BaseException:
+            with self.lock:
+                self.during_build = None
+            raise
+        with self.lock:
+            for changes, versions in self.during_build:
+                _apply_to(index, changes, versions)
+            self.during_build = None
+            self.index = index
+            self.built_at = self.checked_at = time.monotonic()
+
+    def apply(self, changes: List[Change], versions: Mapping[str, int]) -> None:
+        with self.lock:
+            if self.during_build is not None:
+                self.during_build.append((changes, versions))
+            index = self.index
+        if index is not None:
+            _apply_to(index, changes, versions)
+
+def _apply_to(index: LiveIndex, changes: List[Change], versions: Mapping[str, int]) -> None:
+    with index.lock:
+        index.apply(changes)
+        for name, delta in versions.items():
+            if name in index.versions:
+                index.versions[name] += delta
+
+# Индексы строятся отдельно для каждого движка БД (у тестов - своя база)
+_indexes: "weakref.WeakKeyDictionary[Engine, Dict[str, _IndexSlot]]" = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+def get_live_index(db: Session, name: str, factory: Callable[[], LiveIndex]) -> LiveIndex:
+    """
+    Индекс name для БД сессии: при первом обращении строится, при изменениях
+    из других процессов (версии в БД) - перестраивается
+    """
+    engine = db.get_bind()
+    with _indexes_lock:
+        slots = _indexes.setdefault(engine, {})
+        slot = slots.get(name)
+        if slot is None:
+            slot = slots[name] = _IndexSlot(factory)
+    return slot.current(db)
+
+# Изменения книг и читателей копятся в сессии после flush
+# и применяются к уже построенным индексам только после commit
+_PENDING_KEY = "live_index_pending"
+
+def track_book(session: Session, book_id: int, title: Optional[str], author: Optional[str],
+               deleted: bool = False) -> None:
+    """
+    Зарегистрировать изменение книги (для массовых вставок в обход ORM);
+    версию books:search вызывающий увеличивает сам через apply_session_deltas
+    """
+    session.info.setdefault(_PENDING_KEY, []).append(
+        ("book", book_id, None if deleted else (title, author))
+    )
+
+def track_reader(session: Session, reader_id: int, full_name: Optional[str],
+                 library_card: Optional[str], deleted: bool = False) -> None:
+    """
+    Зарегистрировать изменение читателя (для массовых операций в обход ORM);
+    версию readers:search вызывающий увеличивает сам через apply_session_deltas
+    """
+    session.info.setdefault(_PENDING_KEY, []).append(
+        ("reader", reader_id, None if deleted else (full_name, library_card))
+    )
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Book):
+            track_book(session, obj.id, obj.title, obj.author)
+        elif isinstance(obj, Reader):
+            track_reader(session, obj.id, obj.full_name, obj.library_card)
+    for obj in session.dirty:
+        if isinstance(obj, Book) and search_columns_changed(obj):
+            track_book(session, obj.id, obj.title, obj.author)
+        elif isinstance(obj, Reader) and search_columns_changed(obj):
+            track_reader(session, obj.id, obj.full_name, obj.library_card)
+    for obj in session.deleted:
+        if isinstance(obj, Book):
+            track_book(session, obj.id, None, None, deleted=True)
+        elif isinstance(obj, Reader):
+            track_reader(session, obj.id, None, None, deleted=True)
+
+# Раньше обработчика app/models/counter.py, который забывает увеличенные версии
+@event.listens_for(Session, "after_commit", insert=True)
+def _apply_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    bumped = session.info.get(BUMPED_VERSIONS_KEY, {})
+    versions = {name: bumped[name] for name in SEARCH_VERSIONS.values() if name in bumped}
+    slots = _indexes.get(session.get_bind())
+    if not slots:
+        return
+    for slot in list(slots.values()):
+        slot.apply(pending, versions)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
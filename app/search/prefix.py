@@ -0,0 +1,175 @@
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.book import Book
+from app.models.reader import Reader
+from app.search.fulltext import normalize
+from app.search.live import Change, LiveIndex, get_live_index
+
+FIELDS = ("title", "author", "reader")
+
+def _word_suffixes(value: str) -> List[str]:
+    """Нормализованная строка, начиная с каждого слова: "мастер и маргарита",
+    "и маргарита", "маргарита" - чтобы префикс находил любое слово"""
+    words = normalize(value).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+class PrefixIndex:
+    """
+    Префиксный индекс: отсортированный массив ключей и поиск через bisect.
+    Запись - это ключ (id книги, читателя и т.п.), отображаемое значение
+    и необязательная подпись; вставка и удаление не перестраивают индекс.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[str, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[str, Optional[str], List[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: Hashable, value: str, detail: Optional[str] = None,
+            extra_terms: Iterable[str] = ()) -> None:
+        """Добавить или заменить запись"""
+        self.remove(key)
+        terms = _word_suffixes(value)
+        terms.extend(normalize(term) for term in extra_terms if term)
+        for term in terms:
+            insort(self._keys, (term, key))
+        self._entries[key] = (value, detail, terms)
+
+    def add_many(self, items: Iterable[Tuple[Hashable, str, Optional[str], Iterable[str]]]) -> None:
+        """Массовая загрузка: ключи добавляются в конец и сортируются один раз"""
+        for key, value, detail, extra_terms in items:
+            self.remove(key)
+            terms = _word_suffixes(value)
+            terms.extend(normalize(term) for term in extra_terms if term)
+            self._keys.extend((term, key) for term in terms)
+            self._entries[key] = (value, detail, terms)
+        self._keys.sort()
+
+    def remove(self, key: Hashable) -> None:
+        """Удалить запись, если она есть"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for term in entry[2]:
+            i = bisect_left(self._keys, (term, key))
+            if i < len(self._keys) and self._keys[i] == (term, key):
+                del self._keys[i]
+
+    def search(self, prefix: str, limit: int = 10) -> List[Tuple[Hashable, str, Optional[str]]]:
+        """Первые limit записей, у которых слово начинается с prefix"""
+        prefix = normalize(prefix.strip())
+        if not prefix:
+            return []
+        result = []
+        seen = set()
+        i = bisect_left(self._keys, (prefix,))
+        while i < len(self._keys) and len(result) < limit:
+            term, key = self._keys[i]
+            if not term.startswith(prefix):
+                break
+            if key not in seen:
+                seen.add(key)
+                value, detail, _ = self._entries[key]
+                result.append((key, value, detail))
+            i += 1
+        return result
+
+class SuggestIndex(LiveIndex):
+    """Префиксные индексы по названиям, авторам и ФИО читателей одной БД"""
+    versions_of = ("book", "reader")
+
+    def __init__(self):
+        super().__init__()
+        self.titles = PrefixIndex()
+        self.authors = PrefixIndex()
+        self.readers = PrefixIndex()
+        # Автор каждой книги и число книг автора - чтобы автор исчезал
+        # из подсказок вместе с последней его книгой
+        self._book_authors: Dict[int, str] = {}
+        self._author_books: Dict[str, int] = {}
+
+    def load(self, db: Session) -> None:
+        """Первичное построение индекса одним проходом по таблицам"""
+        with self.lock:
+            titles = []
+            authors = {}
+            for book_id, title, author in db.query(Book.id, Book.title, Book.author):
+                titles.append((book_id, title, author, ()))
+                if author:
+                    author_key = normalize(author)
+                    self._book_authors[book_id] = author_key
+                    self._author_books[author_key] = self._author_books.get(author_key, 0) + 1
+                    authors.setdefault(author_key, author)
+            self.titles.add_many(titles)
+            self.authors.add_many(
+                (author_key, author, None, ()) for author_key, author in authors.items()
+            )
+            self.readers.add_many(
+                (reader_id, full_name, card, (card,))
+                for reader_id, full_name, card in db.query(
+                    Reader.id, Reader.full_name, Reader.library_card
+                )
+            )
+
+    def apply(self, changes: List[Change]) -> None:
+        """Применить изменения книг и читателей после commit"""
+        with self.lock:
+            for kind, item_id, values in changes:
+                if kind == "book":
+                    if values is None:
+                        self.delete_book(item_id)
+                    else:
+                        self.upsert_book(item_id, *values)
+                else:
+                    if values is None:
+                        self.delete_reader(item_id)
+                    else:
+                        self.upsert_reader(item_id, *values)
+
+    def upsert_book(self, book_id: int, title: str, author: str) -> None:
+        with self.lock:
+            self.titles.add(book_id, title, detail=author)
+            self._unlink_author(book_id)
+            if author:
+                author_key = normalize(author)
+                self._book_authors[book_id] = author_key
+                self._author_books[author_key] = self._author_books.get(author_key, 0) + 1
+                if self._author_books[author_key] == 1:
+                    self.authors.add(author_key, author)
+
+    def delete_book(self, book_id: int) -> None:
+        with self.lock:
+            self.titles.remove(book_id)
+            self._unlink_author(book_id)
+
+    def upsert_reader(self, reader_id: int, full_name: str, library_card: str) -> None:
+        with self.lock:
+            self.readers.add(reader_id, full_name, detail=library_card,
+                             extra_terms=[library_card])
+
+    def delete_reader(self, reader_id: int) -> None:
+        with self.lock:
+            self.readers.remove(reader_id)
+
+    def search(self, field: str, prefix: str, limit: int = 10):
+        index = {"title": self.titles, "author": self.authors, "reader": self.readers}[field]
+        with self.lock:
+            return index.search(prefix, limit)
+
+    def _unlink_author(self, book_id: int) -> None:
+        author_key = self._book_authors.pop(book_id, None)
+        if author_key is None:
+            return
+        self._author_books[author_key] -= 1
+        if self._author_books[author_key] == 0:
+            del self._author_books[author_key]
+            self.authors.remove(author_key)
+
+def get_suggest_index(db: Session) -> SuggestIndex:
+    """Индекс подсказок для БД сессии; при первом обращении строится"""
+    return get_live_index(db, "suggest", SuggestIndex)
@@ -0,0 +1,164 @@
+import heapq
+import math
+import re
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import func, inspect, literal, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.reader import Reader, READERS_TRGM_POSTGRES_DDL
+from app.search.fulltext import normalize
+from app.search.live import Change, LiveIndex, get_live_index
+
+# Минимальная доля триграмм запроса, найденных у кандидата
+DEFAULT_THRESHOLD = 0.4
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+def trigrams(value: str) -> Set[str]:
+    """Триграммы строки по правилам pg_trgm: каждое слово дополняется
+    двумя пробелами слева и одним справа"""
+    result = set()
+    for word in _WORD_RE.findall(normalize(value or "")):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+class TrigramIndex:
+    """
+    Инвертированный индекс триграмм: триграмма -> множество ключей.
+    Кандидаты выбираются по самым редким триграммам запроса (prefix filtering),
+    поэтому поиск не перебирает все записи.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._grams: Dict[int, Set[str]] = {}
+
+    def add(self, key: int, value: str) -> None:
+        self.remove(key)
+        grams = trigrams(value)
+        self._grams[key] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: int) -> None:
+        grams = self._grams.pop(key, None)
+        if not grams:
+            return
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(key)
+                if not posting:
+                    del self._postings[gram]
+
+    def search(self, value: str,
+               threshold: float = DEFAULT_THRESHOLD) -> Dict[int, Tuple[float, float]]:
+        """
+        Ключи со сходством не ниже порога. Сходство - доля триграмм запроса,
+        найденных в записи (как word_similarity в pg_trgm: запрос "Петрова Мария"
+        не штрафуется за отчество); при равенстве выше запись с большим
+        коэффициентом Жаккара, т.е. более короткая
+        """
+        query = trigrams(value)
+        if not query:
+            return {}
+        # Сходство >= threshold требует не менее need общих триграмм, значит
+        # кандидат обязан содержать хотя бы одну из (len - need + 1) самых редких
+        need = max(1, math.ceil(threshold * len(query)))
+        rare = sorted(query, key=lambda gram: len(self._postings.get(gram, ())))
+        candidates = set()
+        for gram in rare[:len(query) - need + 1]:
+            candidates.update(self._postings.get(gram, ()))
+
+        scores = {}
+        for key in candidates:
+            grams = self._grams[key]
+            common = len(query & grams)
+            score = common / len(query)
+            if score >= threshold:
+                scores[key] = (score, common / (len(query) + len(grams) - common))
+        return scores
+
+class ReaderFuzzyIndex(LiveIndex):
+    """Нечеткий поиск читателей по ФИО и номеру билета"""
+    versions_of = ("reader",)
+
+    def __init__(self):
+        super().__init__()
+        self.names = TrigramIndex()
+        self.cards = TrigramIndex()
+
+    def load(self, db: Session) -> None:
+        with self.lock:
+            for reader_id, full_name, card in db.query(
+                Reader.id, Reader.full_name, Reader.library_card
+            ):
+                self.names.add(reader_id, full_name)
+                self.cards.add(reader_id, card)
+
+    def apply(self, changes: List[Change]) -> None:
+        with self.lock:
+            for kind, item_id, values in changes:
+                if kind != "reader":
+                    continue
+                if values is None:
+                    self.names.remove(item_id)
+                    self.cards.remove(item_id)
+                else:
+                    full_name, card = values
+                    self.names.add(item_id, full_name)
+                    self.cards.add(item_id, card)
+
+    def search(self, value: str, limit: int = 10,
+               threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[int, float]]:
+        """Лучшие совпадения (id, сходство) по ФИО или номеру билета"""
+        with self.lock:
+            scores = self.names.search(value, threshold)
+            for key, score in self.cards.search(value, threshold).items():
+                if score > scores.get(key, (0.0, 0.0)):
+                    scores[key] = score
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(key, score[0]) for key, score in best]
+
+def search_readers(db: Session, query: str, limit: int = 10,
+                   threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[Reader, float]]:
+    """
+    Нечеткий поиск читателей, устойчивый к опечаткам.
+    PostgreSQL: pg_trgm и GIN-индексы; остальные СУБД: индекс триграмм в памяти.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # Оператор <% использует GIN-индексы gin_trgm_ops, но отсекает строки по своему
+        # порогу pg_trgm.word_similarity_threshold (по умолчанию 0.6) - задаем наш
+        # на время транзакции, иначе совпадения между порогами терялись бы
+        db.execute(
+            select(func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True))
+        )
+        score = func.greatest(
+            func.word_similarity(query, Reader.full_name),
+            func.word_similarity(query, Reader.library_card)
+        ).label("score")
+        rows = db.query(Reader, score).filter(
+            literal(query).op("<%")(Reader.full_name) | literal(query).op("<%")(Reader.library_card)
+        ).order_by(score.desc(), Reader.id).limit(limit).all()
+        return [(reader, score) for reader, score in rows if score >= threshold]
+
+    index = get_live_index(db, "reader_trigrams", ReaderFuzzyIndex)
+    matches = index.search(query, limit=limit, threshold=threshold)
+    if not matches:
+        return []
+    readers = {
+        reader.id: reader
+        for reader in db.query(Reader).filter(Reader.id.in_([key for key, _ in matches]))
+    }
+    return [(readers[key], score) for key, score in matches if key in readers]
+
+def ensure_trigram_index(engine: Engine) -> None:
+    """Создать индексы pg_trgm для уже существующей таблицы readers"""
+    if engine.dialect.name != "postgresql" or not inspect(engine).has_table(Reader.__tablename__):
+        return
+    with engine.begin() as conn:
+        for statement in READERS_TRGM_POSTGRES_DDL:
+            conn.execute(text(statement))
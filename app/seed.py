@@ -109,6 +109,9 @@ def seed_database():
                 status="active"
             )
             db.add(loan)
+            db.query(Reader).filter(Reader.id == 1).update(
+                {Reader.active_loans: Reader.active_loans + 1}
+            )
             
             # Меняем статус экземпляра
             copy = db.query(Copy).filter(Copy.id == 1).first()
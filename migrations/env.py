@@ -0,0 +1,61 @@
+from logging.config import fileConfig
+
+from sqlalchemy import create_engine, pool
+
+from alembic import context
+
+from app.config import settings
+from app.database import Base
+import app.models  # noqa: F401 - регистрирует все модели в Base.metadata
+
+config = context.config
+
+# Соединение передается из app.schema.upgrade_schema; при запуске
+# из командной строки (alembic upgrade head) настраиваем логирование сами
+connection = config.attributes.get("connection")
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def include_name(name, type_, parent_names):
+    # Таблица FTS5 и ее служебные таблицы создаются миграциями вручную
+    if type_ == "table":
+        return not name.startswith("books_fts")
+    return True
+
+def configure(**kwargs) -> None:
+    context.configure(
+        target_metadata=target_metadata,
+        include_name=include_name,
+        # SQLite не умеет ALTER большей части конструкций - пересоздаем таблицы
+        render_as_batch=True,
+        **kwargs
+    )
+
+def run_migrations_offline() -> None:
+    configure(
+        url=settings.DATABASE_URL,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    if connection is not None:
+        configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    with engine.connect() as conn:
+        configure(connection=conn)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
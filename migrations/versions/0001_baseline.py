@@ -0,0 +1,131 @@
+"""Исходная схема: книги, экземпляры, читатели, сотрудники, выдачи и счетчики
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.book import BOOKS_FTS_SQLITE_DDL, BOOKS_FTS_POSTGRES_DDL
+from app.models.reader import READERS_TRGM_POSTGRES_DDL
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'books',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('author', sa.String(length=255), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=True),
+        sa.Column('publisher', sa.String(length=255), nullable=True),
+        sa.Column('genre', sa.String(length=100), nullable=True),
+        sa.Column('isbn', sa.String(length=20), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_books_id', 'books', ['id'])
+    op.create_index('ix_books_title', 'books', ['title'])
+    op.create_index('ix_books_author', 'books', ['author'])
+    op.create_index('ix_books_isbn', 'books', ['isbn'], unique=True)
+
+    op.create_table(
+        'readers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('full_name', sa.String(length=255), nullable=False),
+        sa.Column('library_card', sa.String(length=50), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=True),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('address', sa.String(length=255), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('registration_date', sa.Date(), server_default=sa.func.current_date(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_readers_id', 'readers', ['id'])
+    op.create_index('ix_readers_full_name', 'readers', ['full_name'])
+    op.create_index('ix_readers_library_card', 'readers', ['library_card'], unique=True)
+    op.create_index('ix_readers_status', 'readers', ['status'])
+
+    op.create_table(
+        'librarians',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('full_name', sa.String(length=255), nullable=False),
+        sa.Column('position', sa.String(length=100), nullable=True),
+        sa.Column('login', sa.String(length=50), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.String(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_librarians_id', 'librarians', ['id'])
+    op.create_index('ix_librarians_login', 'librarians', ['login'], unique=True)
+    op.create_index('ix_librarians_role', 'librarians', ['role'])
+
+    op.create_table(
+        'copies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('book_id', sa.Integer(), nullable=False),
+        sa.Column('inventory_number', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('acquisition_date', sa.Date(), server_default=sa.func.current_date(), nullable=True),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_copies_id', 'copies', ['id'])
+    op.create_index('ix_copies_inventory_number', 'copies', ['inventory_number'], unique=True)
+    op.create_index('ix_copies_status', 'copies', ['status'])
+
+    op.create_table(
+        'loans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('copy_id', sa.Integer(), nullable=False),
+        sa.Column('reader_id', sa.Integer(), nullable=False),
+        sa.Column('librarian_id', sa.Integer(), nullable=True),
+        sa.Column('loan_date', sa.Date(), server_default=sa.func.current_date(), nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=False),
+        sa.Column('return_date', sa.Date(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.ForeignKeyConstraint(['copy_id'], ['copies.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['reader_id'], ['readers.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['librarian_id'], ['librarians.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_loans_id', 'loans', ['id'])
+    op.create_index('ix_loans_status', 'loans', ['status'])
+
+    # Пустая база - счетчики начинаются с нуля
+    op.create_table(
+        'library_counters',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in BOOKS_FTS_SQLITE_DDL:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        for statement in BOOKS_FTS_POSTGRES_DDL + READERS_TRGM_POSTGRES_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS books_fts')
+    op.drop_table('library_counters')
+    op.drop_table('loans')
+    op.drop_table('copies')
+    op.drop_table('librarians')
+    op.drop_table('readers')
+    op.drop_table('books')
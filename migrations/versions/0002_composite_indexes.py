@@ -0,0 +1,36 @@
+"""Составные индексы для частых фильтров выдач и экземпляров
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (имя, таблица, колонки). Первая колонка каждого индекса заодно
+# покрывает внешние ключи loans.copy_id, loans.reader_id и copies.book_id
+INDEXES = [
+    ('ix_loans_copy_id_status', 'loans', ['copy_id', 'status']),
+    ('ix_loans_reader_id_status', 'loans', ['reader_id', 'status']),
+    ('ix_loans_status_due_date', 'loans', ['status', 'due_date']),
+    ('ix_copies_book_id_status', 'copies', ['book_id', 'status']),
+]
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: в базах, созданных через create_all, часть индексов уже есть
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,34 @@
+"""Счетчик активных выдач читателя
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('readers') as batch_op:
+        batch_op.add_column(
+            sa.Column('active_loans', sa.Integer(), nullable=False, server_default='0')
+        )
+    op.execute(
+        "UPDATE readers SET active_loans = ("
+        "SELECT count(*) FROM loans "
+        "WHERE loans.reader_id = readers.id AND loans.status = 'active')"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('readers') as batch_op:
+        batch_op.drop_column('active_loans')
@@ -0,0 +1,40 @@
+"""Штрафы за просрочку и аренда фоновых задач
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('loans') as batch_op:
+        batch_op.add_column(
+            sa.Column('fine_amount', sa.Float(), nullable=False, server_default='0')
+        )
+    # В базах, созданных через create_all до миграций, таблица уже есть
+    if 'scheduler_leases' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'scheduler_leases',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('owner', sa.String(length=128), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('scheduler_leases')
+    with op.batch_alter_table('loans') as batch_op:
+        batch_op.drop_column('fine_amount')
@@ -0,0 +1,28 @@
+"""Покрывающий индекс для отчета по штрафам
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: в базах, созданных через create_all, индекс уже есть
+    op.create_index(
+        'ix_loans_due_date_reader_id_return_date', 'loans',
+        ['due_date', 'reader_id', 'return_date'], if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_loans_due_date_reader_id_return_date', table_name='loans', if_exists=True)
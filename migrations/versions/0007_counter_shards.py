@@ -0,0 +1,50 @@
+"""Строки счетчиков по shard: выдачи не обновляют одну и ту же строку
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _counters_table(name: str, sharded: bool) -> None:
+    columns = [sa.Column('name', sa.String(length=64), nullable=False)]
+    if sharded:
+        columns.append(sa.Column('shard', sa.Integer(), nullable=False))
+    columns.append(sa.Column('value', sa.Integer(), nullable=False))
+    op.create_table(name, *columns, sa.PrimaryKeyConstraint('name', *(['shard'] if sharded else [])))
+
+
+def upgrade() -> None:
+    # В базах, созданных через create_all, таблица уже со столбцом shard
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('library_counters')}
+    if 'shard' in columns:
+        return
+    # Первичный ключ меняется пересозданием таблицы - одинаково для SQLite и PostgreSQL
+    _counters_table('library_counters_new', sharded=True)
+    op.execute(
+        'INSERT INTO library_counters_new (name, shard, value) '
+        'SELECT name, 0, value FROM library_counters'
+    )
+    op.drop_table('library_counters')
+    op.rename_table('library_counters_new', 'library_counters')
+
+
+def downgrade() -> None:
+    _counters_table('library_counters_old', sharded=False)
+    op.execute(
+        'INSERT INTO library_counters_old (name, value) '
+        'SELECT name, SUM(value) FROM library_counters GROUP BY name'
+    )
+    op.drop_table('library_counters')
+    op.rename_table('library_counters_old', 'library_counters')
@@ -0,0 +1,34 @@
+"""Срок аренды фоновой задачи - время с часовым поясом (UTC)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Прежние значения записаны в UTC без пояса (datetime.utcnow)
+    with op.batch_alter_table('scheduler_leases') as batch_op:
+        batch_op.alter_column(
+            'expires_at', type_=sa.DateTime(timezone=True), existing_nullable=False,
+            postgresql_using="expires_at AT TIME ZONE 'UTC'"
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('scheduler_leases') as batch_op:
+        batch_op.alter_column(
+            'expires_at', type_=sa.DateTime(), existing_nullable=False,
+            postgresql_using="expires_at AT TIME ZONE 'UTC'"
+        )
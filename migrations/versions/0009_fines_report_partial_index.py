@@ -0,0 +1,34 @@
+"""Отчет по штрафам суммирует fine_amount: частичный индекс выдач со штрафом
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_loans_due_date_reader_id_return_date', table_name='loans', if_exists=True)
+    # IF NOT EXISTS: в базах, созданных через create_all, индекс уже есть
+    op.create_index(
+        'ix_loans_fined_reader_id', 'loans', ['reader_id', 'fine_amount'], if_not_exists=True,
+        sqlite_where=sa.text('fine_amount > 0'), postgresql_where=sa.text('fine_amount > 0')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_loans_fined_reader_id', table_name='loans', if_exists=True)
+    op.create_index(
+        'ix_loans_due_date_reader_id_return_date', 'loans',
+        ['due_date', 'reader_id', 'return_date'], if_not_exists=True
+    )
@@ -0,0 +1,53 @@
+"""Штрафы выдач, возвращенных с просрочкой до появления fine_amount
+
+Ревизия 0004 добавила fine_amount со значением 0 для всех строк, а отчет по
+штрафам суммирует только его: выдачи, закрытые с просрочкой раньше, считались
+бы бесплатными. Штраф таких выдач - дни просрочки по дату возврата, умноженные
+на FINE_PER_DAY (как при возврате, app/crud/loan.py:close_loans).
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+loans = sa.table(
+    'loans',
+    sa.column('status', sa.String),
+    sa.column('due_date', sa.Date),
+    sa.column('return_date', sa.Date),
+    sa.column('fine_amount', sa.Float),
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'sqlite':
+        days = sa.func.julianday(loans.c.return_date) - sa.func.julianday(loans.c.due_date)
+    else:
+        # PostgreSQL и другие: разность двух дат - число дней
+        days = loans.c.return_date - loans.c.due_date
+    # Штраф, уже записанный при возврате, не пересчитывается
+    op.execute(
+        loans.update().where(
+            loans.c.status == 'returned',
+            loans.c.return_date > loans.c.due_date,
+            loans.c.fine_amount == 0
+        ).values(fine_amount=days * settings.FINE_PER_DAY)
+    )
+
+
+def downgrade() -> None:
+    # Заполненные штрафы не отличить от начисленных при возврате - оставляем их
+    pass
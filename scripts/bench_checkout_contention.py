@@ -0,0 +1,179 @@
+"""
+Нагрузочная проверка выдачи под конкуренцией.
+
+Несколько потоков одновременно выдают небольшой набор "горячих" экземпляров
+небольшому числу читателей. После каждого раунда проверяется, что ни один
+экземпляр не выдан дважды, ни один читатель не превысил лимит, а счетчики
+совпадают с фактическими значениями; затем все книги возвращаются.
+
+Каждая база (временная SQLite и базы --database-url, например PostgreSQL)
+проверяется с каждым числом строк счетчиков из --shards: с одной строкой
+все выдачи обновляют одни и те же строки library_counters.
+
+    python scripts/bench_checkout_contention.py --threads 16 --rounds 5
+    python scripts/bench_checkout_contention.py --database-url postgresql://... --shards 1 8
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.api.loans import create_loan
+from app.config import settings
+from app.crud import counters
+from app.crud.loan import return_copies
+from app.models import Book, Copy, Loan, Reader
+from app.schema import upgrade_schema
+from app.schemas.loan import LoanCreate
+
+def prepare(Session, copies: int, readers: int):
+    # Свои номера у каждого запуска: база --database-url может быть не пустой
+    prefix = f"BENCH-{uuid.uuid4().hex[:8]}"
+    db = Session()
+    try:
+        book = Book(title="Нагрузочная книга", author="Автор")
+        db.add(book)
+        db.flush()
+        db.add_all(Copy(book_id=book.id, inventory_number=f"{prefix}-{i}") for i in range(copies))
+        db.add_all(Reader(full_name=f"Читатель {i}", library_card=f"{prefix}-R{i}") for i in range(readers))
+        db.commit()
+        copy_ids = [row.id for row in db.query(Copy.id).filter(Copy.inventory_number.like(f"{prefix}-%"))]
+        reader_ids = [row.id for row in db.query(Reader.id).filter(Reader.library_card.like(f"{prefix}-R%"))]
+        return copy_ids, reader_ids
+    finally:
+        db.close()
+
+def worker(Session, copy_ids, reader_ids, attempts, stats, lock):
+    local = {"created": 0, "rejected": 0, "busy": 0}
+    db = Session()
+    try:
+        for _ in range(attempts):
+            request = LoanCreate(copy_id=random.choice(copy_ids), reader_id=random.choice(reader_ids))
+            try:
+                create_loan(request, db=db)
+                local["created"] += 1
+            except HTTPException:
+                local["rejected"] += 1
+            except OperationalError:
+                # SQLite: база занята дольше таймаута; PostgreSQL: взаимная блокировка
+                db.rollback()
+                local["busy"] += 1
+    finally:
+        db.close()
+    with lock:
+        for key, value in local.items():
+            stats[key] += value
+
+def verify(Session, max_books: int) -> list:
+    db = Session()
+    try:
+        problems = []
+        double = db.query(Loan.copy_id).filter(Loan.status == "active").group_by(
+            Loan.copy_id
+        ).having(func.count() > 1).all()
+        if double:
+            problems.append(f"экземпляры выданы дважды: {[row.copy_id for row in double]}")
+        over = db.query(Loan.reader_id).filter(Loan.status == "active").group_by(
+            Loan.reader_id
+        ).having(func.count() > max_books).all()
+        if over:
+            problems.append(f"превышен лимит у читателей: {[row.reader_id for row in over]}")
+        mismatches = counters.check_counters(db)
+        if mismatches:
+            problems.append(f"расхождения счетчиков: {mismatches}")
+        return problems
+    finally:
+        db.close()
+
+def return_all(Session) -> None:
+    db = Session()
+    try:
+        numbers = [row.inventory_number for row in db.query(Copy.inventory_number).filter(
+            Copy.status == "borrowed"
+        )]
+        if numbers:
+            return_copies(db, numbers)
+    finally:
+        db.close()
+
+def run(url: str, shards: int, args) -> bool:
+    """Раунды выдачи на базе url; True, если найдены ошибки"""
+    settings.COUNTER_SHARDS = shards
+    connect_args = {"check_same_thread": False, "timeout": 30} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args, pool_size=args.threads + 1)
+    try:
+        upgrade_schema(engine)
+        Session = sessionmaker(bind=engine)
+        copy_ids, reader_ids = prepare(Session, args.copies, args.readers)
+
+        stats = {"created": 0, "rejected": 0, "busy": 0}
+        lock = threading.Lock()
+        failed = False
+        elapsed = 0.0
+        print(f"{engine.dialect.name}, строк на счетчик: {shards}")
+        for round_no in range(1, args.rounds + 1):
+            threads = [
+                threading.Thread(target=worker, args=(Session, copy_ids, reader_ids, args.attempts, stats, lock))
+                for _ in range(args.threads)
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed += time.perf_counter() - started
+
+            problems = verify(Session, settings.MAX_BOOKS_PER_READER)
+            print(f"  Раунд {round_no}: {'ошибки: ' + '; '.join(problems) if problems else 'ok'}")
+            failed = failed or bool(problems)
+            return_all(Session)
+
+        total = stats["created"] + stats["rejected"] + stats["busy"]
+        print(f"  Потоков: {args.threads}, попыток: {total} за {elapsed:.2f} с "
+              f"({total / elapsed:.0f} в секунду)")
+        print(f"  Выдано: {stats['created']}, отказано: {stats['rejected']}, БД занята: {stats['busy']}")
+        return failed
+    finally:
+        engine.dispose()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", action="append", default=[],
+                        help="База для проверки (можно несколько); временная SQLite проверяется всегда")
+    parser.add_argument("--shards", type=int, nargs="+", default=[settings.COUNTER_SHARDS],
+                        help="Числа строк на счетчик (COUNTER_SHARDS) для сравнения")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--attempts", type=int, default=50, help="Попыток выдачи на поток за раунд")
+    parser.add_argument("--copies", type=int, default=20, help="Число горячих экземпляров")
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+
+    failed = False
+    for url in [None, *args.database_url]:
+        for shards in args.shards:
+            tmp_path = None
+            if url is None:
+                fd, tmp_path = tempfile.mkstemp(suffix=".db")
+                os.close(fd)
+            try:
+                failed = run(url or f"sqlite:///{tmp_path}", shards, args) or failed
+            finally:
+                if tmp_path:
+                    os.unlink(tmp_path)
+    print("❌ Найдены двойные выдачи или превышение лимита" if failed else "✅ Двойных выдач нет")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Задержки под конкуренцией: синхронный режим (маршруты ждут БД в пуле потоков
+AnyIO размера THREADPOOL_SIZE) против асинхронного (DB_ASYNC, app/api/aio).
+
+Для каждого размера пула и для DB_ASYNC uvicorn запускается на временной базе SQLite с кэшем ответов
+отключенным (RESPONSE_CACHE_BACKEND=none), чтобы каждый запрос шел в БД.
+Затем --clients клиентов одновременно выполняют по --requests запросов
+вперемешку: карточка книги, читатель по билету, экземпляр по инвентарному номеру.
+Выводятся p50/p95/p99 задержки и пропускная способность.
+
+    python scripts/bench_concurrency.py --clients 500 --requests 20 --threadpool 40 100
+    python scripts/bench_concurrency.py --database-url postgresql://...  # DB_ASYNC - через asyncpg
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(env: dict, port: int, timeout: float = 60.0) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn завершился при старте")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError(f"Сервер не ответил за {timeout} с")
+
+def prepare(base: str, books: int) -> list:
+    """Каталог для замеров; возвращает список URL для чтения"""
+    urls = []
+    with httpx.Client(base_url=base) as client:
+        for i in range(books):
+            book_id = client.post("/api/books/", json={"title": f"Книга {i}", "author": "Автор"}).json()["id"]
+            client.post("/api/copies/", json={"book_id": book_id, "inventory_number": f"CONC-{i}"})
+            client.post("/api/readers/", json={"full_name": f"Читатель {i}", "library_card": f"CONC-R{i}"})
+            urls += [f"/api/books/{book_id}", f"/api/copies/inventory/CONC-{i}", f"/api/readers/card/CONC-R{i}"]
+    return urls
+
+async def load(base: str, urls: list, clients: int, requests: int) -> tuple:
+    latencies = []
+    errors = 0
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        for _ in range(requests):
+            started = time.perf_counter()
+            try:
+                response = await client.get(random.choice(urls))
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.TransportError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return sorted(latencies), errors, elapsed
+
+def percentile(values: list, share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+def run_mode(name: str, env: dict, args) -> None:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = start_server(env, port)
+    try:
+        urls = prepare(base, args.books)
+        latencies, errors, elapsed = asyncio.run(load(base, urls, args.clients, args.requests))
+    finally:
+        server.terminate()
+        server.wait()
+    print(f"{name:>12}: p50 {percentile(latencies, 0.50) * 1000:7.1f} мс, "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.1f} мс, "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.1f} мс, "
+          f"{len(latencies) / elapsed:6.0f} запросов/с, ошибок: {errors}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="По умолчанию - временная база SQLite для каждого режима")
+    parser.add_argument("--clients", type=int, default=500, help="Одновременных клиентов")
+    parser.add_argument("--requests", type=int, default=20, help="Запросов на клиента")
+    parser.add_argument("--books", type=int, default=50, help="Книг (и экземпляров, читателей) в каталоге")
+    parser.add_argument("--threadpool", type=int, nargs="+", default=[40], help="Размеры пула потоков синхронного режима")
+    parser.add_argument("--no-async", action="store_true", help="Не замерять режим DB_ASYNC")
+    args = parser.parse_args()
+
+    print(f"Клиентов: {args.clients}, запросов на клиента: {args.requests}")
+    modes = [(f"{size} потоков", {"THREADPOOL_SIZE": str(size)}) for size in args.threadpool]
+    if not args.no_async:
+        modes.append(("DB_ASYNC", {"DB_ASYNC": "true"}))
+    for name, mode_env in modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(tmp, 'library.db')}",
+                "RESPONSE_CACHE_BACKEND": "none",
+                "OVERDUE_SWEEP_INTERVAL": "0",
+                **mode_env,
+            }
+            run_mode(name, env, args)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Накладные расходы метрик (app/metrics.py).
+
+1. Микрозамер в процессе: MetricsMiddleware вокруг пустого ASGI-приложения
+   и события курсора на SELECT 1 в SQLite в памяти - с метриками и без.
+2. Сквозной замер: uvicorn на временной базе SQLite с METRICS_ENABLED=true
+   и false (кэш ответов отключен, каждый запрос идет в БД); --requests
+   последовательных запросов карточки книги, раунды режимов чередуются.
+
+    python scripts/bench_metrics_overhead.py --requests 2000 --rounds 3
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from app import metrics
+
+def per_call(func, repeat: int) -> float:
+    """Среднее время вызова func, мкс"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+def micro(repeat: int) -> None:
+    async def empty_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/api/books/1"}
+    loop = asyncio.new_event_loop()
+    wrapped = metrics.MetricsMiddleware(empty_app)
+    bare = per_call(lambda: loop.run_until_complete(empty_app(scope, None, send)), repeat)
+    measured = per_call(lambda: loop.run_until_complete(wrapped(scope, None, send)), repeat)
+    loop.close()
+    print(f"middleware: {measured - bare:6.1f} мкс на запрос")
+
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        query = lambda: connection.execute(text("SELECT 1")).scalar()
+        bare = per_call(query, repeat)
+        metrics.instrument_queries()
+        measured = per_call(query, repeat)
+    event.remove(Engine, "before_cursor_execute", metrics._before_cursor_execute)
+    event.remove(Engine, "after_cursor_execute", metrics._after_cursor_execute)
+    print(f"события курсора: {measured - bare:6.1f} мкс на SQL-запрос ({bare:.1f} мкс без метрик)")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(env: dict, port: int, timeout: float = 60.0) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL
+    )
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn завершился при старте")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.05)
+    server.terminate()
+    raise RuntimeError(f"Сервер не ответил за {timeout} с")
+
+def end_to_end(enabled: bool, requests: int) -> list:
+    """Задержки (мс) последовательных запросов карточки книги"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'library.db')}",
+            "METRICS_ENABLED": "true" if enabled else "false",
+            "RESPONSE_CACHE_BACKEND": "none",
+            "OVERDUE_SWEEP_INTERVAL": "0",
+        }
+        port = free_port()
+        server = start_server(env, port)
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+                book_id = client.post("/api/books/", json={"title": "Книга", "author": "Автор"}).json()["id"]
+                for _ in range(100):
+                    client.get(f"/api/books/{book_id}")
+                latencies = []
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    client.get(f"/api/books/{book_id}")
+                    latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            server.terminate()
+            server.wait()
+    return latencies
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20000, help="Повторов микрозамера")
+    parser.add_argument("--requests", type=int, default=2000, help="Запросов в раунде сквозного замера")
+    parser.add_argument("--rounds", type=int, default=3, help="Раундов каждого режима")
+    args = parser.parse_args()
+
+    micro(args.repeat)
+    results = {True: [], False: []}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            results[enabled] += end_to_end(enabled, args.requests)
+    for enabled, latencies in results.items():
+        latencies.sort()
+        print(f"METRICS_ENABLED={str(enabled).lower():>5}: медиана {statistics.median(latencies):.3f} мс, "
+              f"p99 {latencies[int(len(latencies) * 0.99)]:.3f} мс")
+    overhead = statistics.median(results[True]) - statistics.median(results[False])
+    print(f"Разница медиан: {overhead * 1000:+.0f} мкс на запрос")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
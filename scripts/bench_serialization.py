@@ -0,0 +1,100 @@
+"""
+Стоимость сериализации списков выдач в расчете на элемент.
+
+"До": схема собирается на каждую строку (LoanInDB(**row._asdict())), FastAPI
+повторно проверяет список по response_model и сериализует его через json.
+"После": одна проверка TypeAdapter на весь список (app/schemas/adapters.py)
+и готовый JSON из pydantic-core (app/api/responses.py). Строки берутся из временной базы SQLite, время запроса
+к БД в замеры не входит.
+
+    python scripts/bench_serialization.py --rows 1000 --repeat 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.api.responses import json_list
+from app.crud.loan import loan_details_query, to_loan_details
+from app.database import Base
+from app.models import Book, Copy, Loan, Reader
+from app.schemas.loan import LoanInDB
+
+def prepare(db: Session, rows: int) -> None:
+    today = date.today()
+    db.execute(insert(Book.__table__), [{"id": 1, "title": "Книга для замеров", "author": "Автор"}])
+    db.execute(insert(Reader.__table__), [
+        {"id": 1, "full_name": "Читатель для замеров", "library_card": "BENCH-R1", "status": "active"}
+    ])
+    db.execute(insert(Copy.__table__), [
+        {"id": i, "book_id": 1, "inventory_number": f"BENCH-{i}", "status": "borrowed"}
+        for i in range(1, rows + 1)
+    ])
+    db.execute(insert(Loan.__table__), [
+        {"copy_id": i, "reader_id": 1, "loan_date": today, "due_date": today + timedelta(days=14),
+         "status": "active"}
+        for i in range(1, rows + 1)
+    ])
+    db.commit()
+
+def measure(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            prepare(db, args.rows)
+            rows = loan_details_query(db).all()
+
+        field = create_response_field(name="Response_read_loans", type_=List[LoanInDB])
+        loop = asyncio.new_event_loop()
+
+        def before() -> bytes:
+            loans = [LoanInDB(**row._asdict()) for row in rows]
+            content = loop.run_until_complete(serialize_response(field=field, response_content=loans))
+            return JSONResponse(content).body
+
+        def after() -> bytes:
+            return json_list(LoanInDB, to_loan_details(rows)).body
+
+        assert json.loads(before()) == json.loads(after())
+        results = {"до": measure(before, args.repeat), "после": measure(after, args.repeat)}
+        loop.close()
+
+        print(f"Строк в списке: {args.rows}, повторов: {args.repeat}")
+        for name, seconds in results.items():
+            print(f"{name:>6}: {seconds * 1000:8.2f} мс на список, "
+                  f"{seconds / args.rows * 1e6:6.2f} мкс на элемент")
+        print(f"Ускорение: {results['до'] / results['после']:.1f}x")
+        return 0
+    finally:
+        engine.dispose()
+        os.unlink(path)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Время холодного старта воркера.
+
+1. Импорт приложения: python -X importtime -c "import app.main" - общее время
+   и самые дорогие модули (накопительно, вместе с вложенными импортами).
+2. Время до первого ответа: uvicorn запускается на свободном порту,
+   /api/health опрашивается до первого ответа 200.
+
+Замеры выполняются на временной базе SQLite, чтобы старт с миграциями
+(AUTO_MIGRATE=true) и без них (миграции - отдельным шагом python -m app.schema)
+можно было сравнить.
+
+    python scripts/bench_startup.py --runs 3 --top 15
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_times(env: dict) -> list:
+    """Накопительное время импорта модулей (мкс) по выводу -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times.append((int(cumulative), name.strip()))
+    return times
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def time_to_first_response(env: dict, timeout: float = 60.0) -> float:
+    """Секунды от запуска uvicorn до первого ответа 200 на /api/health"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn завершился до первого ответа")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError(f"Нет ответа за {timeout} с")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Запусков на каждый замер (берется лучший)")
+    parser.add_argument("--top", type=int, default=15, help="Сколько самых дорогих модулей показать")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'library.db')}",
+            "OVERDUE_SWEEP_INTERVAL": "0",
+        }
+        runs = [import_times(env) for _ in range(args.runs)]
+        # Последняя строка вывода - сам app.main с накопительным временем всего импорта
+        best = min(runs, key=lambda times: times[-1][0])
+        print(f"Импорт app.main: {best[-1][0] / 1000:.1f} мс")
+        for us, name in sorted(best, reverse=True)[1:args.top + 1]:
+            print(f"   {us / 1000:8.1f} мс  {name}")
+
+        migrated = min(time_to_first_response({**env, "AUTO_MIGRATE": "true"}) for _ in range(args.runs))
+        # База уже обновлена последним запуском - как после шага python -m app.schema
+        plain = min(time_to_first_response({**env, "AUTO_MIGRATE": "false"}) for _ in range(args.runs))
+        print(f"До первого ответа с миграциями при старте: {migrated * 1000:.0f} мс")
+        print(f"До первого ответа без миграций (AUTO_MIGRATE=false): {plain * 1000:.0f} мс")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
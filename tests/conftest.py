@@ -2,7 +2,7 @@
 import pytest
 import os
 import tempfile
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from app.database import Base
@@ -34,12 +34,23 @@ def test_db():
 
 # Тестовый клиент FastAPI, переопределяющий зависимость get_db
 from fastapi.testclient import TestClient
+from app import cache
+from app.config import settings
 from app.main import app
-from app.database import get_db
+from app.database import get_db, get_read_db
 
 @pytest.fixture(scope="function")
 def client(test_db, monkeypatch):
     """Возвращает TestClient с переопределенной БД"""
+    # Миграции и фоновая проверка просрочки при старте не запускаются: они работают с основной БД
+    monkeypatch.setattr(settings, "AUTO_MIGRATE", False)
+    monkeypatch.setattr(settings, "OVERDUE_SWEEP_INTERVAL", 0)
+    # Маршрут, превысивший бюджет SQL-запросов (app/query_budget.py), роняет тест
+    monkeypatch.setattr(settings, "QUERY_DEBUG", True)
+    monkeypatch.setattr(settings, "QUERY_BUDGET_STRICT", True)
+    # Кэш ответов общий для процесса: ответы прошлых тестов не должны попадать в новые
+    cache.response_cache.clear()
+
     def override_get_db():
         try:
             yield test_db
@@ -47,9 +58,31 @@ def client(test_db, monkeypatch):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_read_db, None)
+
+
+@pytest.fixture(scope="function")
+def count_queries(test_db):
+    """Возвращает функцию, выполняющую func и считающую SQL-запросы к тестовой БД"""
+    def run(func):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = test_db.get_bind()
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            result = func()
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        return result, len(statements)
+
+    return run
 
 
 # Примеры данных для тестов
@@ -1,5 +1,7 @@
 from fastapi import status
 
+from app.crud.pagination import encode_cursor
+
 def test_health_check(client):
     """Тест эндпоинта проверки здоровья"""
     response = client.get("/api/health")
@@ -226,4 +228,71 @@ def test_reader_book_limit(client):
     
     # Должна быть ошибка о превышении лимита
     assert loan_response.status_code == status.HTTP_400_BAD_REQUEST
-    assert "лимит" in loan_response.json()["detail"].lower()
\ No newline at end of file
+    assert "лимит" in loan_response.json()["detail"].lower()
+
+
+def test_books_cursor_pagination(client):
+    """Тест постраничного вывода по курсору"""
+    created_ids = []
+    for i in range(5):
+        response = client.post("/api/books/", json={"title": f"Книга {i}", "author": "Автор"})
+        created_ids.append(response.json()["id"])
+
+    # Первая страница без курсора возвращает курсор следующей
+    response = client.get("/api/books/?limit=2")
+    assert response.status_code == status.HTTP_200_OK
+    seen_ids = [book["id"] for book in response.json()]
+    cursor = response.headers.get("X-Next-Cursor")
+
+    while cursor:
+        response = client.get("/api/books/", params={"limit": 2, "after": cursor})
+        assert response.status_code == status.HTTP_200_OK
+        seen_ids.extend(book["id"] for book in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert seen_ids == sorted(created_ids)
+
+    # Offset-режим продолжает работать
+    response = client.get("/api/books/?skip=2&limit=2")
+    assert [book["id"] for book in response.json()] == sorted(created_ids)[2:4]
+
+    # Поврежденный курсор
+    response = client.get("/api/books/?after=@@@")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    # Курсор с неверным типом значения и курсор вместе с offset
+    response = client.get("/api/books/", params={"after": encode_cursor(["1"])})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.get("/api/books/", params={"after": encode_cursor([True])})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.get("/api/books/", params={"skip": 2, "after": encode_cursor([1])})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_fulltext_search_ranking_and_morphology(client):
+    """Тест полнотекстового поиска: словоформы, буква ё, ранжирование и синхронизация"""
+    client.post("/api/books/", json={"title": "Ёжик в тумане", "author": "Сергей Козлов"})
+    client.post("/api/books/", json={"title": "Сказки", "author": "Ежиков Петр"})
+    response = client.post("/api/books/", json={"title": "Преступление и наказание", "author": "Достоевский"})
+    book_id = response.json()["id"]
+
+    # Другая словоформа и "е" вместо "ё"; совпадение в названии выше совпадения в авторе
+    response = client.get("/api/books/search/?q=ежика")
+    assert response.status_code == status.HTTP_200_OK
+    titles = [book["title"] for book in response.json()]
+    assert titles == ["Ёжик в тумане", "Сказки"]
+
+    response = client.get("/api/books/search/?q=наказанием")
+    assert [book["id"] for book in response.json()] == [book_id]
+
+    # Постраничный вывод
+    response = client.get("/api/books/search/?q=ежик&limit=1&skip=1")
+    assert [book["title"] for book in response.json()] == ["Сказки"]
+
+    # Индекс следует за изменениями и удалением книги
+    client.put(f"/api/books/{book_id}", json={"title": "Братья Карамазовы"})
+    assert client.get("/api/books/search/?q=наказание").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/api/books/search/?q=карамазов").status_code == status.HTTP_200_OK
+
+    client.delete(f"/api/books/{book_id}")
+    assert client.get("/api/books/search/?q=карамазов").status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,144 @@
+import inspect
+
+import pytest
+from fastapi import FastAPI, status
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+
+from app import cache
+from app.config import settings
+from app.crud.counters import check_counters
+from app.database import (
+    async_database_url, create_async_db_engine, get_async_db, get_async_read_db, get_db, get_read_db
+)
+from app.main import include_routers
+from app.query_budget import QUERIES_HEADER, QueryBudgetMiddleware
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+from sqlalchemy.pool import NullPool  # noqa: E402
+
+
+@pytest.fixture
+def async_client(test_db, monkeypatch):
+    """Клиент приложения в режиме DB_ASYNC поверх тестовой БД"""
+    monkeypatch.setattr(settings, "DB_ASYNC", True)
+    monkeypatch.setattr(settings, "QUERY_DEBUG", True)
+    monkeypatch.setattr(settings, "QUERY_BUDGET_STRICT", True)
+    # Соединения aiosqlite привязаны к циклу событий клиента - без пула
+    engine = create_async_db_engine(async_database_url(str(test_db.get_bind().url)), poolclass=NullPool)
+    AsyncSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI(default_response_class=ORJSONResponse)
+    include_routers(app)
+    app.add_middleware(QueryBudgetMiddleware)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
+    # Синхронные маршруты (импорт, индексы поиска в памяти) - через тестовую сессию
+    app.dependency_overrides[get_db] = lambda: test_db
+    app.dependency_overrides[get_read_db] = lambda: test_db
+    cache.response_cache.clear()
+    with TestClient(app) as client:
+        yield client
+
+
+def endpoints(app):
+    return {
+        (route.path, method): route.endpoint
+        for route in app.routes if hasattr(route, "endpoint") for method in route.methods
+    }
+
+
+def test_routes_are_native_coroutines(async_client):
+    """Маршруты с сессией БД - корутины на асинхронных сессиях; индексы в памяти и импорт - синхронные"""
+    routes = endpoints(async_client.app)
+    for path, method in [
+        ("/api/books/{book_id}", "GET"), ("/api/copies/", "POST"),
+        ("/api/loans/batch", "POST"), ("/api/stats/dashboard", "GET"),
+    ]:
+        assert inspect.iscoroutinefunction(routes[path, method]), path
+    parameters = inspect.signature(routes["/api/books/{book_id}", "GET"]).parameters
+    assert parameters["db"].default.dependency is get_async_read_db
+    parameters = inspect.signature(routes["/api/loans/", "POST"]).parameters
+    assert parameters["db"].default.dependency is get_async_db
+    for path, method in [("/api/books/import", "POST"), ("/api/readers/search/", "GET"), ("/api/suggest", "GET")]:
+        assert not inspect.iscoroutinefunction(routes[path, method]), path
+
+
+def test_loan_cycle_in_async_mode(async_client, test_db):
+    """Выдача и возврат в асинхронном режиме: ответы, бюджеты, счетчики и кэш те же"""
+    response = async_client.post("/api/books/", json={"title": "Книга", "author": "Автор"})
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    assert int(response.headers[QUERIES_HEADER]) > 0
+    book_id = response.json()["id"]
+    copies = [
+        async_client.post("/api/copies/", json={"book_id": book_id, "inventory_number": f"AS-{n}"}).json()
+        for n in range(3)
+    ]
+    reader_id = async_client.post(
+        "/api/readers/", json={"full_name": "Читатель", "library_card": "AS-R1"}
+    ).json()["id"]
+
+    response = async_client.get("/api/books/")
+    assert response.headers["X-Cache"] == "MISS"
+    etag = response.headers["ETag"]
+    assert async_client.get("/api/books/", headers={"If-None-Match": etag}).status_code == 304
+    assert async_client.get(f"/api/books/{book_id}").json()["title"] == "Книга"
+    assert async_client.get(f"/api/books/{book_id}").headers["X-Cache"] == "HIT"
+    assert async_client.get("/api/books/search/", params={"q": "книги"}).json()[0]["id"] == book_id
+
+    response = async_client.post("/api/loans/", json={"copy_id": copies[0]["id"], "reader_id": reader_id})
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    loan_id = response.json()["id"]
+    assert response.json()["copy_inventory"] == "AS-0"
+    reader = async_client.get("/api/readers/card/AS-R1")
+    assert (reader.headers["X-Cache"], reader.json()["active_loans"]) == ("MISS", 1)
+    assert async_client.get(f"/api/copies/{copies[0]['id']}").json()["status"] == "borrowed"
+    assert async_client.get("/api/books/", headers={"If-None-Match": etag}).status_code == 304
+
+    response = async_client.post("/api/loans/batch", json={
+        "reader_id": reader_id, "inventory_numbers": ["AS-0", "AS-1", "AS-9"]
+    })
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["created"] == 1
+    assert [item["success"] for item in response.json()["items"]] == [False, True, False]
+    assert len(async_client.get(f"/api/loans/reader/{reader_id}/active").json()) == 2
+
+    response = async_client.post("/api/loans/return/batch", json={"inventory_numbers": ["AS-1", "AS-2"]})
+    assert [item["success"] for item in response.json()["items"]] == [True, False]
+    response = async_client.post(f"/api/loans/return/{loan_id}")
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["status"] == "returned"
+    assert async_client.post(f"/api/loans/return/{loan_id}").status_code == 400
+
+    assert async_client.get("/api/readers/card/AS-R1").json()["active_loans"] == 0
+    assert async_client.get("/api/loans/stats/summary").json() == {
+        "total_loans": 2, "active_loans": 0, "overdue_loans": 0, "returned_loans": 2
+    }
+    dashboard = async_client.get("/api/stats/dashboard").json()
+    assert dashboard["copies"]["by_status"] == {"available": 3}
+    assert async_client.get("/api/loans/fines").json()["total_amount"] == 0
+    assert async_client.get("/api/loans/999").status_code == 404
+    assert async_client.get("/api/readers/999").status_code == 404
+    # Счетчики и версии ведут те же события сессии, что и в синхронном режиме
+    assert check_counters(test_db) == []
+
+
+def test_sync_routes_in_async_mode(async_client):
+    """Поиск по индексам в памяти видит записи, сделанные асинхронными маршрутами"""
+    async_client.post("/api/readers/", json={"full_name": "Иванов Иван", "library_card": "AS-R2"})
+    assert async_client.get("/api/suggest", params={"field": "reader", "prefix": "иван"}).json()[0]["value"] == "Иванов Иван"
+    assert async_client.get("/api/readers/search/", params={"q": "Иваноф"}).json()[0]["library_card"] == "AS-R2"
+
+
+def test_async_database_url():
+    """Асинхронный URL - тот же сервер с драйвером aiosqlite или asyncpg"""
+    assert async_database_url("sqlite:///./library.db") == "sqlite+aiosqlite:///./library.db"
+    assert async_database_url("postgresql://user:secret@db/library") == "postgresql+asyncpg://user:secret@db/library"
+    with pytest.raises(ValueError):
+        async_database_url("mysql://db/library")
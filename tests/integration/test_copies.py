@@ -62,3 +62,27 @@ def test_copies_crud(client):
     # 10. Проверяем, что 404
     resp = client.get(f"/api/copies/{copy_id}")
     assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_copy_listing_query_count_is_constant(client, count_queries):
+    """Название книги подтягивается без отдельного запроса на каждый экземпляр"""
+    for i in range(3):
+        book_id = client.post("/api/books/", json={"title": f"Книга {i}", "author": "Автор"}).json()["id"]
+        for j in range(4):
+            client.post("/api/copies/", json={
+                "book_id": book_id,
+                "inventory_number": f"QC-{i}-{j}",
+                "status": "available"
+            })
+
+    small, small_queries = count_queries(lambda: client.get("/api/copies/?limit=2"))
+    large, large_queries = count_queries(lambda: client.get("/api/copies/?limit=12"))
+
+    assert len(small.json()) == 2
+    assert len(large.json()) == 12
+    assert all(x["book_title"].startswith("Книга") for x in large.json())
+    assert small_queries == large_queries
+
+    resp = client.get(f"/api/copies/book/{book_id}/available")
+    assert resp.status_code == status.HTTP_200_OK
+    assert {x["inventory_number"] for x in resp.json()} == {f"QC-2-{j}" for j in range(4)}
@@ -0,0 +1,110 @@
+from sqlalchemy import delete, update
+
+from fastapi import status
+
+from app.config import settings
+from app.crud import counters
+from app.models.counter import _SHARD_KEY, LibraryCounter, apply_counter_deltas
+from app.models.reader import Reader
+
+
+def _setup_library(client):
+    book_id = client.post("/api/books/", json={"title": "Книга", "author": "Автор"}).json()["id"]
+    copy_ids = [
+        client.post("/api/copies/", json={"book_id": book_id, "inventory_number": f"CNT-{i}"}).json()["id"]
+        for i in range(3)
+    ]
+    reader_id = client.post("/api/readers/", json={"full_name": "Читатель", "library_card": "CNT-R1"}).json()["id"]
+    return book_id, copy_ids, reader_id
+
+
+def test_counters_follow_changes(client, test_db):
+    """Счетчики обновляются вместе с выдачами, возвратами и статусами экземпляров"""
+    book_id, copy_ids, reader_id = _setup_library(client)
+    first = client.post("/api/loans/", json={"copy_id": copy_ids[0], "reader_id": reader_id}).json()["id"]
+    second = client.post("/api/loans/", json={"copy_id": copy_ids[1], "reader_id": reader_id}).json()["id"]
+    client.post(f"/api/loans/return/{first}")
+    client.delete(f"/api/loans/{second}")
+    client.patch(f"/api/copies/{copy_ids[2]}/mark-borrowed")
+    client.patch(f"/api/readers/{reader_id}/block")
+
+    values = counters.get_counters(test_db)
+    assert values["books"] == 1
+    assert values["loans:active"] == 0
+    assert values["loans:returned"] == 1
+    assert values["copies:available"] == 1
+    assert values["copies:borrowed"] == 2
+    assert values["readers:active"] == 0
+    assert values["readers:blocked"] == 1
+    assert counters.check_counters(test_db) == []
+
+    response = client.get("/api/loans/stats/summary")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "total_loans": 1,
+        "active_loans": 0,
+        "overdue_loans": 0,
+        "returned_loans": 1
+    }
+
+
+def test_counters_check_and_rebuild(client, test_db):
+    """Проверка находит расхождение, а rebuild пересчитывает счетчики с нуля"""
+    _setup_library(client)
+    # Значение счетчика - сумма строк по shard: оставляем одну строку с неверным значением
+    test_db.execute(delete(LibraryCounter).where(LibraryCounter.name == "books"))
+    test_db.add(LibraryCounter(name="books", shard=0, value=10))
+    test_db.commit()
+
+    assert counters.check_counters(test_db) == [("books", 10, 1)]
+
+    values = counters.rebuild_counters(test_db)
+    assert values["books"] == 1
+    assert values["copies:available"] == 3
+    assert counters.check_counters(test_db) == []
+
+
+def test_counter_shards(client, test_db, monkeypatch):
+    """Соединения пишут в разные строки счетчика, значение - их сумма"""
+    monkeypatch.setattr(settings, "COUNTER_SHARDS", 4)
+    engine = test_db.get_bind()
+    with engine.connect() as first, engine.connect() as second:
+        first.info[_SHARD_KEY], second.info[_SHARD_KEY] = 1, 2
+        for connection in (first, second):
+            apply_counter_deltas(connection, {"books": 2})
+            connection.commit()
+
+    shards = dict(test_db.query(LibraryCounter.shard, LibraryCounter.value).filter(LibraryCounter.name == "books"))
+    assert shards[1] == shards[2] == 2
+    assert counters.get_counters(test_db)["books"] == sum(shards.values())
+
+
+def test_reader_active_loans_counter(client, test_db):
+    """Счетчик активных выдач читателя меняется при выдаче, возврате и удалении"""
+    _, copy_ids, reader_id = _setup_library(client)
+    first = client.post("/api/loans/", json={"copy_id": copy_ids[0], "reader_id": reader_id}).json()["id"]
+    client.post("/api/loans/batch", json={"reader_id": reader_id, "copy_ids": copy_ids[1:]})
+    assert client.get(f"/api/readers/{reader_id}").json()["active_loans"] == 3
+
+    client.post(f"/api/loans/return/{first}")
+    client.post("/api/loans/return/batch", json={"inventory_numbers": ["CNT-1"]})
+    second = client.get(f"/api/loans/reader/{reader_id}/active").json()[0]["id"]
+    client.delete(f"/api/loans/{second}")
+    assert client.get(f"/api/readers/{reader_id}").json()["active_loans"] == 0
+    assert counters.check_counters(test_db) == []
+
+
+def test_reader_counter_limit_and_repair(client, test_db):
+    """Лимит проверяется по счетчику; repair исправляет расхождение"""
+    _, copy_ids, reader_id = _setup_library(client)
+    test_db.execute(update(Reader).where(Reader.id == reader_id).values(active_loans=5))
+    test_db.commit()
+
+    response = client.post("/api/loans/", json={"copy_id": copy_ids[0], "reader_id": reader_id})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Превышен лимит книг (максимум 5)"
+    assert counters.check_counters(test_db) == [(f"readers.active_loans:{reader_id}", 5, 0)]
+
+    assert counters.rebuild_reader_loans(test_db) == 1
+    response = client.post("/api/loans/", json={"copy_id": copy_ids[0], "reader_id": reader_id})
+    assert response.status_code == status.HTTP_201_CREATED
@@ -0,0 +1,99 @@
+import io
+
+import pytest
+from fastapi import status
+
+from app import cache
+from app.crud import counters
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch):
+    """ETag проверяются по БД: кэш ответов отвечал бы на повторные GET сам"""
+    monkeypatch.setattr(cache, "response_cache", cache.ResponseCache())
+
+
+def _get(client, url, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(url, headers=headers)
+
+
+def _assert_not_modified(client, url, etag):
+    response = _get(client, url, etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+def test_collection_not_modified_without_reading_rows(client, test_db, count_queries):
+    """Список с совпавшим ETag - 304 после одного запроса версий"""
+    client.post("/api/books/", json={"title": "Книга", "author": "Автор"})
+    etag = _get(client, "/api/books/?limit=200").headers["ETag"]
+
+    response, queries = count_queries(lambda: _get(client, "/api/books/?limit=200", etag))
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert queries == 1
+    # Слабое сравнение и список тегов в If-None-Match
+    response = _get(client, "/api/books/?limit=200", f'"other", W/{etag}')
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.post("/api/books/", json={"title": "Другая", "author": "Автор"})
+    response = _get(client, "/api/books/?limit=200", etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_item_etag_follows_row_version(client, test_db):
+    """ETag карточки меняется при каждом изменении строки, даже в ту же секунду"""
+    book_id = client.post("/api/books/", json={"title": "Книга", "author": "Автор"}).json()["id"]
+    other_id = client.post("/api/books/", json={"title": "Другая", "author": "Автор"}).json()["id"]
+    url = f"/api/books/{book_id}"
+    etags = [_get(client, url).headers["ETag"]]
+    for year in (2001, 2002):
+        client.put(url, json={"year": year})
+        etags.append(_get(client, url).headers["ETag"])
+    assert len(set(etags)) == 3
+    _assert_not_modified(client, url, etags[-1])
+
+    # Изменение другой книги карточку не затрагивает
+    client.put(f"/api/books/{other_id}", json={"year": 1999})
+    _assert_not_modified(client, url, etags[-1])
+    assert _get(client, "/api/books/999").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_loans_bump_copy_and_reader_versions(client, test_db):
+    """Выдача и возврат (массовые UPDATE) меняют ETag экземпляров и читателя"""
+    book_id = client.post("/api/books/", json={"title": "Книга", "author": "Автор"}).json()["id"]
+    copy_id = client.post("/api/copies/", json={"book_id": book_id, "inventory_number": "ET-1"}).json()["id"]
+    reader_id = client.post("/api/readers/", json={"full_name": "Читатель", "library_card": "ET-R1"}).json()["id"]
+    urls = ["/api/copies/?limit=500", f"/api/copies/{copy_id}",
+            f"/api/copies/book/{book_id}/available", "/api/readers/", f"/api/readers/{reader_id}"]
+
+    for action in (
+        lambda: client.post("/api/loans/", json={"copy_id": copy_id, "reader_id": reader_id}),
+        lambda: client.post("/api/loans/return/batch", json={"inventory_numbers": ["ET-1"]}),
+        lambda: client.post("/api/loans/batch", json={"reader_id": reader_id, "copy_ids": [copy_id]}),
+    ):
+        etags = {url: _get(client, url).headers["ETag"] for url in urls}
+        action()
+        for url, etag in etags.items():
+            assert _get(client, url, etag).status_code == status.HTTP_200_OK, url
+
+    # Карточка экземпляра показывает название книги
+    etag = _get(client, f"/api/copies/{copy_id}").headers["ETag"]
+    client.put(f"/api/books/{book_id}", json={"title": "Новое название"})
+    response = _get(client, f"/api/copies/{copy_id}", etag)
+    assert response.json()["book_title"] == "Новое название"
+
+
+def test_import_and_rebuild_keep_versions(client, test_db):
+    """Импорт меняет версию каталога, пересчет счетчиков ее не сбрасывает"""
+    etag = _get(client, "/api/books/").headers["ETag"]
+    data = "title,author,inventory_number\nКнига,Автор,ET-IMP-1\n"
+    client.post("/api/books/import", files={"file": ("books.csv", io.BytesIO(data.encode()), "text/csv")})
+    etag = _get(client, "/api/books/", etag).headers["ETag"]
+
+    counters.rebuild_counters(test_db)
+    _assert_not_modified(client, "/api/books/", etag)
+    assert counters.check_counters(test_db) == []
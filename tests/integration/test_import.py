@@ -0,0 +1,97 @@
+import json
+
+from fastapi import status
+
+from app.crud import counters
+
+
+CSV_DATA = """title,author,year,isbn,inventory_number,status
+Мастер и Маргарита,Михаил Булгаков,1967,ISBN-1,IMP-1;IMP-2,
+Война и мир,Лев Толстой,1869,ISBN-2,IMP-3,under_repair
+,Без названия,2000,,IMP-4,
+Неверный год,Автор,99999,,IMP-5,
+Дубликат номера,Автор,2001,,IMP-1,
+Мастер и Маргарита,Михаил Булгаков,1967,ISBN-1,IMP-6,
+Существующая,Автор,2002,ISBN-OLD,IMP-7,
+"""
+
+
+def test_import_csv(client, test_db):
+    """Импорт CSV: пачки, поиск книги по ISBN, ошибки по строкам"""
+    old_id = client.post("/api/books/", json={
+        "title": "Существующая", "author": "Автор", "isbn": "ISBN-OLD"
+    }).json()["id"]
+
+    response = client.post(
+        "/api/books/import?batch_size=2",
+        files={"file": ("books.csv", CSV_DATA.encode(), "text/csv")}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert report["rows"] == 7
+    assert report["books_created"] == 2
+    assert report["books_matched"] == 2
+    assert report["copies_created"] == 5
+    assert report["errors_total"] == 3
+    assert [error["row"] for error in report["errors"]] == [4, 5, 6]
+    assert "IMP-1" in report["errors"][2]["message"]
+
+    master = client.get("/api/copies/inventory/IMP-6").json()
+    assert master["book_id"] == client.get("/api/copies/inventory/IMP-1").json()["book_id"]
+    assert client.get("/api/copies/inventory/IMP-7").json()["book_id"] == old_id
+    assert client.get("/api/copies/inventory/IMP-3").json()["status"] == "under_repair"
+
+    # Новые книги сразу видны в поиске и подсказках, счетчики согласованы
+    assert client.get("/api/books/search/?q=маргарита").status_code == status.HTTP_200_OK
+    suggestions = client.get("/api/suggest?field=title&prefix=война").json()
+    assert [item["value"] for item in suggestions] == ["Война и мир"]
+    assert counters.check_counters(test_db) == []
+
+
+def test_import_jsonl(client):
+    """Импорт JSONL: список инвентарных номеров и ошибки разбора строк"""
+    lines = [
+        json.dumps({"title": "Книга", "author": "Автор", "inventory_number": ["J-1", "J-2"]}),
+        "{не json",
+        "",
+        json.dumps(["не", "объект"]),
+        json.dumps({"title": "Вторая", "author": "Автор"}),
+    ]
+    response = client.post(
+        "/api/books/import",
+        files={"file": ("books.jsonl", "\n".join(lines).encode(), "application/x-ndjson")}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    report = response.json()
+    assert report["books_created"] == 2
+    assert report["copies_created"] == 2
+    assert [error["row"] for error in report["errors"]] == [2, 4]
+
+
+
+def test_import_rejects_whole_row(client):
+    """Неверный экземпляр отклоняет строку целиком, без книги в базе"""
+    lines = [
+        json.dumps({"title": "Плохой статус", "author": "Автор", "inventory_number": "S-1", "status": "lost"}),
+        json.dumps({"title": "Повтор", "author": "Автор", "inventory_number": ["S-2", "S-3", "S-3"]}),
+        json.dumps({"title": "Хорошая", "author": "Автор", "inventory_number": "S-4"}),
+    ]
+    response = client.post(
+        "/api/books/import",
+        files={"file": ("books.jsonl", "\n".join(lines).encode(), "application/x-ndjson")}
+    )
+    report = response.json()
+    assert report["books_created"] == 1
+    assert report["copies_created"] == 1
+    assert [error["row"] for error in report["errors"]] == [1, 2]
+    assert "S-1" in report["errors"][0]["message"]
+    assert "S-3" in report["errors"][1]["message"]
+    titles = [book["title"] for book in client.get("/api/books/").json()]
+    assert titles == ["Хорошая"]
+
+def test_import_unknown_format(client):
+    response = client.post(
+        "/api/books/import",
+        files={"file": ("books.txt", b"title\n", "text/plain")}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
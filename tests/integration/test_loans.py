@@ -0,0 +1,209 @@
+from datetime import date, timedelta
+
+from fastapi import status
+
+from app import crud
+from app.crud import counters
+from app.models.book import Book
+from app.models.copy import Copy
+from app.models.reader import Reader
+from app.models.loan import Loan
+
+
+def _create_loans(db, count):
+    """Создает count выдач напрямую через сессию"""
+    today = date.today()
+    for i in range(count):
+        book = Book(title=f"Книга {i}", author="Автор")
+        reader = Reader(full_name=f"Читатель {i}", library_card=f"QC-{i:04d}")
+        copy = Copy(book=book, inventory_number=f"QC-INV-{i:04d}", status="borrowed")
+        db.add_all([book, reader, copy])
+        db.flush()
+        db.add(Loan(
+            copy_id=copy.id,
+            reader_id=reader.id,
+            loan_date=today,
+            due_date=today + timedelta(days=14),
+            status="active"
+        ))
+    db.commit()
+
+
+def test_loan_listing_query_count_is_constant(client, test_db, count_queries):
+    """Число запросов при получении списка выдач не зависит от размера страницы"""
+    _create_loans(test_db, 30)
+
+    small, small_queries = count_queries(lambda: client.get("/api/loans/?limit=3"))
+    large, large_queries = count_queries(lambda: client.get("/api/loans/?limit=30"))
+
+    assert small.status_code == status.HTTP_200_OK
+    assert large.status_code == status.HTTP_200_OK
+    assert len(small.json()) == 3
+    assert len(large.json()) == 30
+    assert small_queries == large_queries
+
+
+def test_loan_listing_includes_related_fields(client, test_db):
+    """Выдачи содержат инвентарный номер, название книги и ФИО читателя"""
+    _create_loans(test_db, 2)
+
+    response = client.get("/api/loans/")
+    assert response.status_code == status.HTTP_200_OK
+    loans = response.json()
+
+    assert {loan["copy_inventory"] for loan in loans} == {"QC-INV-0000", "QC-INV-0001"}
+    assert {loan["book_title"] for loan in loans} == {"Книга 0", "Книга 1"}
+    assert {loan["reader_name"] for loan in loans} == {"Читатель 0", "Читатель 1"}
+
+    reader_id = loans[0]["reader_id"]
+    response = client.get(f"/api/loans/reader/{reader_id}/active")
+    assert response.status_code == status.HTTP_200_OK
+    assert [loan["reader_id"] for loan in response.json()] == [reader_id]
+
+
+def test_loan_cursor_pagination(client, test_db):
+    """Курсорный режим проходит все выдачи без повторов"""
+    _create_loans(test_db, 7)
+
+    seen_ids = []
+    params = {"limit": 3}
+    while True:
+        response = client.get("/api/loans/", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        seen_ids.extend(loan["id"] for loan in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = {"limit": 3, "after": cursor}
+
+    assert seen_ids == sorted(seen_ids)
+    assert len(seen_ids) == 7
+
+
+def _create_shelf(db, count, card="BATCH-R1"):
+    """Читатель и count доступных экземпляров одной книги"""
+    book = Book(title="Книга", author="Автор")
+    reader = Reader(full_name="Читатель", library_card=card)
+    copies = [Copy(book=book, inventory_number=f"{card}-INV-{i}") for i in range(count)]
+    db.add_all([book, reader, *copies])
+    db.commit()
+    return reader.id, [copy.id for copy in copies]
+
+
+def test_batch_checkout_per_item_results(client, test_db):
+    """Пакетная выдача возвращает результат по каждому экземпляру"""
+    reader_id, copy_ids = _create_shelf(test_db, 7)
+    client.patch(f"/api/copies/{copy_ids[1]}/mark-borrowed")
+
+    response = client.post("/api/loans/batch", json={
+        "reader_id": reader_id,
+        "copy_ids": [copy_ids[0], copy_ids[1], copy_ids[0], 999999, *copy_ids[2:5]],
+        "inventory_numbers": ["BATCH-R1-INV-5", "BATCH-R1-INV-6"],
+    })
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result["created"] == 5
+    details = [item["detail"] for item in result["items"]]
+    assert details == [
+        None,
+        "Экземпляр недоступен для выдачи",
+        "Экземпляр указан повторно",
+        "Экземпляр не найден",
+        None, None, None,
+        None,
+        "Превышен лимит книг (максимум 5)",
+    ]
+    created = [item for item in result["items"] if item["success"]]
+    assert all(item["loan"]["status"] == "active" for item in created)
+    assert created[-1]["loan"]["copy_inventory"] == "BATCH-R1-INV-5"
+    assert client.get(f"/api/copies/{copy_ids[0]}").json()["status"] == "borrowed"
+    assert len(client.get(f"/api/loans/reader/{reader_id}/active").json()) == 5
+
+    summary = client.get("/api/loans/stats/summary").json()
+    assert summary["active_loans"] == 5
+
+
+def test_batch_checkout_query_count_is_constant(client, test_db, count_queries):
+    """Число запросов пакетной выдачи не зависит от числа экземпляров"""
+    one_reader, one_copies = _create_shelf(test_db, 1, card="BATCH-A")
+    many_reader, many_copies = _create_shelf(test_db, 4, card="BATCH-B")
+    # Первая выдача создает строки счетчиков - ее не считаем
+    warm_reader, warm_copies = _create_shelf(test_db, 1, card="BATCH-C")
+    client.post("/api/loans/batch", json={"reader_id": warm_reader, "copy_ids": warm_copies})
+
+    one, one_queries = count_queries(lambda: client.post(
+        "/api/loans/batch", json={"reader_id": one_reader, "copy_ids": one_copies}
+    ))
+    many, many_queries = count_queries(lambda: client.post(
+        "/api/loans/batch", json={"reader_id": many_reader, "copy_ids": many_copies}
+    ))
+    assert one.json()["created"] == 1
+    assert many.json()["created"] == 4
+    assert one_queries == many_queries
+
+
+def test_batch_checkout_blocked_reader(client, test_db):
+    reader_id, copy_ids = _create_shelf(test_db, 1)
+    client.patch(f"/api/readers/{reader_id}/block")
+
+    response = client.post("/api/loans/batch", json={"reader_id": reader_id, "copy_ids": copy_ids})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_bulk_return_by_inventory_numbers(client, test_db):
+    """Возврат по инвентарным номерам закрывает выдачи и освобождает экземпляры"""
+    reader_id, copy_ids = _create_shelf(test_db, 4, card="RET")
+    client.post("/api/loans/batch", json={"reader_id": reader_id, "copy_ids": copy_ids[:3]})
+
+    response = client.post("/api/loans/return/batch", json={
+        "inventory_numbers": ["RET-INV-0", "RET-INV-1", "RET-INV-0", "RET-INV-3", "NOPE"]
+    })
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result["returned"] == 2
+    assert [item["detail"] for item in result["items"]] == [
+        None, None, "Экземпляр указан повторно", "Нет активной выдачи", "Экземпляр не найден"
+    ]
+    assert client.get(f"/api/copies/{copy_ids[0]}").json()["status"] == "available"
+    assert client.get(f"/api/copies/{copy_ids[2]}").json()["status"] == "borrowed"
+    loan = client.get(f"/api/loans/{result['items'][0]['loan_id']}").json()
+    assert loan["status"] == "returned"
+    assert loan["return_date"] == date.today().isoformat()
+    assert counters.check_counters(test_db) == []
+
+
+def test_bulk_return_query_count_is_constant(client, test_db, count_queries):
+    """Число запросов возврата не зависит от числа экземпляров"""
+    reader_a, copies_a = _create_shelf(test_db, 1, card="RA")
+    reader_b, copies_b = _create_shelf(test_db, 5, card="RB")
+    client.post("/api/loans/batch", json={"reader_id": reader_a, "copy_ids": copies_a})
+    client.post("/api/loans/batch", json={"reader_id": reader_b, "copy_ids": copies_b})
+    # Первый возврат создает строки счетчиков - его не считаем
+    reader_c, copies_c = _create_shelf(test_db, 1, card="RC")
+    client.post("/api/loans/batch", json={"reader_id": reader_c, "copy_ids": copies_c})
+    client.post("/api/loans/return/batch", json={"inventory_numbers": ["RC-INV-0"]})
+
+    one, one_queries = count_queries(lambda: client.post(
+        "/api/loans/return/batch", json={"inventory_numbers": ["RA-INV-0"]}
+    ))
+    many, many_queries = count_queries(lambda: client.post(
+        "/api/loans/return/batch", json={"inventory_numbers": [f"RB-INV-{i}" for i in range(5)]}
+    ))
+    assert one.json()["returned"] == 1
+    assert many.json()["returned"] == 5
+    assert one_queries == many_queries
+
+
+def test_copy_compare_and_set_succeeds_once(client, test_db):
+    """Условный UPDATE занимает экземпляр только один раз"""
+    reader_id, copy_ids = _create_shelf(test_db, 1, card="CAS")
+    assert crud.copy.try_borrow_copy(test_db, copy_ids[0]) is True
+    assert crud.copy.try_borrow_copy(test_db, copy_ids[0]) is False
+    test_db.commit()
+
+    response = client.post("/api/loans/", json={"copy_id": copy_ids[0], "reader_id": reader_id})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Экземпляр недоступен для выдачи"
+    response = client.post("/api/loans/", json={"copy_id": 999999, "reader_id": reader_id})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert counters.check_counters(test_db) == []
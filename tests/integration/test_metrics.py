@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.registry.clear()
+    yield
+    metrics.registry.clear()
+
+
+def test_request_metrics_by_route_template(client, test_book_data):
+    """Запросы учитываются по шаблону маршрута вместе с их SQL-запросами"""
+    book_id = client.post("/api/books/", json=test_book_data).json()["id"]
+    client.get(f"/api/books/{book_id}")
+    client.get("/api/books/999999")
+
+    route = "/api/books/{book_id}"
+    assert metrics.http_requests.value("GET", route, "200") == 1
+    assert metrics.http_requests.value("GET", route, "404") == 1
+    assert metrics.http_duration.count("GET", route) == 2
+    assert metrics.request_queries.count("POST", "/api/books/") == 1
+    assert metrics.request_queries.sum("POST", "/api/books/") >= 1
+    assert metrics.request_db_time.sum("GET", route) > 0
+    assert metrics.db_queries.value() >= metrics.request_queries.sum("GET", route)
+
+
+def test_unmatched_paths_share_one_series(client):
+    client.get("/no-such-page-1")
+    client.get("/no-such-page-2")
+    assert metrics.http_requests.value("GET", "unmatched", "404") == 2
+
+
+def test_metrics_endpoint_prometheus_format(client, test_book_data):
+    client.post("/api/books/", json=test_book_data)
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE library_http_request_duration_seconds histogram" in text
+    assert 'library_http_requests_total{method="POST",route="/api/books/",status="201"} 1' in text
+    assert 'library_http_request_db_queries_bucket{method="POST",route="/api/books/",le="+Inf"} 1' in text
+    assert "library_threadpool_size " in text
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Тест", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, '/a"b')
+
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'test_seconds_bucket{route="/a\\"b",le="1.0"} 2',
+        'test_seconds_bucket{route="/a\\"b",le="+Inf"} 3',
+        'test_seconds_sum{route="/a\\"b"} 5.55',
+        'test_seconds_count{route="/a\\"b"} 3',
+    ]
+
+
+def test_pool_checkout_wait_survives_dispose(tmp_path):
+    """Ожидание соединения учитывается один раз на транзакцию сессии, в том числе после dispose()"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    metrics.instrument_engine(engine, "test")
+    Session = sessionmaker(bind=engine, class_=metrics.TimedSession)
+    try:
+        with Session() as db:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+            with db.begin_nested():
+                db.execute(text("SELECT 3"))
+        engine.dispose()
+        with Session() as db:
+            db.execute(text("SELECT 1"))
+        assert metrics.pool_wait.count("test") == 2
+    finally:
+        metrics._engines.pop("test", None)
+        engine.dispose()
+
+
+def test_failed_statement_is_not_left_behind():
+    """Запрос с ошибкой не оставляет времени начала в соединении"""
+    metrics.instrument_queries()
+    engine = create_engine("sqlite://")
+    try:
+        with engine.connect() as connection:
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing"))
+            connection.execute(text("SELECT 1"))
+            assert "query_started" not in connection.info
+        assert metrics.db_queries.value() == 1
+    finally:
+        engine.dispose()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app.config import settings
+
+from app.database import Base
+from app.schema import upgrade_schema
+
+
+@pytest.fixture
+def empty_engine():
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    engine = create_engine(f"sqlite:///{tmp.name}")
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        os.unlink(tmp.name)
+
+
+def _schema_diff(engine):
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={
+            "include_name": lambda name, type_, parents: not (
+                type_ == "table" and name.startswith("books_fts")
+            ),
+        })
+        return compare_metadata(context, Base.metadata)
+
+
+def test_migrations_match_models(empty_engine):
+    """Схема после всех миграций совпадает с моделями"""
+    upgrade_schema(empty_engine)
+
+    assert _schema_diff(empty_engine) == []
+    with empty_engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == "0010"
+        assert conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE name = 'books_fts'"
+        )).scalar() == 1
+
+
+def test_returned_late_loans_get_fines(empty_engine):
+    """Выдачам, возвращенным с просрочкой до появления fine_amount, начисляется штраф"""
+    upgrade_schema(empty_engine, "0009")
+    with empty_engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO loans (id, copy_id, reader_id, loan_date, due_date, return_date, status, fine_amount) "
+            "VALUES (1, 1, 1, '2026-01-01', '2026-01-15', '2026-01-18', 'returned', 0), "
+            "(2, 1, 1, '2026-02-01', '2026-02-15', '2026-02-10', 'returned', 0), "
+            "(3, 1, 1, '2026-03-01', '2026-03-15', '2026-03-20', 'returned', 7)"
+        ))
+
+    upgrade_schema(empty_engine)
+
+    with empty_engine.connect() as conn:
+        fines = dict(conn.execute(text("SELECT id, fine_amount FROM loans")).all())
+    assert fines == {1: 3 * settings.FINE_PER_DAY, 2: 0, 3: 7}
+
+
+def test_legacy_database_is_stamped_and_upgraded(empty_engine):
+    """База, созданная через create_all до появления миграций, доводится до head"""
+    Base.metadata.create_all(bind=empty_engine)
+    with empty_engine.begin() as conn:
+        for name in ("ix_loans_copy_id_status", "ix_loans_reader_id_status",
+                     "ix_loans_status_due_date", "ix_copies_book_id_status",
+                     "ix_loans_fined_reader_id"):
+            conn.execute(text(f"DROP INDEX {name}"))
+        conn.execute(text("DROP TABLE library_counters"))
+        conn.execute(text("ALTER TABLE readers DROP COLUMN active_loans"))
+        conn.execute(text("ALTER TABLE loans DROP COLUMN fine_amount"))
+        conn.execute(text("DROP TABLE scheduler_leases"))
+        for table in ("books", "copies", "readers"):
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN version"))
+
+    upgrade_schema(empty_engine)
+
+    assert _schema_diff(empty_engine) == []
+    loan_indexes = {index["name"] for index in inspect(empty_engine).get_indexes("loans")}
+    assert {"ix_loans_reader_id_status", "ix_loans_status_due_date"} <= loan_indexes
@@ -0,0 +1,124 @@
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.crud import counters
+from app.crud.lease import acquire_lease, release_lease
+from app.crud.overdue import sweep_overdue
+from app.models.loan import Loan
+from app.scheduler import OVERDUE_SWEEP_LEASE, OverdueSweeper
+
+
+def _checkout(client, count):
+    book_id = client.post("/api/books/", json={"title": "Книга", "author": "Автор"}).json()["id"]
+    reader_id = client.post("/api/readers/", json={"full_name": "Читатель", "library_card": "OD-R1"}).json()["id"]
+    loan_ids = []
+    for i in range(count):
+        copy_id = client.post("/api/copies/", json={"book_id": book_id, "inventory_number": f"OD-{i}"}).json()["id"]
+        loan_ids.append(client.post("/api/loans/", json={"copy_id": copy_id, "reader_id": reader_id}).json()["id"])
+    return reader_id, loan_ids
+
+
+def _set_due_date(test_db, loan_id, days_ago):
+    test_db.execute(
+        update(Loan).where(Loan.id == loan_id).values(due_date=date.today() - timedelta(days=days_ago))
+    )
+    test_db.commit()
+
+
+def test_sweep_marks_overdue_and_accrues_fines(client, test_db):
+    """Проверка переводит просроченные выдачи в overdue и начисляет штрафы"""
+    reader_id, (late, on_time) = _checkout(client, 2)
+    _set_due_date(test_db, late, 3)
+
+    assert sweep_overdue(test_db, fine_per_day=10.0) == {"overdue": 1, "fined": 1}
+    overdue = client.get("/api/loans/overdue/").json()
+    assert [(loan["id"], loan["status"], loan["fine_amount"]) for loan in overdue] == [(late, "overdue", 30.0)]
+
+    # Повторная проверка в тот же день ничего не меняет, на следующий - растит штраф
+    assert sweep_overdue(test_db, fine_per_day=10.0) == {"overdue": 0, "fined": 0}
+    tomorrow = date.today() + timedelta(days=1)
+    assert sweep_overdue(test_db, today=tomorrow, fine_per_day=10.0) == {"overdue": 0, "fined": 1}
+    assert client.get(f"/api/loans/{late}").json()["fine_amount"] == 40.0
+
+    # Просроченная выдача остается на руках у читателя
+    active = client.get(f"/api/loans/reader/{reader_id}/active").json()
+    assert {loan["id"] for loan in active} == {late, on_time}
+    summary = client.get("/api/loans/stats/summary").json()
+    assert summary["active_loans"] == 2
+    assert summary["overdue_loans"] == 1
+    assert counters.check_counters(test_db) == []
+
+
+def test_return_fixes_fine(client, test_db, monkeypatch):
+    """При возврате штраф фиксируется на день возврата, даже если проверка не успела пройти"""
+    reader_id, (swept, not_swept) = _checkout(client, 2)
+    _set_due_date(test_db, swept, 2)
+    sweep_overdue(test_db)
+    _set_due_date(test_db, not_swept, 1)
+
+    for loan_id in (swept, not_swept):
+        response = client.post(f"/api/loans/return/{loan_id}")
+        assert response.json()["status"] == "returned"
+    assert test_db.get(Loan, swept).fine_amount == 20.0
+    assert test_db.get(Loan, not_swept).fine_amount == 10.0
+    assert client.get(f"/api/readers/{reader_id}").json()["active_loans"] == 0
+    assert counters.check_counters(test_db) == []
+
+
+def test_extended_loan_leaves_overdue(client, test_db):
+    """Выдача с продленным сроком возвращается в active"""
+    _, (loan_id,) = _checkout(client, 1)
+    _set_due_date(test_db, loan_id, 1)
+    sweep_overdue(test_db)
+    _set_due_date(test_db, loan_id, -7)
+
+    sweep_overdue(test_db)
+    loan = client.get(f"/api/loans/{loan_id}").json()
+    assert (loan["status"], loan["fine_amount"]) == ("active", 0)
+    assert counters.check_counters(test_db) == []
+
+
+def test_fines_report_per_reader(client, test_db):
+    """Отчет суммирует начисленные штрафы: открытых выдач и зафиксированные при возврате"""
+    reader_id, (open_late, returned_late, on_time) = _checkout(client, 3)
+    other_id = client.post("/api/readers/", json={"full_name": "Другой", "library_card": "OD-R2"}).json()["id"]
+    test_db.execute(update(Loan).where(Loan.id == returned_late).values(reader_id=other_id))
+    test_db.commit()
+    _set_due_date(test_db, open_late, 4)
+    _set_due_date(test_db, returned_late, 2)
+    sweep_overdue(test_db)
+    client.post(f"/api/loans/return/{returned_late}")
+
+    report = client.get("/api/loans/fines").json()
+    assert report["readers"] == [
+        {"reader_id": reader_id, "reader_name": "Читатель", "loans": 1, "amount": 40.0},
+        {"reader_id": other_id, "reader_name": "Другой", "loans": 1, "amount": 20.0},
+    ]
+    assert (report["total_loans"], report["total_amount"]) == (2, 60.0)
+
+    report = client.get(f"/api/loans/fines?reader_id={other_id}").json()
+    assert report["total_amount"] == 20.0
+
+
+def test_lease_has_single_owner(test_db):
+    """Аренду держит один процесс, пока она не истекла или не отпущена"""
+    now = datetime.now(timezone.utc)
+    assert acquire_lease(test_db, "job", "first", 60, now=now)
+    assert not acquire_lease(test_db, "job", "second", 60, now=now)
+    assert acquire_lease(test_db, "job", "first", 60, now=now + timedelta(seconds=30))
+    assert acquire_lease(test_db, "job", "second", 60, now=now + timedelta(seconds=91))
+
+    release_lease(test_db, "job", "second")
+    assert acquire_lease(test_db, "job", "first", 60, now=now)
+
+
+def test_sweeper_runs_only_with_lease(test_db):
+    """Второй воркер не запускает проверку, пока аренда у первого"""
+    leader = OverdueSweeper(lambda: test_db, interval=60)
+    follower = OverdueSweeper(lambda: test_db, interval=60)
+    assert leader.run_once() == {"overdue": 0, "fined": 0}
+    assert follower.run_once() is None
+
+    release_lease(test_db, OVERDUE_SWEEP_LEASE, leader.owner)
+    assert follower.run_once() == {"overdue": 0, "fined": 0}
@@ -0,0 +1,97 @@
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import get_db
+from app.models.book import Book
+from app.query_budget import (
+    DB_TIME_HEADER, QUERIES_HEADER, QueryBudgetExceeded, QueryBudgetMiddleware, query_budget, statement_shape
+)
+
+
+@pytest.fixture
+def budget_app(test_db, monkeypatch):
+    """Приложение с маршрутом, читающим книги по одной (N+1), и маршрутом с бюджетом"""
+    monkeypatch.setattr(settings, "QUERY_DEBUG", True)
+    monkeypatch.setattr(settings, "QUERY_REPEAT_LIMIT", 5)
+    test_db.add_all([Book(title=f"Книга {i}", author="Автор") for i in range(10)])
+    test_db.commit()
+    book_ids = [book.id for book in test_db.query(Book.id)]
+
+    app = FastAPI()
+    app.add_middleware(QueryBudgetMiddleware)
+
+    @app.get("/books/one-by-one")
+    def books_one_by_one(db: Session = Depends(get_db)):
+        return [db.get(Book, book_id).title for book_id in book_ids]
+
+    @app.get("/books/all")
+    @query_budget(1)
+    def books_all(db: Session = Depends(get_db)):
+        return [book.title for book in db.query(Book).all()]
+
+    @app.get("/books/count")
+    @query_budget(1)
+    def books_count(db: Session = Depends(get_db)):
+        db.query(Book).count()
+        return db.query(Book).count()
+
+    app.dependency_overrides[get_db] = lambda: test_db
+    test_db.expire_all()
+    return app
+
+
+def test_query_headers(client, test_book_data):
+    response = client.post("/api/books/", json=test_book_data)
+
+    assert int(response.headers[QUERIES_HEADER]) > 0
+    assert float(response.headers[DB_TIME_HEADER]) > 0
+    response = client.get("/api/health")
+    assert response.headers[QUERIES_HEADER] == "0"
+
+
+def test_repeated_statement_fails_in_strict_mode(budget_app, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_BUDGET_STRICT", True)
+    client = TestClient(budget_app)
+
+    with pytest.raises(QueryBudgetExceeded, match="возможен N\\+1"):
+        client.get("/books/one-by-one")
+    assert client.get("/books/all").headers[QUERIES_HEADER] == "1"
+
+
+def test_declared_budget_fails_in_strict_mode(budget_app, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_BUDGET_STRICT", True)
+
+    with pytest.raises(QueryBudgetExceeded, match="2 SQL-запросов при бюджете 1"):
+        TestClient(budget_app).get("/books/count")
+
+
+def test_violation_is_logged_otherwise(budget_app, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "QUERY_BUDGET_STRICT", False)
+
+    with caplog.at_level(logging.WARNING, logger="app.query_budget"):
+        response = TestClient(budget_app).get("/books/one-by-one")
+
+    assert response.status_code == 200
+    assert response.headers[QUERIES_HEADER] == "10"
+    assert "GET /books/one-by-one" in caplog.text
+    assert "выполнен 10 раз" in caplog.text
+
+
+def test_disabled_without_debug(budget_app, monkeypatch):
+    monkeypatch.setattr(settings, "QUERY_DEBUG", False)
+    monkeypatch.setattr(settings, "DEBUG", False)
+    monkeypatch.setattr(settings, "QUERY_BUDGET_STRICT", True)
+
+    response = TestClient(budget_app).get("/books/one-by-one")
+    assert response.status_code == 200
+    assert QUERIES_HEADER not in response.headers
+
+
+def test_statement_shape_ignores_parameter_lists():
+    assert statement_shape("SELECT id FROM copies WHERE id IN (?, ?, ?) LIMIT 10") == \
+        statement_shape("SELECT id FROM copies\n  WHERE id IN (?) LIMIT 20")
@@ -0,0 +1,114 @@
+import re
+
+from sqlalchemy import event
+
+from app.scheduler import OverdueSweeper
+
+# Полный проход по таблице в плане SQLite: "SCAN loans" или "SCAN loans USING INDEX ...".
+# Виртуальная таблица FTS5 сканируется через свой индекс и проверкой не считается
+FULL_SCAN_RE = re.compile(r"^SCAN (\w+)\b(?! VIRTUAL TABLE)")
+# Частичный индекс содержит только строки, подходящие под его условие
+INDEX_RE = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+
+def _full_scan(line, partial_indexes):
+    if not FULL_SCAN_RE.match(line):
+        return False
+    index = INDEX_RE.search(line)
+    return not (index and index.group(1) in partial_indexes)
+
+
+def _exercise_api(client):
+    """Вызвать все эндпоинты, работающие с БД"""
+    book_id = client.post("/api/books/", json={"title": "Мастер и Маргарита", "author": "Булгаков"}).json()["id"]
+    other_book = client.post("/api/books/", json={"title": "Черновик", "author": "Автор"}).json()["id"]
+    copy_ids = [
+        client.post("/api/copies/", json={"book_id": book_id, "inventory_number": f"QP-{i}"}).json()["id"]
+        for i in range(3)
+    ]
+    spare_copy = client.post("/api/copies/", json={"book_id": other_book, "inventory_number": "QP-X"}).json()["id"]
+    reader_id = client.post("/api/readers/", json={"full_name": "Иванов Иван", "library_card": "QP-R1"}).json()["id"]
+    spare_reader = client.post("/api/readers/", json={"full_name": "Петров Петр", "library_card": "QP-R2"}).json()["id"]
+
+    loan_id = client.post("/api/loans/", json={"copy_id": copy_ids[0], "reader_id": reader_id}).json()["id"]
+    other_loan = client.post("/api/loans/", json={"copy_id": copy_ids[1], "reader_id": reader_id}).json()["id"]
+    client.post(f"/api/loans/return/{loan_id}")
+    client.delete(f"/api/loans/{other_loan}")
+
+    requests = [
+        ("get", "/api/books/?limit=10"),
+        ("get", f"/api/books/{book_id}"),
+        ("get", "/api/books/search/?q=мастер"),
+        ("put", f"/api/books/{book_id}", {"title": "Мастер и Маргарита", "author": "М. Булгаков"}),
+        ("get", "/api/copies/?limit=10"),
+        ("get", "/api/copies/?status=available&limit=10"),
+        ("get", f"/api/copies/{copy_ids[0]}"),
+        ("get", f"/api/copies/book/{book_id}/available"),
+        ("get", "/api/copies/inventory/QP-1"),
+        ("put", f"/api/copies/{copy_ids[2]}", {"status": "under_repair"}),
+        ("patch", f"/api/copies/{copy_ids[2]}/mark-borrowed"),
+        ("patch", f"/api/copies/{copy_ids[2]}/mark-available"),
+        ("post", "/api/loans/batch", {"reader_id": reader_id, "inventory_numbers": ["QP-0"]}),
+        ("post", "/api/loans/return/batch", {"inventory_numbers": ["QP-0", "QP-X"]}),
+        ("get", "/api/loans/?limit=10"),
+        ("get", "/api/loans/?status=returned&limit=10"),
+        ("get", f"/api/loans/{loan_id}"),
+        ("get", f"/api/loans/reader/{reader_id}/active"),
+        ("get", "/api/loans/overdue/"),
+        ("get", "/api/loans/stats/summary"),
+        ("get", "/api/loans/fines"),
+        ("get", f"/api/loans/fines?reader_id={reader_id}"),
+        ("get", "/api/readers/?limit=10"),
+        ("get", "/api/readers/search/?q=иванов"),
+        ("get", f"/api/readers/{reader_id}"),
+        ("get", "/api/readers/card/QP-R1"),
+        ("put", f"/api/readers/{reader_id}", {"phone": "+7 900 000-00-00"}),
+        ("patch", f"/api/readers/{reader_id}/block"),
+        ("patch", f"/api/readers/{reader_id}/activate"),
+        ("get", "/api/stats/dashboard"),
+        ("get", "/api/suggest?field=title&prefix=мас"),
+        ("delete", f"/api/copies/{spare_copy}"),
+        ("delete", f"/api/books/{other_book}"),
+        ("delete", f"/api/readers/{spare_reader}"),
+    ]
+    for method, url, *body in requests:
+        kwargs = {"json": body[0]} if body else {}
+        response = getattr(client, method)(url, **kwargs)
+        assert response.status_code < 400, (method, url, response.text)
+
+
+def test_queries_use_indexes(client, test_db):
+    """Ни один запрос с условием WHERE не читает таблицу целиком"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        _exercise_api(client)
+        OverdueSweeper(lambda: test_db, interval=60).run_once()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert statements
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        partial = {name for name, sql in cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+        ) if re.search(r"\bWHERE\b", sql, re.IGNORECASE)}
+        failures = []
+        for statement, parameters in statements:
+            # Запросы без условий (страницы списков с LIMIT, таблица счетчиков)
+            # читают таблицу по порядку и проверкой не считаются
+            if not re.search(r"\bWHERE\b", statement, re.IGNORECASE):
+                continue
+            plan = [row[-1] for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            if any(_full_scan(line, partial) for line in plan):
+                failures.append(f"{statement}\n  {plan}")
+        assert not failures, "Полный просмотр таблицы:\n" + "\n".join(failures)
+    finally:
+        raw.close()
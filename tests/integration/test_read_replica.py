@@ -0,0 +1,78 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import cache, database
+from app.api.responses import CACHE_HEADER
+from app.config import settings
+from app.consistency import WRITE_COOKIE, ReadYourWritesMiddleware
+from app.database import Base, get_db
+from app.main import app
+
+
+@pytest.fixture
+def replica_app(test_db, tmp_path, monkeypatch):
+    """
+    Приложение с репликой: записи идут в тестовую БД, чтения - в отдельную
+    пустую БД, то есть в реплику, которая еще не получила ни одного изменения
+    """
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=replica)
+    monkeypatch.setattr(settings, "AUTO_MIGRATE", False)
+    monkeypatch.setattr(settings, "OVERDUE_SWEEP_INTERVAL", 0)
+    monkeypatch.setattr(database, "READ_REPLICA", True)
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=test_db.get_bind()))
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(bind=replica))
+    app.dependency_overrides[get_db] = lambda: test_db
+    cache.response_cache.clear()
+    try:
+        yield ReadYourWritesMiddleware(app, window=settings.READ_YOUR_WRITES_WINDOW)
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        replica.dispose()
+
+
+def test_reads_go_to_replica_except_own_writes(replica_app):
+    """Писавший клиент читает с основной БД, остальные - с реплики"""
+    with TestClient(replica_app) as writer, TestClient(replica_app) as other:
+        response = writer.post("/api/books/", json={"title": "Книга", "author": "Автор"})
+        assert WRITE_COOKIE in response.cookies
+        # Другой клиент не писал и читает реплику, которая изменения еще не получила
+        assert other.get("/api/books/?limit=10").json() == []
+        assert writer.get("/api/health").status_code == 200
+        assert WRITE_COOKIE not in writer.get("/api/books/").headers.get("set-cookie", "")
+
+        assert [book["title"] for book in writer.get("/api/books/").json()] == ["Книга"]
+        assert writer.get("/api/loans/stats/summary").status_code == 200
+
+        writer.cookies.set(WRITE_COOKIE, f"{time.time() - 60:.3f}")
+        assert writer.get("/api/books/?limit=5").json() == []
+
+
+def test_cache_follows_client_writes(replica_app, monkeypatch):
+    """Кэш отключается только для писавшего клиента; ответ реплики после изменения живет недолго"""
+    with TestClient(replica_app) as writer, TestClient(replica_app) as other:
+        writer.post("/api/books/", json={"title": "Книга", "author": "Автор"})
+        # Писавший клиент не читает кэш, но его ответ по основной БД сохраняется для всех
+        assert writer.get("/api/books/").headers[CACHE_HEADER] == "MISS"
+        assert writer.get("/api/books/").headers[CACHE_HEADER] == "MISS"
+        response = other.get("/api/books/")
+        assert (response.headers[CACHE_HEADER], len(response.json())) == ("HIT", 1)
+
+        monkeypatch.setattr(settings, "READ_YOUR_WRITES_WINDOW", 0.2)
+        cache.response_cache.invalidate(["books"])
+        assert other.get("/api/books/").json() == []
+        assert other.get("/api/books/").headers[CACHE_HEADER] == "HIT"
+        time.sleep(0.25)
+        assert other.get("/api/books/").headers[CACHE_HEADER] == "MISS"
+
+
+def test_failed_write_sets_no_cookie(replica_app):
+    """Неуспешная запись не переводит клиента на основную БД"""
+    with TestClient(replica_app) as client:
+        response = client.post("/api/loans/", json={"copy_id": 999, "reader_id": 999})
+        assert response.status_code >= 400
+        assert WRITE_COOKIE not in response.cookies
@@ -0,0 +1,74 @@
+import pytest
+from fastapi import status
+
+
+def test_fuzzy_reader_search_tolerates_typos(client):
+    """Нечеткий поиск находит читателя по ФИО с опечаткой и по части билета"""
+    readers = [
+        {"full_name": "Иванов Иван Иванович", "library_card": "RC-001"},
+        {"full_name": "Петрова Мария Сергеевна", "library_card": "RC-002"},
+        {"full_name": "Сидоров Алексей Петрович", "library_card": "RC-003"},
+    ]
+    for reader in readers:
+        assert client.post("/api/readers/", json=reader).status_code == status.HTTP_201_CREATED
+
+    # Опечатки в фамилии и имени
+    response = client.get("/api/readers/search/", params={"q": "Петрава Мраия"})
+    assert response.status_code == status.HTTP_200_OK
+    matches = response.json()
+    assert matches[0]["full_name"] == "Петрова Мария Сергеевна"
+    assert 0 < matches[0]["score"] <= 1
+
+    # Номер билета
+    response = client.get("/api/readers/search/", params={"q": "RC003"})
+    assert response.json()[0]["library_card"] == "RC-003"
+
+    # Индекс следует за изменением ФИО
+    reader_id = matches[0]["id"]
+    client.put(f"/api/readers/{reader_id}", json={"full_name": "Кузнецова Мария"})
+    response = client.get("/api/readers/search/", params={"q": "Кузнецва"})
+    assert [m["id"] for m in response.json()] == [reader_id]
+
+    response = client.get("/api/readers/search/", params={"q": "Zzzzzz"})
+    assert response.json() == []
+
+
+def test_fuzzy_index_follows_other_workers_but_not_loans(client, test_db, monkeypatch):
+    """Индекс перестраивается после записи другого процесса, но не после выдачи"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from app.config import settings
+    from app.models.reader import Reader
+    from app.search.live import get_live_index
+    from app.search.trigram import ReaderFuzzyIndex
+
+    monkeypatch.setattr(settings, "SEARCH_INDEX_CHECK_INTERVAL", 0)
+    reader_id = client.post(
+        "/api/readers/", json={"full_name": "Иванов Иван", "library_card": "RC-101"}
+    ).json()["id"]
+    book_id = client.post("/api/books/", json={"title": "Книга", "author": "Автор"}).json()["id"]
+    copy_id = client.post("/api/copies/", json={"book_id": book_id, "inventory_number": "FZ-1"}).json()["id"]
+    assert client.get("/api/readers/search/", params={"q": "Иванв"}).json()[0]["id"] == reader_id
+    index = get_live_index(test_db, "reader_trigrams", ReaderFuzzyIndex)
+
+    # Выдача меняет строку читателя (active_loans), но не индексируемые столбцы
+    response = client.post("/api/loans/", json={"copy_id": copy_id, "reader_id": reader_id})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert get_live_index(test_db, "reader_trigrams", ReaderFuzzyIndex) is index
+
+    other = create_engine(test_db.get_bind().url)
+    with Session(other) as db:
+        db.add(Reader(full_name="Петров Петр", library_card="RC-102"))
+        db.commit()
+    other.dispose()
+    response = client.get("/api/readers/search/", params={"q": "Петрв"})
+    assert [match["library_card"] for match in response.json()] == ["RC-102"]
+    assert get_live_index(test_db, "reader_trigrams", ReaderFuzzyIndex) is not index
+
+
+def test_live_index_is_abstract():
+    from app.search.live import LiveIndex
+
+    with pytest.raises(TypeError):
+        LiveIndex()
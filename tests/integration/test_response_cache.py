@@ -0,0 +1,95 @@
+import pytest
+from fastapi import status
+
+from app import cache
+from app.config import settings
+from app.models.book import Book
+
+
+def _create_catalog(client):
+    book_id = client.post("/api/books/", json={"title": "Книга", "author": "Автор"}).json()["id"]
+    client.post("/api/copies/", json={"book_id": book_id, "inventory_number": "RC-1"})
+    reader_id = client.post("/api/readers/", json={"full_name": "Читатель", "library_card": "RC-R1"}).json()["id"]
+    return book_id, reader_id
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, monkeypatch, tmp_path):
+    """Оба бэкенда кэша ответов"""
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_PATH", str(tmp_path / "cache.db"))
+    monkeypatch.setattr(cache, "response_cache", cache.create_cache(request.param))
+    return request.param
+
+
+def test_hot_reads_served_from_cache(client, backend, count_queries):
+    """Повторный GET отдается из кэша без запросов к БД"""
+    book_id, _ = _create_catalog(client)
+    for url in (f"/api/books/{book_id}", "/api/books/?limit=10",
+                "/api/copies/inventory/RC-1", "/api/readers/card/RC-R1"):
+        first = client.get(url)
+        assert first.status_code == status.HTTP_200_OK
+        assert first.headers["X-Cache"] == "MISS"
+        second, queries = count_queries(lambda: client.get(url))
+        assert second.headers["X-Cache"] == "HIT"
+        assert queries == 0
+        assert second.json() == first.json()
+        assert second.headers.get("ETag") == first.headers.get("ETag")
+
+    # Совпавший ETag - 304 прямо из кэша
+    etag = client.get(f"/api/books/{book_id}").headers["ETag"]
+    response = client.get(f"/api/books/{book_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    stats = client.get("/api/stats/cache").json()
+    assert stats["backend"] == backend
+    assert stats["hits"] >= 4 and stats["misses"] >= 4
+    assert stats["entries"] == 4
+
+
+def test_writes_invalidate_only_affected_entries(client, backend):
+    """Изменение книги сбрасывает ее карточку, списки и экземпляры, но не читателя"""
+    book_id, reader_id = _create_catalog(client)
+    other_id = client.post("/api/books/", json={"title": "Другая", "author": "Автор"}).json()["id"]
+    urls = [f"/api/books/{book_id}", f"/api/books/{other_id}", "/api/books/",
+            "/api/copies/inventory/RC-1", "/api/readers/card/RC-R1"]
+    for url in urls:
+        client.get(url)
+
+    client.put(f"/api/books/{book_id}", json={"title": "Новое название"})
+    results = {url: client.get(url).headers["X-Cache"] for url in urls}
+    assert results == {
+        f"/api/books/{book_id}": "MISS",
+        f"/api/books/{other_id}": "HIT",
+        "/api/books/": "MISS",
+        "/api/copies/inventory/RC-1": "MISS",
+        "/api/readers/card/RC-R1": "HIT",
+    }
+    assert client.get("/api/copies/inventory/RC-1").json()["book_title"] == "Новое название"
+
+    # Выдача меняет экземпляр и счетчик читателя массовыми UPDATE
+    copy_id = client.get("/api/copies/inventory/RC-1").json()["id"]
+    client.post("/api/loans/", json={"copy_id": copy_id, "reader_id": reader_id})
+    copy = client.get("/api/copies/inventory/RC-1")
+    assert copy.headers["X-Cache"] == "MISS"
+    assert copy.json()["status"] == "borrowed"
+    reader = client.get("/api/readers/card/RC-R1")
+    assert reader.headers["X-Cache"] == "MISS"
+    assert reader.json()["active_loans"] == 1
+    assert client.get(f"/api/books/{other_id}").headers["X-Cache"] == "HIT"
+
+
+def test_not_found_and_rollback_not_cached(client, test_db):
+    """404 не кэшируется; откатанное изменение кэш не сбрасывает"""
+    assert client.get("/api/readers/card/RC-NEW").status_code == status.HTTP_404_NOT_FOUND
+    client.post("/api/readers/", json={"full_name": "Новый", "library_card": "RC-NEW"})
+    assert client.get("/api/readers/card/RC-NEW").status_code == status.HTTP_200_OK
+
+    book_id, _ = _create_catalog(client)
+    client.get(f"/api/books/{book_id}")
+    book = test_db.get(Book, book_id)
+    book.title = "Черновик"
+    test_db.flush()
+    test_db.rollback()
+    response = client.get(f"/api/books/{book_id}")
+    assert response.headers["X-Cache"] == "HIT"
+    assert response.json()["title"] == "Книга"
@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.database import configure_sqlite, read_only_url
+from app.models import Book, Copy
+from app.schema import upgrade_schema
+
+
+@pytest.fixture
+def engines(tmp_path):
+    """Движок записи и пул только для чтения с профилем SQLite для файла во временном каталоге"""
+    url = f"sqlite:///{tmp_path / 'library.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    configure_sqlite(engine)
+    read_engine = create_engine(read_only_url(url), connect_args={"check_same_thread": False})
+    configure_sqlite(read_engine, read_only=True)
+    try:
+        yield engine, read_engine
+    finally:
+        read_engine.dispose()
+        engine.dispose()
+
+
+def test_pragmas_applied_and_migrations_keep_foreign_keys(engines):
+    """Профиль применяется к соединениям; миграции проходят при включенных внешних ключах"""
+    engine, _ = engines
+    upgrade_schema(engine)
+    with engine.connect() as conn:
+        values = {
+            name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "foreign_keys")
+        }
+        # synchronous: 1 - NORMAL
+        assert values == {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000, "foreign_keys": 1}
+        with pytest.raises(IntegrityError):
+            conn.execute(insert(Copy.__table__).values(book_id=999, inventory_number="FK-1"))
+
+
+def test_read_pool_is_read_only_and_not_blocked_by_writer(engines):
+    """Соединения чтения не пишут и видят последнее подтвержденное состояние во время записи"""
+    engine, read_engine = engines
+    upgrade_schema(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Book.__table__).values(title="Книга", author="Автор"))
+
+    with engine.connect() as writer:
+        writer.execute(insert(Book.__table__).values(title="Черновик", author="Автор"))
+        # Транзакция записи открыта - читатель не ждет ее и видит одну книгу
+        with read_engine.connect() as reader:
+            assert len(reader.execute(select(Book.id)).all()) == 1
+            with pytest.raises(OperationalError):
+                reader.execute(text("DELETE FROM books"))
+        writer.commit()
+
+    with read_engine.connect() as reader:
+        assert len(reader.execute(select(Book.id)).all()) == 2
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+
+import app.main
+from app.config import settings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_import_does_not_touch_database(tmp_path):
+    """Импорт приложения не подключается к БД и не импортирует Alembic и роутеры"""
+    db_path = tmp_path / "library.db"
+    code = "import sys, app.main; print('alembic' in sys.modules, any(m.startswith('app.api') for m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{db_path}"}
+    )
+    assert result.stdout.strip() == "False False"
+    assert not db_path.exists()
+
+
+def test_lifespan_applies_migrations(tmp_path, monkeypatch):
+    """Миграции выполняются при старте, если не отключены AUTO_MIGRATE"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'library.db'}")
+    monkeypatch.setattr(app.main, "engine", engine)
+    monkeypatch.setattr(settings, "OVERDUE_SWEEP_INTERVAL", 0)
+    try:
+        monkeypatch.setattr(settings, "AUTO_MIGRATE", False)
+        with TestClient(app.main.app) as client:
+            assert client.get("/api/health").status_code == 200
+        assert inspect(engine).get_table_names() == []
+
+        monkeypatch.setattr(settings, "AUTO_MIGRATE", True)
+        with TestClient(app.main.app):
+            pass
+        tables = inspect(engine).get_table_names()
+        assert {"alembic_version", "books", "books_fts"} <= set(tables)
+    finally:
+        engine.dispose()
+
+
+def test_lifespan_sets_threadpool_size(monkeypatch):
+    """Размер пула потоков синхронных маршрутов берется из THREADPOOL_SIZE"""
+    monkeypatch.setattr(settings, "AUTO_MIGRATE", False)
+    monkeypatch.setattr(settings, "OVERDUE_SWEEP_INTERVAL", 0)
+    monkeypatch.setattr(settings, "THREADPOOL_SIZE", 7)
+    with TestClient(app.main.app) as client:
+        assert "library_threadpool_size 7\n" in client.get("/metrics").text
+
+
+def test_lifespan_fails_on_migration_error(monkeypatch):
+    """Ошибка миграции прерывает старт приложения"""
+    import app.schema
+
+    def migrate(engine):
+        raise RuntimeError("миграция не удалась")
+
+    monkeypatch.setattr(app.schema, "migrate", migrate)
+    monkeypatch.setattr(settings, "AUTO_MIGRATE", True)
+    monkeypatch.setattr(settings, "OVERDUE_SWEEP_INTERVAL", 0)
+    with pytest.raises(RuntimeError, match="миграция не удалась"):
+        with TestClient(app.main.app):
+            pass
@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+from fastapi import status
+
+from app.config import settings
+from app.crud.overdue import sweep_overdue
+from app.models.loan import Loan
+
+
+def test_dashboard_stats_single_query_and_cache(client, test_db, count_queries, monkeypatch):
+    """Статистика главной страницы читается из счетчиков и кэшируется"""
+    monkeypatch.setattr(settings, "STATS_CACHE_TTL", 0)
+
+    book_id = client.post("/api/books/", json={"title": "Книга", "author": "Автор"}).json()["id"]
+    copy_ids = [
+        client.post("/api/copies/", json={"book_id": book_id, "inventory_number": f"ST-{i}"}).json()["id"]
+        for i in range(3)
+    ]
+    reader_id = client.post("/api/readers/", json={"full_name": "Читатель", "library_card": "ST-R1"}).json()["id"]
+    blocked_id = client.post("/api/readers/", json={"full_name": "Другой", "library_card": "ST-R2"}).json()["id"]
+    client.patch(f"/api/readers/{blocked_id}/block")
+    client.post("/api/loans/", json={"copy_id": copy_ids[0], "reader_id": reader_id})
+    loan_id = client.post("/api/loans/", json={"copy_id": copy_ids[1], "reader_id": reader_id}).json()["id"]
+
+    # Делаем одну выдачу просроченной
+    loan = test_db.get(Loan, loan_id)
+    loan.due_date = date.today() - timedelta(days=1)
+    test_db.commit()
+    sweep_overdue(test_db)
+
+    response, queries = count_queries(lambda: client.get("/api/stats/dashboard"))
+    assert response.status_code == status.HTTP_200_OK
+    # Только таблица счетчиков: просрочку отмечает фоновая проверка
+    assert queries == 1
+    stats = response.json()
+    assert stats["books"] == 1
+    assert stats["copies"] == {"total": 3, "by_status": {"available": 1, "borrowed": 2}}
+    assert stats["readers"] == {"total": 2, "by_status": {"active": 1, "blocked": 1}}
+    assert stats["loans"] == {"total": 2, "by_status": {"active": 1, "overdue": 1}, "overdue": 1}
+
+    # В пределах TTL ответ берется из кэша без обращения к БД
+    monkeypatch.setattr(settings, "STATS_CACHE_TTL", 60)
+    client.get("/api/stats/dashboard")
+    response, queries = count_queries(lambda: client.get("/api/stats/dashboard"))
+    assert queries == 0
+    assert response.json() == stats
@@ -0,0 +1,68 @@
+from fastapi import status
+
+
+def _suggest(client, field, prefix):
+    response = client.get("/api/suggest", params={"field": field, "prefix": prefix})
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+
+def test_suggest_titles_authors_and_readers(client):
+    """Подсказки по началу любого слова названия, автора и ФИО читателя"""
+    client.post("/api/books/", json={"title": "Мастер и Маргарита", "author": "Михаил Булгаков"})
+    client.post("/api/books/", json={"title": "Собачье сердце", "author": "Михаил Булгаков"})
+    client.post("/api/readers/", json={"full_name": "Иванов Иван", "library_card": "RC-777"})
+
+    assert [s["value"] for s in _suggest(client, "title", "марг")] == ["Мастер и Маргарита"]
+    # Автор встречается один раз, хотя у него две книги
+    assert [s["value"] for s in _suggest(client, "author", "булг")] == ["Михаил Булгаков"]
+
+    readers = _suggest(client, "reader", "ива")
+    assert [(s["value"], s["detail"]) for s in readers] == [("Иванов Иван", "RC-777")]
+    assert _suggest(client, "reader", "rc-7")[0]["value"] == "Иванов Иван"
+
+    response = client.get("/api/suggest", params={"field": "isbn", "prefix": "9"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_suggest_follows_writes(client):
+    """Индекс подсказок обновляется при создании, изменении и удалении"""
+    book_id = client.post("/api/books/", json={"title": "Идиот", "author": "Достоевский"}).json()["id"]
+    assert [s["id"] for s in _suggest(client, "title", "иди")] == [book_id]
+
+    client.put(f"/api/books/{book_id}", json={"title": "Бесы"})
+    assert _suggest(client, "title", "иди") == []
+    assert [s["id"] for s in _suggest(client, "title", "бес")] == [book_id]
+
+    client.delete(f"/api/books/{book_id}")
+    assert _suggest(client, "title", "бес") == []
+    assert _suggest(client, "author", "дост") == []
+
+
+def test_suggest_sees_writes_of_other_workers(client, test_db, monkeypatch):
+    """Изменения другого процесса (свой движок) приводят к перестроению индекса"""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.orm import Session
+
+    from app.config import settings
+    from app.models.book import Book
+
+    client.post("/api/books/", json={"title": "Идиот", "author": "Достоевский"})
+    assert len(_suggest(client, "title", "иди")) == 1
+
+    other = create_engine(test_db.get_bind().url)
+    with Session(other) as db:
+        db.add(Book(title="Игрок", author="Достоевский"))
+        db.commit()
+    # Версия проверяется не чаще SEARCH_INDEX_CHECK_INTERVAL
+    assert _suggest(client, "title", "игр") == []
+    monkeypatch.setattr(settings, "SEARCH_INDEX_CHECK_INTERVAL", 0)
+    assert [s["value"] for s in _suggest(client, "title", "игр")] == ["Игрок"]
+
+    # Ручной SQL счетчики версий не меняет - его покрывает SEARCH_INDEX_MAX_AGE
+    with other.begin() as connection:
+        connection.execute(text("UPDATE books SET title = 'Бесы' WHERE title = 'Игрок'"))
+    assert _suggest(client, "title", "бес") == []
+    monkeypatch.setattr(settings, "SEARCH_INDEX_MAX_AGE", 1e-9)
+    assert [s["value"] for s in _suggest(client, "title", "бес")] == ["Бесы"]
+    other.dispose()
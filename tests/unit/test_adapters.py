@@ -0,0 +1,36 @@
+from datetime import date
+
+from app.api.responses import json_list
+from app.models.book import Book
+from app.schemas.adapters import list_adapter, validate_list, validate_rows
+from app.schemas.book import BookInDB
+from app.schemas.loan import LoanInDB
+
+
+class FakeRow(tuple):
+    """Кортеж с именами колонок, как Row из SQLAlchemy"""
+    _fields = ("id", "copy_id", "reader_id", "loan_date", "due_date", "status")
+
+
+def test_list_adapter_is_cached():
+    """TypeAdapter собирается один раз на схему"""
+    assert list_adapter(LoanInDB) is list_adapter(LoanInDB)
+
+
+def test_validate_rows_and_instances():
+    """Строки проверяются по именам колонок, готовые схемы - без повторной проверки"""
+    row = FakeRow((1, 2, 3, date(2026, 1, 1), date(2026, 1, 15), "active"))
+    loans = validate_rows(LoanInDB, iter([row]))
+    assert loans == [LoanInDB(id=1, copy_id=2, reader_id=3, loan_date=date(2026, 1, 1),
+                              due_date=date(2026, 1, 15), status="active")]
+    assert validate_list(LoanInDB, loans)[0] is loans[0]
+    assert validate_rows(LoanInDB, []) == []
+
+
+def test_json_list_reads_orm_objects():
+    """Ответ со списком ORM-объектов - готовый JSON без response_model"""
+    book = Book(id=1, title="Книга", author="Автор")
+    response = json_list(BookInDB, [book], headers={"X-Next-Cursor": "abc"})
+    assert response.media_type == "application/json"
+    assert response.headers["X-Next-Cursor"] == "abc"
+    assert response.body == list_adapter(BookInDB).dump_json([BookInDB.model_validate(book)])
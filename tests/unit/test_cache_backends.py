@@ -0,0 +1,72 @@
+import pytest
+
+from app.cache import MemoryCache, SQLiteCache, default_backend, item_tags, table_tags
+from app.config import settings
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def response_cache(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCache(max_entries=3, ttl=60)
+    return SQLiteCache(str(tmp_path / "cache.db"), max_entries=3, ttl=60)
+
+
+def test_invalidate_by_tags(response_cache):
+    """Запись удаляется по любому из своих тегов"""
+    generation = response_cache.generation()
+    response_cache.set("/api/books/1?", (b"{}", {"ETag": '"book.1.1"'}), item_tags("books", 1), generation)
+    response_cache.set("/api/books/2?", (b"{}", {}), item_tags("books", 2), generation)
+    response_cache.set("/api/books/?", (b"[]", {}), ["books"], generation)
+    assert response_cache.get("/api/books/1?") == (b"{}", {"ETag": '"book.1.1"'})
+
+    response_cache.invalidate(table_tags("books", [1]))
+    assert response_cache.get("/api/books/1?") is None
+    assert response_cache.get("/api/books/?") is None
+    assert response_cache.get("/api/books/2?") is not None
+
+    # Изменение без списка id сбрасывает все карточки таблицы
+    response_cache.invalidate(table_tags("books"))
+    assert response_cache.get("/api/books/2?") is None
+    assert response_cache.size() == 0
+
+
+def test_stale_generation_not_stored(response_cache):
+    """Ответ, прочитанный до инвалидации, в кэш не попадает"""
+    generation = response_cache.generation()
+    response_cache.invalidate(["readers:1"])
+    response_cache.set("/api/readers/card/R1?", (b"{}", {}), item_tags("readers", 1), generation)
+    assert response_cache.get("/api/readers/card/R1?") is None
+
+
+def test_size_limit_and_ttl(response_cache):
+    """Размер кэша ограничен, записи с истекшим сроком не отдаются"""
+    for i in range(5):
+        response_cache.set(f"key-{i}", (b"{}", {}), ["books"], response_cache.generation())
+    assert response_cache.size() == 3
+    assert response_cache.get("key-4") is not None
+
+    response_cache.ttl = -1
+    response_cache.set("expired", (b"{}", {}), ["books"], response_cache.generation())
+    assert response_cache.get("expired") is None
+    stats = response_cache.stats()
+    assert stats["stores"] == 6
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_entry_ttl_is_capped(response_cache):
+    """Запись с коротким ttl истекает раньше TTL кэша"""
+    response_cache.set("short", (b"{}", {}), ["books"], response_cache.generation(), ttl=-1)
+    response_cache.set("long", (b"{}", {}), ["books"], response_cache.generation())
+    assert response_cache.get("short") is None
+    assert response_cache.get("long") is not None
+
+
+def test_default_backend_follows_workers(monkeypatch):
+    """Без явной настройки несколько воркеров получают общий кэш sqlite"""
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_BACKEND", "")
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 1)
+    assert default_backend() == "memory"
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 4)
+    assert default_backend() == "sqlite"
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_BACKEND", "memory")
+    assert default_backend() == "memory"